@@ -0,0 +1,109 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Стратегии подсчета общего количества записей
+COUNT_EXACT = "exact"
+COUNT_ESTIMATE = "estimate"
+COUNT_CACHED = "cached"
+COUNT_NONE = "none"
+COUNT_STRATEGIES = (COUNT_EXACT, COUNT_ESTIMATE, COUNT_CACHED, COUNT_NONE)
+
+# Параметры кэша количества записей
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "60"))
+COUNT_CACHE_MAX_ENTRIES = int(os.getenv("COUNT_CACHE_MAX_ENTRIES", "4096"))
+
+
+class CountCache:
+    """
+    Кэш результатов COUNT(*) по ключу (таблица, условие отбора).
+
+    Обработчики записи поддерживают кэш в актуальном состоянии: вставка
+    и удаление сдвигают счётчик без условия на единицу, а записи с
+    условием (поиском) сбрасываются, так как изменение могло затронуть
+    их в любую сторону.
+    """
+
+    def __init__(self, ttl: float = COUNT_CACHE_TTL, max_entries: int = COUNT_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[int, float]]" = OrderedDict()
+
+    def get(self, table_name: str, criteria: Optional[str] = None) -> Optional[int]:
+        key = (table_name, criteria or "")
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[1] >= self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, table_name: str, count: int, criteria: Optional[str] = None) -> None:
+        key = (table_name, criteria or "")
+        with self._lock:
+            self._entries[key] = (count, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def adjust(self, table_name: str, delta: int) -> None:
+        """
+        Сдвигает счётчик таблицы без условия и сбрасывает счётчики с условием.
+        """
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == table_name]:
+                if key[1] == "":
+                    count, stored_at = self._entries[key]
+                    self._entries[key] = (max(count + delta, 0), stored_at)
+                else:
+                    del self._entries[key]
+
+    def invalidate(self, table_name: Optional[str] = None, filtered_only: bool = False) -> None:
+        with self._lock:
+            if table_name is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == table_name]:
+                if not filtered_only or key[1] != "":
+                    del self._entries[key]
+
+
+def estimate_table_rows(db: Session, table_name: str) -> int:
+    """
+    Оценка количества строк таблицы по статистике InnoDB (TABLE_ROWS).
+    """
+    query = text("""
+        SELECT table_rows AS table_rows
+        FROM information_schema.tables
+        WHERE table_schema = DATABASE() AND table_name = :table_name
+    """)
+    row = db.execute(query, {"table_name": table_name}).fetchone()
+    return int(row.table_rows or 0) if row else 0
+
+
+def estimate_query_rows(db: Session, select_sql: str, params: Dict[str, Any]) -> int:
+    """
+    Оценка количества строк, удовлетворяющих запросу, по плану EXPLAIN.
+
+    Берётся оценка rows первой таблицы плана с поправкой на filtered (%).
+    """
+    plan = db.execute(text(f"EXPLAIN {select_sql}"), params).fetchall()
+    if not plan:
+        return 0
+    step = plan[0]._mapping
+    rows = float(step.get("rows") or 0)
+    filtered = float(step.get("filtered") or 100)
+    return int(round(rows * filtered / 100))
+
+
+# Общий кэш количества записей для всех обработчиков
+count_cache = CountCache()
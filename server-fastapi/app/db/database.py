@@ -1,9 +1,13 @@
 import os
+from typing import Union
 from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 import logging
+from ..utils.metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -19,25 +23,78 @@ DB_USER = os.getenv("DB_USER", "root")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "")
 DB_NAME = os.getenv("DB_NAME", "database_name")
 
+# Режим работы с базой данных: синхронный (pymysql) или асинхронный (aiomysql)
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+
 # Строка подключения к MySQL
 SQLALCHEMY_DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+SQLALCHEMY_ASYNC_DATABASE_URL = f"mysql+aiomysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# Параметры пула соединений SQLAlchemy
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_ISOLATION_LEVEL = os.getenv("DB_ISOLATION_LEVEL") or None
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+
+# Ограничение соединений на все процессы сервера: у каждого воркера свой пул,
+# поэтому workers * (pool_size + max_overflow) не должно превышать max_connections MySQL
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "0"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+# Размер пула одного воркера с учётом общего лимита соединений
+def pool_limits(pool_size: int, max_overflow: int, max_connections: int, workers: int):
+    if max_connections <= 0:
+        return pool_size, max_overflow
+    budget = max(1, max_connections // max(1, workers))
+    size = min(pool_size, budget)
+    return size, max(0, min(max_overflow, budget - size))
+
+_configured_pool = (DB_POOL_SIZE, DB_MAX_OVERFLOW)
+DB_POOL_SIZE, DB_MAX_OVERFLOW = pool_limits(DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_MAX_CONNECTIONS, WEB_CONCURRENCY)
+if (DB_POOL_SIZE, DB_MAX_OVERFLOW) != _configured_pool:
+    logger.info(
+        f"Пул уменьшен до pool_size={DB_POOL_SIZE}, max_overflow={DB_MAX_OVERFLOW}: "
+        f"{WEB_CONCURRENCY} воркеров, не более {DB_MAX_CONNECTIONS} соединений"
+    )
 
-try:
-    # Создание движка SQLAlchemy
-    engine = create_engine(SQLALCHEMY_DATABASE_URL)
-    logger.info(f"Успешное подключение к базе данных: {DB_HOST}:{DB_PORT}/{DB_NAME}")
-    
-    # Попытка подключения для проверки
-    with engine.connect() as connection:
-        result = connection.execute(text("SELECT 1"))
-        logger.info("Проверка соединения: успешно")
-except Exception as e:
-    logger.error(f"Ошибка при подключении к базе данных: {e}")
-    raise
+# Параметры движка, общие для синхронного и асинхронного режимов
+def engine_options():
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "connect_args": {"connect_timeout": DB_CONNECT_TIMEOUT},
+    }
+    if DB_ISOLATION_LEVEL:
+        options["isolation_level"] = DB_ISOLATION_LEVEL
+    return options
+
+# Создание движка SQLAlchemy. Подключение к базе при импорте не выполняется:
+# доступность базы проверяется лениво через /health/ready
+engine = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=InstrumentedQueuePool, **engine_options())
+logger.info(
+    f"Движок базы данных {DB_HOST}:{DB_PORT}/{DB_NAME}: pool_size={DB_POOL_SIZE}, "
+    f"max_overflow={DB_MAX_OVERFLOW}, pool_recycle={DB_POOL_RECYCLE}, pre_ping={DB_POOL_PRE_PING}"
+)
 
 # Создание сессии
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронный движок создаётся только в асинхронном режиме
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    async_engine = create_async_engine(
+        SQLALCHEMY_ASYNC_DATABASE_URL, poolclass=InstrumentedAsyncQueuePool, **engine_options()
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    logger.info("Используется асинхронный движок базы данных (aiomysql)")
+
 # База для моделей SQLAlchemy
 Base = declarative_base()
 
@@ -47,4 +104,62 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close() 
+
+# Функция для получения асинхронной сессии базы данных
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Зависимость для обработчиков: сессия в выбранном режиме
+get_session = get_async_db if DB_ASYNC else get_db
+DBSession = Union[Session, AsyncSession]
+
+# Выполнение синхронной функции работы с базой без блокировки цикла событий
+async def run_db(db, fn, *args, **kwargs):
+    """
+    Выполняет fn(session, *args, **kwargs) для сессии из get_session.
+
+    Для AsyncSession функция выполняется через run_sync: запросы идут через
+    асинхронный драйвер, а цикл событий не блокируется. Для обычной сессии
+    функция выполняется в пуле потоков.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+# Проверка доступности базы данных (для readiness-пробы)
+async def ping_database():
+    if async_engine is not None:
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+        return
+
+    def _ping():
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+    await run_in_threadpool(_ping)
+
+# Состояние пула соединений активного движка
+def pool_status():
+    active_engine = async_engine.sync_engine if async_engine is not None else engine
+    return active_engine.pool.status()
+
+# Числовые показатели пула для /metrics
+def pool_metrics():
+    active_engine = async_engine.sync_engine if async_engine is not None else engine
+    pool = active_engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+
+# Закрытие соединений пула при остановке воркера
+async def dispose_engines():
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
+    logger.info("Соединения пула закрыты")
@@ -0,0 +1,211 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .schema_cache import TableSchema
+
+# Операторы фильтров вида `колонка__оператор=значение`
+FILTER_OPERATORS = {
+    "eq": "=",
+    "ne": "<>",
+    "gt": ">",
+    "gte": ">=",
+    "lt": "<",
+    "lte": "<=",
+    "in": "IN",
+    "isnull": "IS NULL",
+}
+
+# Максимальное количество значений в фильтре __in
+MAX_IN_VALUES = 1000
+
+
+class FilterError(ValueError):
+    """Некорректная проекция или фильтр"""
+
+
+def parse_fields(table: TableSchema, fields: Optional[str]) -> List[str]:
+    """
+    Разбирает проекцию `fields=a,b,c` и проверяет колонки по схеме.
+
+    Returns:
+        Список колонок (все колонки таблицы, если проекция не задана)
+    """
+    if not fields:
+        return table.column_names
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if table.column(name) is None]
+    if unknown:
+        raise FilterError(f"Неизвестные колонки в fields: {', '.join(unknown)}")
+    if not requested:
+        raise FilterError("Параметр fields не содержит колонок")
+    # Имена из схемы (как в ответе без проекции); повторы убираем, сохраняя порядок
+    return list(dict.fromkeys(table.column(name).name for name in requested))
+
+
+def select_list(columns: List[str]) -> str:
+    return ", ".join(f"`{col}`" for col in columns)
+
+
+def parse_filters(table: TableSchema, query_items: Iterable[Tuple[str, str]]) -> List[Tuple[str, str, Any]]:
+    """
+    Выбирает из параметров запроса фильтры `колонка__оператор`.
+
+    Параметры без `__` (page, limit, search и т.п.) пропускаются.
+
+    Returns:
+        Список (колонка, оператор, значение)
+    """
+    filters = []
+    for key, value in query_items:
+        if "__" not in key:
+            continue
+        column, operator = key.rsplit("__", 1)
+        if operator not in FILTER_OPERATORS:
+            raise FilterError(f"Неизвестный оператор фильтра '{operator}' в параметре '{key}'")
+        if table.column(column) is None:
+            raise FilterError(f"Неизвестная колонка '{column}' в параметре '{key}'")
+        column = table.column(column).name
+
+        if operator == "in":
+            # Из JSON-тела список приходит готовым, из строки запроса - через запятую
+            if isinstance(value, (list, tuple)):
+                values = list(value)
+            else:
+                values = [v for v in value.split(",") if v != ""]
+            if not values:
+                raise FilterError(f"Пустой список значений в параметре '{key}'")
+            if len(values) > MAX_IN_VALUES:
+                raise FilterError(f"Слишком много значений в параметре '{key}' (максимум {MAX_IN_VALUES})")
+            filters.append((column, operator, values))
+        elif operator == "isnull":
+            if isinstance(value, bool):
+                filters.append((column, operator, value))
+                continue
+            if str(value).lower() not in ("true", "false", "1", "0"):
+                raise FilterError(f"Параметр '{key}' принимает true или false")
+            filters.append((column, operator, str(value).lower() in ("true", "1")))
+        else:
+            filters.append((column, operator, value))
+    return filters
+
+
+# Операторы, по которым индекс ищет записи с заданным значением
+EQUALITY_OPERATORS = ("eq", "in", "isnull")
+# Операторы диапазона: индекс используется, если колонка следует за равенствами
+RANGE_OPERATORS = ("gt", "gte", "lt", "lte")
+
+
+def check_indexed_filters(table: TableSchema, filters: List[Tuple[str, str, Any]]) -> None:
+    """
+    Проверяет, что фильтр выбирает записи по индексу.
+
+    Колонки с равенством (eq, in, isnull) должны образовывать начало
+    (префикс) какого-либо B-tree индекса; без равенств - первая колонка
+    индекса должна быть ограничена диапазоном. Оператор ne индексом не
+    ограничивается. Так массовое изменение по фильтру блокирует и
+    изменяет найденные по индексу записи, а не просматривает таблицу.
+
+    Raises:
+        FilterError: Фильтр не использует индекс
+    """
+    negated = [column for column, operator, _ in filters if operator not in EQUALITY_OPERATORS + RANGE_OPERATORS]
+    if negated:
+        raise FilterError(f"Оператор ne не поддерживается в фильтре изменения (колонки: {', '.join(negated)})")
+    equal = {column for column, operator, _ in filters if operator in EQUALITY_OPERATORS}
+    ranged = {column for column, operator, _ in filters if operator in RANGE_OPERATORS}
+    for index in table.indexes.values():
+        if (index.index_type or "").upper() in ("FULLTEXT", "SPATIAL"):
+            continue
+        if equal and set(index.columns[:len(equal)]) == equal:
+            return
+        if not equal and index.columns and index.columns[0] in ranged:
+            return
+    raise FilterError(
+        f"Фильтр по {', '.join(sorted(equal | ranged))} не поддерживается: колонки с равенством "
+        f"должны образовывать начало индекса"
+    )
+
+
+def build_filter_conditions(filters: List[Tuple[str, str, Any]]) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Компилирует фильтры в параметризованные условия WHERE.
+
+    Returns:
+        Кортеж (список условий, параметры)
+    """
+    conditions = []
+    params: Dict[str, Any] = {}
+    for idx, (column, operator, value) in enumerate(filters):
+        if operator == "isnull":
+            conditions.append(f"`{column}` IS {'' if value else 'NOT '}NULL")
+        elif operator == "in":
+            names = [f"filter_{idx}_{j}" for j in range(len(value))]
+            conditions.append(f"`{column}` IN ({', '.join(':' + name for name in names)})")
+            params.update(zip(names, value))
+        else:
+            conditions.append(f"`{column}` {FILTER_OPERATORS[operator]} :filter_{idx}")
+            params[f"filter_{idx}"] = value
+    return conditions, params
+
+
+def parse_sort(table: TableSchema, sort: Optional[str]) -> List[Tuple[str, bool]]:
+    """
+    Разбирает сортировку `sort=a,-b` (минус - по убыванию).
+
+    Сортировать можно только по колонкам, образующим начало (префикс)
+    какого-либо B-tree индекса таблицы, чтобы ORDER BY ... LIMIT
+    выполнялся по индексу без файловой сортировки.
+
+    Returns:
+        Список (колонка, по убыванию)
+    """
+    if not sort:
+        return []
+    order = []
+    for item in (part.strip() for part in sort.split(",")):
+        if not item:
+            continue
+        descending = item.startswith("-")
+        column = item.lstrip("+-")
+        if table.column(column) is None:
+            raise FilterError(f"Неизвестная колонка '{column}' в sort")
+        order.append((table.column(column).name, descending))
+    if not order:
+        raise FilterError("Параметр sort не содержит колонок")
+
+    columns = [column for column, _ in order]
+    if len(set(columns)) != len(columns):
+        raise FilterError("Колонки в sort не должны повторяться")
+    indexed = any(
+        index.columns[:len(columns)] == columns
+        for index in table.indexes.values()
+        if index.index_type != "FULLTEXT"
+    )
+    if not indexed:
+        raise FilterError(f"Сортировка по {', '.join(columns)} не поддерживается: нет подходящего индекса")
+    return order
+
+
+def build_sort_clause(order: List[Tuple[str, bool]], tiebreaker: List[str]) -> str:
+    """
+    Строит ORDER BY. Колонки ключа таблицы добавляются в конец, чтобы
+    порядок строк был однозначным и страницы не пересекались.
+    """
+    if not order:
+        return ""
+    last_descending = order[-1][1]
+    sorted_columns = {column for column, _ in order}
+    order = order + [(column, last_descending) for column in tiebreaker if column not in sorted_columns]
+    return "ORDER BY " + ", ".join(f"`{column}` {'DESC' if descending else 'ASC'}" for column, descending in order)
+
+
+def criteria_key(search: Optional[str], filters: List[Tuple[str, str, Any]]) -> Optional[str]:
+    """
+    Ключ условия отбора для кэша количества записей: одинаковые поиск и
+    фильтры (в любом порядке параметров) дают один и тот же ключ.
+    """
+    if not search and not filters:
+        return None
+    parts = [repr(sorted(filters, key=repr))]
+    if search:
+        parts.append(search)
+    return "|".join(parts)
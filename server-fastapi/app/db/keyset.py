@@ -0,0 +1,177 @@
+import base64
+import binascii
+import json
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+# Направления перехода по курсору
+DIRECTION_NEXT = "next"
+DIRECTION_PREV = "prev"
+
+
+class CursorError(ValueError):
+    """Курсор повреждён или не подходит к таблице"""
+
+
+def choose_unique_key(index_rows: Iterable[Tuple[str, str, str]]) -> List[str]:
+    """
+    Выбирает колонки, по которым можно выполнять поиск по ключу (seek).
+
+    Предпочтение отдаётся первичному ключу, затем самому короткому
+    уникальному индексу, все колонки которого объявлены NOT NULL.
+
+    Args:
+        index_rows: Строки (index_name, column_name, nullable) уникальных
+            индексов из information_schema.statistics в порядке seq_in_index
+
+    Returns:
+        Список колонок ключа (пустой, если подходящего индекса нет)
+    """
+    indexes: Dict[str, List[str]] = {}
+    nullable_indexes = set()
+    for index_name, column_name, nullable in index_rows:
+        indexes.setdefault(index_name, []).append(column_name)
+        if nullable == "YES":
+            nullable_indexes.add(index_name)
+
+    if "PRIMARY" in indexes:
+        return indexes["PRIMARY"]
+
+    candidates = [cols for name, cols in indexes.items() if name not in nullable_indexes]
+    if not candidates:
+        return []
+    return min(candidates, key=len)
+
+
+def _encode_value(value: Any) -> Any:
+    # Бинарные значения не представимы в JSON напрямую
+    if isinstance(value, (bytes, bytearray)):
+        return {"$b": base64.b64encode(bytes(value)).decode("ascii")}
+    if isinstance(value, (int, float, str)) or value is None:
+        return value
+    # datetime, date, Decimal и т.п. MySQL корректно сравнивает со строкой
+    return str(value)
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "$b" in value:
+        return base64.b64decode(value["$b"])
+    return value
+
+
+def encode_cursor(values: Sequence[Any], direction: str) -> str:
+    """
+    Кодирует значения ключа строки в непрозрачный курсор.
+
+    Args:
+        values: Значения колонок ключа
+        direction: Направление перехода (next или prev)
+
+    Returns:
+        Строка курсора (base64url)
+    """
+    payload = {"d": direction, "k": [_encode_value(v) for v in values]}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, key_size: int) -> Tuple[List[Any], str]:
+    """
+    Декодирует курсор, полученный от клиента.
+
+    Args:
+        cursor: Строка курсора
+        key_size: Количество колонок в ключе таблицы
+
+    Returns:
+        Кортеж (значения ключа, направление)
+
+    Raises:
+        CursorError: если курсор повреждён или не соответствует ключу
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = [_decode_value(v) for v in payload["k"]]
+        direction = payload["d"]
+    except (binascii.Error, ValueError, KeyError, TypeError, UnicodeError) as e:
+        raise CursorError(f"Некорректный курсор: {e}")
+
+    if direction not in (DIRECTION_NEXT, DIRECTION_PREV) or len(values) != key_size:
+        raise CursorError("Курсор не соответствует ключу таблицы")
+    return values, direction
+
+
+def build_seek_clause(key_columns: Sequence[str], direction: str) -> Tuple[str, List[str]]:
+    """
+    Строит условие WHERE для перехода за позицию курсора.
+
+    Для составного ключа (a, b) условие раскрывается в
+    `a > :c0 OR (a = :c0 AND b > :c1)`, что использует индекс и в тех
+    версиях MySQL, которые не оптимизируют сравнение кортежей.
+
+    Args:
+        key_columns: Колонки ключа
+        direction: Направление перехода
+
+    Returns:
+        Кортеж (SQL-условие, имена параметров курсора по порядку колонок)
+    """
+    operator = ">" if direction == DIRECTION_NEXT else "<"
+    param_names = [f"cursor_{idx}" for idx in range(len(key_columns))]
+
+    alternatives = []
+    for idx, col in enumerate(key_columns):
+        parts = [f"`{key_columns[j]}` = :{param_names[j]}" for j in range(idx)]
+        parts.append(f"`{col}` {operator} :{param_names[idx]}")
+        alternatives.append("(" + " AND ".join(parts) + ")")
+
+    return "(" + " OR ".join(alternatives) + ")", param_names
+
+
+def build_order_clause(key_columns: Sequence[str], direction: str) -> str:
+    """
+    Возвращает ORDER BY по колонкам ключа для заданного направления.
+    """
+    order = "ASC" if direction == DIRECTION_NEXT else "DESC"
+    return "ORDER BY " + ", ".join(f"`{col}` {order}" for col in key_columns)
+
+
+def paginate_rows(
+    rows: List[Any],
+    key_columns: Sequence[Union[str, int]],
+    limit: int,
+    direction: str,
+    has_cursor: bool,
+) -> Tuple[List[Dict[str, Any]], Optional[str], Optional[str]]:
+    """
+    Обрезает выборку из `limit + 1` строк до страницы и вычисляет курсоры.
+
+    Args:
+        rows: Строки в порядке выборки (для prev - в обратном порядке):
+            словари или кортежи
+        key_columns: Колонки ключа (для кортежей - их позиции в строке)
+        limit: Размер страницы
+        direction: Направление, в котором выполнялась выборка
+        has_cursor: Был ли передан курсор (иначе это первая страница)
+
+    Returns:
+        Кортеж (строки страницы в прямом порядке, next_cursor, prev_cursor)
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if direction == DIRECTION_PREV:
+        rows.reverse()
+        has_next, has_prev = has_cursor, has_more
+    else:
+        has_next, has_prev = has_more, has_cursor
+
+    next_cursor = None
+    prev_cursor = None
+    if rows:
+        if has_next:
+            next_cursor = encode_cursor([rows[-1][col] for col in key_columns], DIRECTION_NEXT)
+        if has_prev:
+            prev_cursor = encode_cursor([rows[0][col] for col in key_columns], DIRECTION_PREV)
+
+    return rows, next_cursor, prev_cursor
@@ -0,0 +1,295 @@
+import os
+import re
+import json
+import time
+import threading
+import logging
+from collections import deque, OrderedDict
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Параметры профилировщика медленных запросов (по умолчанию выключен)
+SLOW_QUERY_ENABLED = os.getenv("SLOW_QUERY_ENABLED", "false").lower() in ("1", "true", "yes")
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+SLOW_QUERY_BUFFER_SIZE = int(os.getenv("SLOW_QUERY_BUFFER_SIZE", "200"))
+SLOW_QUERY_MAX_SHAPES = int(os.getenv("SLOW_QUERY_MAX_SHAPES", "500"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() in ("1", "true", "yes")
+
+# Запросы, для которых MySQL умеет EXPLAIN
+EXPLAINABLE = ("SELECT", "UPDATE", "DELETE")
+
+# Нормализация текста запроса в форму: значения и списки параметров схлопываются
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\?")
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w`])-?\d+(?:\.\d+)?(?![\w`])")
+_HEX_LITERAL = re.compile(r"(?<![\w`])0x[0-9a-fA-F]+(?![\w`])")
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_WHITESPACE = re.compile(r"\s+")
+
+# Колонки в attached_condition плана: `база`.`таблица`.`колонка`
+_CONDITION_COLUMN = re.compile(r"`(?:[^`]+)`\.`([^`]+)`\.`([^`]+)`")
+_LEADING_WILDCARD = re.compile(r"`([^`]+)`\s+like\s+(?:'%|concat\('%)", re.IGNORECASE)
+
+
+def _redact_literals(text: str) -> str:
+    text = _STRING_LITERAL.sub("?", text)
+    text = _HEX_LITERAL.sub("?", text)
+    return _NUMBER_LITERAL.sub("?", text)
+
+
+def normalize_sql(statement: str) -> str:
+    """
+    Форма запроса: параметры и литералы заменены на ?, списки IN (?, ?, ...)
+    схлопнуты в (?+), пробелы нормализованы.
+    """
+    shape = _PLACEHOLDER.sub("?", statement)
+    shape = _redact_literals(shape)
+    shape = _PLACEHOLDER_LIST.sub("?+", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+def redact_parameters(parameters: Any) -> Any:
+    """
+    Параметры без значений: только имя, тип и длина строк.
+    """
+    def describe(value):
+        if value is None:
+            return "null"
+        if isinstance(value, (str, bytes)):
+            return f"{type(value).__name__}({len(value)})"
+        return type(value).__name__
+
+    if isinstance(parameters, dict):
+        return {name: describe(value) for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [describe(value) for value in parameters]
+    return None
+
+
+def redact_plan(node: Any, key: str = "") -> Any:
+    """
+    План EXPLAIN без значений параметров: MySQL подставляет их литералами
+    в условия (attached_condition, index_condition и т.п.), они заменяются на ?.
+    """
+    if isinstance(node, dict):
+        return {name: redact_plan(value, name) for name, value in node.items()}
+    if isinstance(node, list):
+        return [redact_plan(item, key) for item in node]
+    if isinstance(node, str) and "condition" in key:
+        return _redact_literals(node)
+    return node
+
+
+def _walk_plan(node: Any, found: List[Dict[str, Any]]) -> None:
+    if isinstance(node, dict):
+        if "table_name" in node and "access_type" in node:
+            found.append(node)
+        for value in node.values():
+            _walk_plan(value, found)
+    elif isinstance(node, list):
+        for item in node:
+            _walk_plan(item, found)
+
+
+def full_scans(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Полные просмотры таблиц (ALL) и индексов (index) из EXPLAIN FORMAT=JSON.
+    """
+    tables: List[Dict[str, Any]] = []
+    _walk_plan(plan, tables)
+    scans = []
+    for node in tables:
+        if node.get("access_type") not in ("ALL", "index"):
+            continue
+        scans.append({
+            "table": node["table_name"],
+            "access_type": node["access_type"],
+            "rows_examined_per_scan": node.get("rows_examined_per_scan"),
+            "attached_condition": node.get("attached_condition"),
+        })
+    return scans
+
+
+def recommend_indexes(scans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Рекомендации по полным просмотрам: индекс по колонкам условия,
+    FULLTEXT для LIKE с ведущим %, keyset-пагинация для просмотра без условия.
+    """
+    recommendations = []
+    for scan in scans:
+        table = scan["table"]
+        condition = scan.get("attached_condition") or ""
+        wildcard = {column for column in _LEADING_WILDCARD.findall(condition)}
+        columns = []
+        for scan_table, column in _CONDITION_COLUMN.findall(condition):
+            if scan_table == table and column not in columns and column not in wildcard:
+                columns.append(column)
+
+        if wildcard:
+            recommendations.append({
+                "table": table,
+                "kind": "fulltext",
+                "columns": sorted(wildcard),
+                "advice": f"LIKE '%...' не использует индексы: создайте FULLTEXT-индекс "
+                          f"(POST /api/admin/tables/{table}/fulltext-index)",
+            })
+        if columns:
+            index_columns = columns[:3]
+            index_name = "ix_" + "_".join(index_columns)
+            recommendations.append({
+                "table": table,
+                "kind": "index",
+                "columns": index_columns,
+                "advice": f"ALTER TABLE `{table}` ADD INDEX `{index_name}` "
+                          f"({', '.join(f'`{col}`' for col in index_columns)})",
+            })
+        if not condition:
+            recommendations.append({
+                "table": table,
+                "kind": "pagination",
+                "columns": [],
+                "advice": "Просмотр всей таблицы без условия: используйте mode=keyset вместо OFFSET "
+                          "и count=estimate или count=cached вместо точного COUNT(*)",
+            })
+    return recommendations
+
+
+class SlowQueryProfiler:
+    """
+    Профилировщик медленных запросов.
+
+    Запросы дольше порога попадают в кольцевой буфер вместе с формой,
+    параметрами без значений и планом EXPLAIN FORMAT=JSON; по формам
+    ведётся агрегированная статистика с рекомендациями индексов.
+    EXPLAIN выполняется отдельным курсором на том же соединении и
+    пропускается для потоковых (небуферизованных) результатов.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = SLOW_QUERY_THRESHOLD_MS,
+        buffer_size: int = SLOW_QUERY_BUFFER_SIZE,
+        max_shapes: int = SLOW_QUERY_MAX_SHAPES,
+        explain: bool = SLOW_QUERY_EXPLAIN,
+        enabled: bool = SLOW_QUERY_ENABLED
+    ):
+        self.threshold_ms = threshold_ms
+        self.max_shapes = max_shapes
+        self.explain = explain
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries: deque = deque(maxlen=buffer_size)
+        self._shapes: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def record(self, statement: str, parameters: Any, duration_ms: float, plan: Optional[Dict[str, Any]]) -> None:
+        shape = normalize_sql(statement)
+        scans = full_scans(plan) if plan else []
+        # Рекомендации строятся по исходным условиям (LIKE '%...'), хранится план без значений
+        recommendations = recommend_indexes(scans)
+        plan = redact_plan(plan) if plan else plan
+        scans = redact_plan(scans)
+        entry = {
+            "time": time.time(),
+            "duration_ms": round(duration_ms, 2),
+            "shape": shape,
+            "sql": statement,
+            "parameters": redact_parameters(parameters),
+            "explain": plan,
+            "full_scans": scans,
+        }
+        with self._lock:
+            self._entries.append(entry)
+            stats = self._shapes.get(shape)
+            if stats is None:
+                stats = self._shapes[shape] = {
+                    "shape": shape,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "recommendations": [],
+                }
+            self._shapes.move_to_end(shape)
+            stats["count"] += 1
+            stats["total_ms"] += duration_ms
+            stats["max_ms"] = max(stats["max_ms"], duration_ms)
+            stats["last_seen"] = entry["time"]
+            if recommendations:
+                stats["recommendations"] = recommendations
+            while len(self._shapes) > self.max_shapes:
+                self._shapes.popitem(last=False)
+        logger.warning(f"Медленный запрос ({duration_ms:.0f} мс): {shape}")
+
+    def report(self, limit: int = 50) -> Dict[str, Any]:
+        with self._lock:
+            entries = list(self._entries)[-limit:][::-1]
+            shapes = [dict(stats) for stats in self._shapes.values()]
+        for stats in shapes:
+            stats["avg_ms"] = round(stats["total_ms"] / stats["count"], 2)
+            stats["total_ms"] = round(stats["total_ms"], 2)
+            stats["max_ms"] = round(stats["max_ms"], 2)
+        shapes.sort(key=lambda stats: stats["total_ms"], reverse=True)
+
+        # Рекомендации по всем формам без повторов
+        recommendations = {}
+        for stats in shapes:
+            for item in stats["recommendations"]:
+                recommendations.setdefault((item["table"], item["kind"], tuple(item["columns"])), item)
+
+        return {
+            "enabled": self.enabled,
+            "threshold_ms": self.threshold_ms,
+            "entries": entries,
+            "shapes": shapes,
+            "recommendations": list(recommendations.values()),
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._shapes.clear()
+
+
+def _explain(conn, statement: str, parameters: Any) -> Optional[Dict[str, Any]]:
+    # Отдельный курсор драйвера: EXPLAIN не проходит через события движка
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN FORMAT=JSON {statement}", parameters)
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    return json.loads(row[0]) if row else None
+
+
+# Общий профилировщик
+profiler = SlowQueryProfiler()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if profiler.enabled and context is not None:
+        context.profiler_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "profiler_started", None)
+    if started is None:
+        return
+    duration_ms = (time.perf_counter() - started) * 1000
+    if duration_ms < profiler.threshold_ms:
+        return
+
+    plan = None
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    streaming = bool(context.execution_options.get("stream_results"))
+    if profiler.explain and operation in EXPLAINABLE and not executemany and not streaming:
+        try:
+            plan = _explain(conn, statement, parameters)
+        except Exception as e:
+            logger.warning(f"Не удалось выполнить EXPLAIN для медленного запроса: {e}")
+    profiler.record(statement, parameters, duration_ms, plan)
@@ -0,0 +1,204 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
+
+# Параметры кэша запросов
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+# Серверные подготовленные запросы (PREPARE/EXECUTE) для пути pymysql
+DB_SERVER_PREPARE = os.getenv("DB_SERVER_PREPARE", "false").lower() in ("1", "true", "yes")
+DB_SERVER_PREPARE_MAX = int(os.getenv("DB_SERVER_PREPARE_MAX", "64"))
+
+# Код ошибки MySQL: неизвестный подготовленный запрос
+ER_UNKNOWN_STMT_HANDLER = 1243
+
+
+class StatementCache:
+    """
+    Ограниченный LRU-кэш готовых TextClause по форме запроса.
+
+    Форма - операция, таблица, набор колонок, режим поиска и т.п.;
+    значения всегда передаются параметрами, поэтому один объект запроса
+    переиспользуется для всех запросов той же формы. text() не разбирает
+    параметры заново, а кэш компиляции SQLAlchemy получает один и тот же
+    оператор.
+    """
+
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, TextClause]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def statement(self, key: Hashable, build: Callable[[], str]) -> TextClause:
+        """
+        Возвращает запрос формы key, строя SQL через build() только при промахе.
+        """
+        with self._lock:
+            statement = self._entries.get(key)
+            if statement is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return statement
+            self.misses += 1
+
+        statement = text(build())
+        with self._lock:
+            self._entries[key] = statement
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return statement
+
+    def text(self, sql: str) -> TextClause:
+        """
+        Запрос, собранный динамически: формой служит сам текст SQL.
+        """
+        return self.statement(sql, lambda: sql)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else None,
+            }
+
+
+# Общий кэш запросов для всех обработчиков
+statement_cache = StatementCache()
+
+
+def value_params(values: Sequence[Any]) -> Dict[str, Any]:
+    """
+    Параметры значений колонок для запросов insert_row/update_row: p_0, p_1, ...
+    """
+    return {f"p_{idx}": value for idx, value in enumerate(values)}
+
+
+def _placeholders(count: int) -> List[str]:
+    return [f":p_{idx}" for idx in range(count)]
+
+
+def insert_row(table_name: str, columns: Sequence[str]) -> TextClause:
+    columns = tuple(columns)
+    return statement_cache.statement(
+        ("insert", table_name, columns),
+        lambda: (
+            f"INSERT INTO `{table_name}` ({', '.join(f'`{col}`' for col in columns)}) "
+            f"VALUES ({', '.join(_placeholders(len(columns)))})"
+        )
+    )
+
+
+def _key_condition(key_columns: Sequence[str]) -> str:
+    # Условие по всем колонкам ключа: :k_0, :k_1, ...
+    return " AND ".join(f"`{col}` = :k_{idx}" for idx, col in enumerate(key_columns))
+
+
+def update_row(table_name: str, columns: Sequence[str], key_columns: Sequence[str]) -> TextClause:
+    """
+    UPDATE одной записи; значения ключа передаются параметрами :k_0, :k_1, ...
+    """
+    columns = tuple(columns)
+    key_columns = tuple(key_columns)
+    return statement_cache.statement(
+        ("update", table_name, columns, key_columns),
+        lambda: (
+            f"UPDATE `{table_name}` SET "
+            + ", ".join(f"`{col}` = {name}" for col, name in zip(columns, _placeholders(len(columns))))
+            + f" WHERE {_key_condition(key_columns)}"
+        )
+    )
+
+
+def select_row(table_name: str, key_columns: Sequence[str]) -> TextClause:
+    """
+    Чтение одной записи по ключу :k_0, :k_1, ...
+    """
+    key_columns = tuple(key_columns)
+    return statement_cache.statement(
+        ("select_row", table_name, key_columns),
+        lambda: f"SELECT * FROM `{table_name}` WHERE {_key_condition(key_columns)}"
+    )
+
+
+def delete_row(table_name: str, key_columns: Sequence[str]) -> TextClause:
+    """
+    Удаление одной записи по ключу :k_0, :k_1, ...
+    """
+    key_columns = tuple(key_columns)
+    return statement_cache.statement(
+        ("delete_row", table_name, key_columns),
+        lambda: f"DELETE FROM `{table_name}` WHERE {_key_condition(key_columns)}"
+    )
+
+
+class ServerPreparedStatements:
+    """
+    Серверные подготовленные запросы MySQL для соединения pymysql.
+
+    pymysql не поддерживает бинарный протокол подготовленных запросов,
+    поэтому используются SQL-команды PREPARE/EXECUTE: запрос разбирается
+    сервером один раз на соединение, а при выполнении передаются только
+    значения через пользовательские переменные. Подготовленные запросы
+    живут до закрытия соединения; сверх max_statements самые старые
+    освобождаются через DEALLOCATE PREPARE.
+
+    counters - общий для всех соединений словарь попаданий и промахов.
+    """
+
+    def __init__(self, max_statements: int = DB_SERVER_PREPARE_MAX, counters: Optional[Dict[str, int]] = None):
+        self.max_statements = max_statements
+        self.counters = counters if counters is not None else {"hits": 0, "misses": 0}
+        self._statements: "OrderedDict[str, str]" = OrderedDict()
+        self._counter = 0
+
+    def execute(self, cursor, sql: str, params: Optional[Sequence[Any]] = None) -> None:
+        """
+        Выполняет запрос с позиционными параметрами %s через PREPARE/EXECUTE.
+        Результат читается из cursor как обычно.
+        """
+        params = list(params or [])
+        name = self._statements.get(sql)
+        if name is None:
+            self.counters["misses"] += 1
+            self._counter += 1
+            name = f"stmt_{self._counter}"
+            cursor.execute(f"PREPARE {name} FROM %s", (sql.replace("%s", "?"),))
+            self._statements[sql] = name
+            while len(self._statements) > self.max_statements:
+                _, evicted = self._statements.popitem(last=False)
+                cursor.execute(f"DEALLOCATE PREPARE {evicted}")
+        else:
+            self.counters["hits"] += 1
+            self._statements.move_to_end(sql)
+
+        try:
+            self._execute_prepared(cursor, name, params)
+        except Exception as e:
+            # Соединение было переоткрыто и потеряло подготовленные запросы
+            if not e.args or e.args[0] != ER_UNKNOWN_STMT_HANDLER:
+                raise
+            self._statements.clear()
+            self.execute(cursor, sql, params)
+
+    @staticmethod
+    def _execute_prepared(cursor, name: str, params: List[Any]) -> None:
+        if not params:
+            cursor.execute(f"EXECUTE {name}")
+            return
+        variables = [f"@p_{idx}" for idx in range(len(params))]
+        cursor.execute("SET " + ", ".join(f"{var} = %s" for var in variables), params)
+        cursor.execute(f"EXECUTE {name} USING {', '.join(variables)}")
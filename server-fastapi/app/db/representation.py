@@ -0,0 +1,221 @@
+import os
+import re
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+from .schema_cache import ColumnInfo, TableSchema
+from .query_builder import statement_cache
+from .filters import select_list
+
+if TYPE_CHECKING:
+    from .row_key import RowKey
+
+# Значения заголовка Prefer: return=...
+RETURN_MINIMAL = "minimal"
+RETURN_REPRESENTATION = "representation"
+
+# Собирать запись из отправленных данных и значений по умолчанию (false - всегда перечитывать из базы)
+WRITE_REPRESENTATION_FROM_DATA = os.getenv("WRITE_REPRESENTATION_FROM_DATA", "true").lower() in ("1", "true", "yes")
+
+INTEGER_TYPES = ("tinyint", "smallint", "mediumint", "int", "integer", "bigint")
+DECIMAL_TYPES = ("decimal", "numeric")
+STRING_TYPES = ("varchar", "char", "tinytext", "text", "mediumtext", "longtext")
+
+_DECIMAL_SCALE = re.compile(r"^(?:decimal|numeric)\(\d+,(\d+)\)", re.IGNORECASE)
+
+# Значение, которое нельзя вывести без чтения из базы
+UNKNOWN = object()
+
+
+def parse_prefer(header: Optional[str]) -> Optional[str]:
+    """
+    Предпочтение return из заголовка Prefer (RFC 7240):
+    `Prefer: return=minimal` или `Prefer: return=representation`.
+    """
+    if not header:
+        return None
+    for preference in header.split(","):
+        name, _, value = preference.split(";")[0].partition("=")
+        if name.strip().lower() == "return":
+            value = value.strip().strip('"').lower()
+            if value in (RETURN_MINIMAL, RETURN_REPRESENTATION):
+                return value
+    return None
+
+
+def coerce_value(column: ColumnInfo, value: Any) -> Any:
+    """
+    Значение колонки в том виде, в каком его вернёт драйвер после записи,
+    или UNKNOWN, если это нельзя определить без чтения (даты, JSON, ENUM,
+    FLOAT, нечисловые строки в числовых колонках и т.п.).
+    """
+    if value is None:
+        return None if column.is_nullable == "YES" else UNKNOWN
+
+    data_type = column.data_type.lower()
+    if data_type in INTEGER_TYPES:
+        if isinstance(value, (bool, int)):
+            return int(value)
+        if isinstance(value, str) and re.fullmatch(r"[+-]?\d+", value.strip()):
+            return int(value)
+        return UNKNOWN
+
+    if data_type in DECIMAL_TYPES:
+        match = _DECIMAL_SCALE.match(column.column_type)
+        if not match or isinstance(value, bool) or not isinstance(value, (int, float, str, Decimal)):
+            return UNKNOWN
+        try:
+            number = Decimal(str(value).strip())
+        except InvalidOperation:
+            return UNKNOWN
+        if not number.is_finite():
+            return UNKNOWN
+        # MySQL округляет до масштаба колонки половиной вверх
+        return number.quantize(Decimal(1).scaleb(-int(match.group(1))), rounding=ROUND_HALF_UP)
+
+    if data_type == "double":
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+        return UNKNOWN
+
+    if data_type in STRING_TYPES:
+        if isinstance(value, bool) or not isinstance(value, (str, int)):
+            return UNKNOWN
+        text = str(value)
+        # CHAR возвращается без завершающих пробелов
+        return text.rstrip(" ") if data_type == "char" else text
+
+    return UNKNOWN
+
+
+def default_value(column: ColumnInfo) -> Any:
+    """
+    Значение по умолчанию колонки из метаданных или UNKNOWN для
+    вычисляемых на сервере значений (AUTO_INCREMENT, выражения,
+    CURRENT_TIMESTAMP, генерируемые колонки).
+    """
+    extra = column.extra.lower()
+    if "auto_increment" in extra or "generated" in extra:
+        return UNKNOWN
+
+    default = column.default
+    if default is None:
+        # Без значения по умолчанию NOT NULL колонка получает неявное значение
+        return None if column.is_nullable == "YES" else UNKNOWN
+    default = str(default)
+    # MariaDB хранит NULL и строковые литералы в кавычках, выражения - как есть
+    if default == "NULL":
+        return None if column.is_nullable == "YES" else UNKNOWN
+    if len(default) >= 2 and default[0] == default[-1] == "'":
+        default = default[1:-1].replace("''", "'")
+    elif "(" in default or default.upper().startswith(("CURRENT_", "NOW", "LOCALTIME")):
+        return UNKNOWN
+    return coerce_value(column, default)
+
+
+def select_columns(table_name: str, columns: List[str], key_columns: Sequence[str]):
+    """
+    Чтение выбранных колонок одной записи по ключу :k_0, :k_1, ...
+    """
+    columns = tuple(columns)
+    key_columns = tuple(key_columns)
+    return statement_cache.statement(
+        ("select_columns", table_name, columns, key_columns),
+        lambda: (
+            f"SELECT {select_list(list(columns))} FROM `{table_name}` WHERE "
+            + " AND ".join(f"`{col}` = :k_{idx}" for idx, col in enumerate(key_columns))
+        )
+    )
+
+
+def by_column(table: TableSchema, data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Данные с именами колонок из схемы: MySQL принимает имена в любом
+    регистре, а запись в ответе строится по именам из кэша схемы.
+    """
+    result = {}
+    for name, value in data.items():
+        column = table.column(name)
+        result[column.name if column is not None else name] = value
+    return result
+
+
+def _complete(db, table: TableSchema, key: Optional["RowKey"], values: Dict[str, Any], read_back: bool) -> Optional[Dict[str, Any]]:
+    missing = [name for name, value in values.items() if value is UNKNOWN]
+    if not missing:
+        return values
+    # Без ключа запись нельзя прочитать условием по индексу
+    key_values = key.from_row(values) if key is not None else None
+    if not read_back or key_values is None:
+        return None
+    row = db.execute(select_columns(table.name, missing, key.names), key.params(key_values)).fetchone()
+    if row is None:
+        return None
+    values.update(row._mapping)
+    return values
+
+
+def inserted_row(
+    db,
+    table: TableSchema,
+    key: Optional["RowKey"],
+    data: Dict[str, Any],
+    insert_id: Any,
+    read_back: bool = True
+) -> Optional[Dict[str, Any]]:
+    """
+    Запись после INSERT: отправленные значения и значения по умолчанию из
+    кэша схемы; из базы читаются только колонки, которые вычисляет сервер.
+
+    Args:
+        key: Ключ адресации записей таблицы (None - таблица без ключа)
+        read_back: Разрешить запрос к базе для недостающих колонок
+            (False - вернуть None, если запись нельзя собрать без запроса)
+    """
+    data = by_column(table, data)
+    key_values = dict(zip(key.names, key.inserted(data, insert_id) or ())) if key is not None else {}
+    values = {}
+    for column in table.columns:
+        if column.name in key_values:
+            values[column.name] = key_values[column.name]
+        elif column.name in data:
+            values[column.name] = coerce_value(column, data[column.name]) if WRITE_REPRESENTATION_FROM_DATA else UNKNOWN
+        else:
+            values[column.name] = default_value(column) if WRITE_REPRESENTATION_FROM_DATA else UNKNOWN
+    return _complete(db, table, key, values, read_back)
+
+
+def updated_row(
+    db,
+    table: TableSchema,
+    key: "RowKey",
+    data: Dict[str, Any],
+    key_values: Tuple[Any, ...],
+    read_back: bool = True
+) -> Optional[Dict[str, Any]]:
+    """
+    Запись после UPDATE: изменённые колонки берутся из отправленных данных,
+    остальные (и колонки ON UPDATE CURRENT_TIMESTAMP) читаются одним
+    запросом по ключу.
+
+    Args:
+        key_values: Значения ключа записи после изменения
+    """
+    data = by_column(table, data)
+    values = {}
+    for column in table.columns:
+        if column.name in data and WRITE_REPRESENTATION_FROM_DATA and "on update" not in column.extra.lower():
+            values[column.name] = coerce_value(column, data[column.name])
+        else:
+            values[column.name] = UNKNOWN
+    values.update(key.as_dict(key_values))
+    return _complete(db, table, key, values, read_back)
+
+
+def representation_split(prefer: Optional[str]) -> Tuple[bool, str]:
+    """
+    Нужна ли запись в ответе и значение для заголовка Preference-Applied.
+    """
+    if prefer == RETURN_MINIMAL:
+        return False, f"return={RETURN_MINIMAL}"
+    return True, f"return={RETURN_REPRESENTATION}"
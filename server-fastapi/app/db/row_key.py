@@ -0,0 +1,226 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+from urllib.parse import quote, unquote
+
+from .schema_cache import ColumnInfo, TableSchema
+from .representation import INTEGER_TYPES, UNKNOWN, coerce_value
+
+# Разделитель значений составного ключа в пути: /data/{k1},{k2}
+KEY_SEPARATOR = ","
+
+
+class RowKeyError(ValueError):
+    """Ключ записи некорректен или таблица не позволяет адресовать одну запись"""
+
+
+@dataclass
+class RowKey:
+    """
+    Колонки уникального индекса, по которым адресуется одна запись.
+
+    Условие WHERE всегда строится по всем колонкам индекса, поэтому
+    запись находится поиском по индексу, а не просмотром таблицы.
+    Значения ключа - кортеж в порядке колонок индекса.
+    """
+    index_name: str
+    columns: List[ColumnInfo]
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return tuple(column.name for column in self.columns)
+
+    @property
+    def composite(self) -> bool:
+        return len(self.columns) > 1
+
+    def parse(self, raw: Any) -> Tuple[Any, ...]:
+        """
+        Значения ключа из запроса.
+
+        Принимаются: строка (`42` или `7,2024-01-01` для составного ключа),
+        список значений в порядке колонок или объект {колонка: значение}.
+        Строка не декодируется; значение с запятой передаётся списком или
+        объектом, а в пути - через from_path.
+
+        Raises:
+            RowKeyError: Не хватает значений, лишние колонки или значение
+                не подходит к типу колонки
+        """
+        if isinstance(raw, Mapping):
+            raw = _lowered(raw)
+            names = [name.lower() for name in self.names]
+            unknown = [name for name in raw if name not in names]
+            missing = [name for name in names if name not in raw]
+            if unknown or missing:
+                raise RowKeyError(f"Ключ записи должен содержать колонки: {', '.join(self.names)}")
+            values = [raw[name] for name in names]
+        elif isinstance(raw, (list, tuple)):
+            values = list(raw)
+        elif isinstance(raw, str) and self.composite:
+            values = raw.split(KEY_SEPARATOR)
+        else:
+            values = [raw]
+
+        if len(values) != len(self.columns):
+            raise RowKeyError(
+                f"Ключ записи состоит из {len(self.columns)} колонок ({', '.join(self.names)}), "
+                f"передано значений: {len(values)}"
+            )
+        return tuple(self._coerce(column, value) for column, value in zip(self.columns, values))
+
+    def from_path(self, segment: str) -> Tuple[Any, ...]:
+        """
+        Значения ключа из сегмента пути до URL-декодирования.
+
+        Сегмент делится по запятым, и каждая часть декодируется один раз -
+        так же, как ключ из одной колонки: запятая внутри значения
+        передаётся как %2C (`/data/7,a%2Cb` - ключ (7, "a,b")).
+        """
+        if self.composite:
+            return self.parse([unquote(part) for part in segment.split(KEY_SEPARATOR)])
+        return self.parse(unquote(segment))
+
+    @staticmethod
+    def _coerce(column: ColumnInfo, value: Any) -> Any:
+        if value is None or isinstance(value, (dict, list)):
+            raise RowKeyError(f"Некорректное значение ключа для колонки '{column.name}'")
+        coerced = coerce_value(column, value)
+        if coerced is UNKNOWN:
+            # Строка в целочисленной колонке сравнивалась бы с приведением к 0
+            if column.data_type.lower() in INTEGER_TYPES:
+                raise RowKeyError(f"Значение ключа '{value}' для колонки '{column.name}' должно быть целым числом")
+            return value
+        return coerced
+
+    def from_row(self, row: Mapping[str, Any]) -> Optional[Tuple[Any, ...]]:
+        """
+        Значения ключа из записи или None, если какое-то из них неизвестно.
+        """
+        values = tuple(row.get(name, UNKNOWN) for name in self.names)
+        if any(value is UNKNOWN or value is None for value in values):
+            return None
+        return values
+
+    def inserted(self, data: Mapping[str, Any], insert_id: Any) -> Optional[Tuple[Any, ...]]:
+        """
+        Ключ вставленной записи: отправленные значения и lastrowid для
+        колонки AUTO_INCREMENT (или единственной колонки ключа).
+        """
+        data = _lowered(data)
+        values = []
+        for column in self.columns:
+            name = column.name.lower()
+            if data.get(name) is not None:
+                try:
+                    values.append(self._coerce(column, data[name]))
+                except RowKeyError:
+                    return None
+            elif insert_id and (not self.composite or "auto_increment" in column.extra.lower()):
+                values.append(insert_id)
+            else:
+                return None
+        return tuple(values)
+
+    def after_update(self, values: Tuple[Any, ...], data: Mapping[str, Any]) -> Tuple[Any, ...]:
+        """
+        Ключ записи после изменения: колонки ключа могли быть в данных.
+        """
+        data = _lowered(data)
+        return tuple(
+            self._coerce(column, data[column.name.lower()]) if column.name.lower() in data else value
+            for column, value in zip(self.columns, values)
+        )
+
+    def identity(self, values: Sequence[Any]) -> Any:
+        """
+        Ключ в ответах и журнале изменений: значение для ключа из одной
+        колонки, объект {колонка: значение} для составного.
+        """
+        if not self.composite:
+            return values[0]
+        return dict(zip(self.names, values))
+
+    def as_dict(self, values: Sequence[Any]) -> Dict[str, Any]:
+        return dict(zip(self.names, values))
+
+    def params(self, values: Sequence[Any]) -> Dict[str, Any]:
+        """
+        Параметры условия по ключу (:k_0, :k_1, ...) для запросов query_builder.
+        """
+        return {f"k_{idx}": value for idx, value in enumerate(values)}
+
+    def in_condition(self, keys: Sequence[Sequence[Any]], prefix: str = "id") -> Tuple[str, Dict[str, Any]]:
+        """
+        Условие выбора нескольких записей: `pk IN (...)` или
+        `(k1, k2) IN ((...), (...))` для составного ключа.
+        """
+        params: Dict[str, Any] = {}
+        groups = []
+        for row_idx, values in enumerate(keys):
+            names = [f"{prefix}_{row_idx}_{col_idx}" for col_idx in range(len(self.columns))]
+            params.update(zip(names, values))
+            placeholders = ", ".join(":" + name for name in names)
+            groups.append(f"({placeholders})" if self.composite else placeholders)
+        columns = ", ".join(f"`{name}`" for name in self.names)
+        target = f"({columns})" if self.composite else columns
+        return f"{target} IN ({', '.join(groups)})", params
+
+
+def path_segment(scope: Mapping[str, Any], value: str) -> str:
+    """
+    Последний сегмент пути запроса до URL-декодирования (ASGI raw_path).
+
+    Если сервер не передал raw_path или сегмент не совпадает с
+    параметром пути, возвращается закодированный параметр.
+    """
+    raw_path = scope.get("raw_path")
+    if raw_path:
+        segment = raw_path.decode("latin-1").partition("?")[0].rsplit("/", 1)[-1]
+        if unquote(segment) == value:
+            return segment
+    return quote(value, safe=KEY_SEPARATOR)
+
+
+def _lowered(data: Mapping[str, Any]) -> Dict[str, Any]:
+    # Имена колонок в MySQL не зависят от регистра
+    return {str(name).lower(): value for name, value in data.items()}
+
+
+def find_key(table: TableSchema) -> Optional[RowKey]:
+    """
+    Ключ адресации записей таблицы: первичный ключ, иначе самый короткий
+    уникальный индекс, все колонки которого NOT NULL. None, если такого
+    индекса нет.
+    """
+    names = table.key_columns
+    if not names:
+        return None
+    index = next(
+        (
+            index for index in table.indexes.values()
+            if index.unique and index.columns == names and (index.index_type or "").upper() not in ("FULLTEXT", "SPATIAL")
+        ),
+        None
+    )
+    columns = [table.column(name) for name in names]
+    if index is None or any(column is None for column in columns):
+        return None
+    return RowKey(index_name=index.name, columns=columns)
+
+
+def resolve_key(table: TableSchema) -> RowKey:
+    """
+    Ключ адресации записей для изменения и удаления.
+
+    Raises:
+        RowKeyError: У таблицы нет первичного ключа и уникального индекса
+            без NULL - изменение по ключу просматривало бы таблицу и могло
+            затронуть несколько записей
+    """
+    key = find_key(table)
+    if key is None:
+        raise RowKeyError(
+            f"Таблица '{table.name}' не имеет первичного ключа или уникального индекса без NULL: "
+            f"изменение и удаление отдельных записей невозможно"
+        )
+    return key
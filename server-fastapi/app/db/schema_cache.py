@@ -0,0 +1,360 @@
+import os
+import time
+import threading
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .keyset import choose_unique_key
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Параметры кэша метаданных схемы
+SCHEMA_CACHE_TTL = float(os.getenv("SCHEMA_CACHE_TTL", "300"))
+SCHEMA_CACHE_MAX_TABLES = int(os.getenv("SCHEMA_CACHE_MAX_TABLES", "512"))
+SCHEMA_CACHE_DETECT_CHANGES = os.getenv("SCHEMA_CACHE_DETECT_CHANGES", "false").lower() in ("1", "true", "yes")
+
+# Как часто можно перечитывать список таблиц, если запрошена неизвестная таблица
+NEGATIVE_LOOKUP_INTERVAL = 5.0
+
+# Запросы к information_schema в стиле параметров драйвера (pyformat),
+# чтобы их можно было выполнять как через SQLAlchemy, так и через pymysql
+DATABASE_NAME_SQL = "SELECT DATABASE() AS db_name"
+
+TABLES_SQL = """
+    SELECT
+        table_name AS table_name,
+        create_time AS create_time,
+        update_time AS update_time
+    FROM information_schema.tables
+    WHERE table_schema = %(db_name)s
+    ORDER BY table_name
+"""
+
+TABLE_VERSION_SQL = """
+    SELECT
+        create_time AS create_time,
+        update_time AS update_time
+    FROM information_schema.tables
+    WHERE table_schema = %(db_name)s AND table_name = %(table_name)s
+"""
+
+COLUMNS_SQL = """
+    SELECT
+        column_name AS column_name,
+        data_type AS data_type,
+        column_type AS column_type,
+        is_nullable AS is_nullable,
+        column_default AS column_default,
+        column_key AS column_key,
+        extra AS extra
+    FROM information_schema.columns
+    WHERE table_schema = %(db_name)s AND table_name = %(table_name)s
+    ORDER BY ordinal_position
+"""
+
+INDEXES_SQL = """
+    SELECT
+        index_name AS index_name,
+        column_name AS column_name,
+        non_unique AS non_unique,
+        nullable AS nullable,
+        index_type AS index_type
+    FROM information_schema.statistics
+    WHERE table_schema = %(db_name)s AND table_name = %(table_name)s
+    ORDER BY index_name, seq_in_index
+"""
+
+
+@dataclass
+class ColumnInfo:
+    name: str
+    data_type: str
+    column_type: str
+    is_nullable: str
+    default: Any = None
+    column_key: str = ""
+    extra: str = ""
+
+
+@dataclass
+class IndexInfo:
+    name: str
+    columns: List[str]
+    unique: bool
+    nullable: bool
+    index_type: str = "BTREE"
+
+
+@dataclass
+class TableSchema:
+    name: str
+    columns: List[ColumnInfo]
+    indexes: Dict[str, IndexInfo] = field(default_factory=dict)
+    create_time: Any = None
+    update_time: Any = None
+
+    @property
+    def column_names(self) -> List[str]:
+        return [col.name for col in self.columns]
+
+    @property
+    def primary_key(self) -> List[str]:
+        index = self.indexes.get("PRIMARY")
+        return list(index.columns) if index else []
+
+    @property
+    def key_columns(self) -> List[str]:
+        """Первичный ключ или самый короткий уникальный индекс без NULL"""
+        return choose_unique_key(
+            (index.name, col, "YES" if index.nullable else "")
+            for index in self.indexes.values() if index.unique
+            for col in index.columns
+        )
+
+    def column(self, name: str) -> Optional[ColumnInfo]:
+        for col in self.columns:
+            if col.name == name:
+                return col
+        # Имена колонок в MySQL не зависят от регистра
+        lowered = name.lower()
+        for col in self.columns:
+            if col.name.lower() == lowered:
+                return col
+        return None
+
+
+class SchemaCatalog:
+    """
+    Кэш метаданных схемы: список таблиц, колонки, типы и индексы.
+
+    Записи хранятся в пределах TTL, количество таблиц ограничено
+    (вытесняются давно не использованные). При включённом обнаружении
+    изменений устаревшая запись не перечитывается целиком, если
+    CREATE_TIME/UPDATE_TIME таблицы в information_schema не изменились.
+
+    Способ выполнения запросов задаётся в наследниках через `_fetch_all`.
+    """
+
+    def __init__(
+        self,
+        ttl: float = SCHEMA_CACHE_TTL,
+        max_tables: int = SCHEMA_CACHE_MAX_TABLES,
+        detect_changes: bool = SCHEMA_CACHE_DETECT_CHANGES,
+    ):
+        self.ttl = ttl
+        self.max_tables = max_tables
+        self.detect_changes = detect_changes
+        self._lock = threading.RLock()
+        self._database_names: Dict[str, str] = {}
+        self._table_lists: Dict[str, Tuple[List[str], float]] = {}
+        self._tables: "OrderedDict[Tuple[str, str], Tuple[TableSchema, float]]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "revalidations": 0, "evictions": 0}
+
+    # Методы, зависящие от способа подключения к базе данных
+
+    def _fetch_all(self, db: Any, sql: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def _bind_key(self, db: Any) -> str:
+        raise NotImplementedError
+
+    # Публичный интерфейс
+
+    def get_database_name(self, db: Any) -> Optional[str]:
+        """
+        Возвращает имя текущей базы данных (запрашивается один раз на подключение).
+        """
+        bind_key = self._bind_key(db)
+        with self._lock:
+            db_name = self._database_names.get(bind_key)
+        if db_name:
+            return db_name
+
+        rows = self._fetch_all(db, DATABASE_NAME_SQL)
+        db_name = rows[0]["db_name"] if rows else None
+        if db_name:
+            with self._lock:
+                self._database_names[bind_key] = db_name
+        return db_name
+
+    def get_tables(self, db: Any, max_age: Optional[float] = None) -> List[str]:
+        """
+        Возвращает список таблиц текущей базы данных.
+
+        Args:
+            db: Подключение к базе данных
+            max_age: Максимальный возраст закэшированного списка в секундах
+                (по умолчанию - TTL кэша)
+        """
+        db_name = self._require_database_name(db)
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            cached = self._table_lists.get(db_name)
+            if cached and time.monotonic() - cached[1] < max_age:
+                self._stats["hits"] += 1
+                return list(cached[0])
+            self._stats["misses"] += 1
+
+        rows = self._fetch_all(db, TABLES_SQL, {"db_name": db_name})
+        tables = [row["table_name"] for row in rows]
+        versions = {row["table_name"]: (row["create_time"], row["update_time"]) for row in rows}
+
+        with self._lock:
+            self._table_lists[db_name] = (tables, time.monotonic())
+            # Удалённые или пересозданные таблицы вытесняем сразу
+            for key in [k for k in self._tables if k[0] == db_name]:
+                schema = self._tables[key][0]
+                if versions.get(key[1], (None, None))[0] != schema.create_time:
+                    del self._tables[key]
+                    self._stats["evictions"] += 1
+        return list(tables)
+
+    def get_table(self, db: Any, table_name: str) -> Optional[TableSchema]:
+        """
+        Возвращает метаданные таблицы или None, если таблицы нет.
+        """
+        db_name = self._require_database_name(db)
+        key = (db_name, table_name)
+        now = time.monotonic()
+
+        with self._lock:
+            cached = self._tables.get(key)
+            if cached and now - cached[1] < self.ttl:
+                self._tables.move_to_end(key)
+                self._stats["hits"] += 1
+                return cached[0]
+
+        if cached and self.detect_changes:
+            rows = self._fetch_all(db, TABLE_VERSION_SQL, {"db_name": db_name, "table_name": table_name})
+            schema = cached[0]
+            if rows and (rows[0]["create_time"], rows[0]["update_time"]) == (schema.create_time, schema.update_time):
+                with self._lock:
+                    self._tables[key] = (schema, now)
+                    self._tables.move_to_end(key)
+                    self._stats["revalidations"] += 1
+                return schema
+
+        if not cached and table_name not in self.get_tables(db):
+            # Неизвестная таблица: перечитываем список не чаще раза в несколько секунд
+            if table_name not in self.get_tables(db, max_age=NEGATIVE_LOOKUP_INTERVAL):
+                return None
+
+        with self._lock:
+            self._stats["misses"] += 1
+        schema = self._load_table(db, db_name, table_name)
+        if schema is None:
+            self.invalidate(table_name)
+            return None
+
+        with self._lock:
+            self._tables[key] = (schema, time.monotonic())
+            self._tables.move_to_end(key)
+            while len(self._tables) > self.max_tables:
+                self._tables.popitem(last=False)
+                self._stats["evictions"] += 1
+        return schema
+
+    def invalidate(self, table_name: Optional[str] = None) -> int:
+        """
+        Сбрасывает кэш для таблицы (во всех базах) или целиком.
+
+        Returns:
+            Количество удалённых записей о таблицах
+        """
+        with self._lock:
+            if table_name is None:
+                removed = len(self._tables)
+                self._tables.clear()
+                self._table_lists.clear()
+                self._database_names.clear()
+                return removed
+
+            keys = [k for k in self._tables if k[1] == table_name]
+            for key in keys:
+                del self._tables[key]
+            # Список таблиц тоже мог измениться (таблицу создали или удалили)
+            self._table_lists.clear()
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "tables_cached": len(self._tables),
+                "max_tables": self.max_tables,
+                "ttl": self.ttl,
+                "detect_changes": self.detect_changes,
+            }
+
+    # Вспомогательные методы
+
+    def _require_database_name(self, db: Any) -> str:
+        db_name = self.get_database_name(db)
+        if not db_name:
+            raise LookupError("Не удалось определить имя базы данных")
+        return db_name
+
+    def _load_table(self, db: Any, db_name: str, table_name: str) -> Optional[TableSchema]:
+        params = {"db_name": db_name, "table_name": table_name}
+        column_rows = self._fetch_all(db, COLUMNS_SQL, params)
+        if not column_rows:
+            return None
+
+        columns = [
+            ColumnInfo(
+                name=row["column_name"],
+                data_type=row["data_type"],
+                column_type=row["column_type"],
+                is_nullable=row["is_nullable"],
+                default=row["column_default"],
+                column_key=row["column_key"] or "",
+                extra=row["extra"] or "",
+            ) for row in column_rows
+        ]
+
+        indexes: Dict[str, IndexInfo] = {}
+        for row in self._fetch_all(db, INDEXES_SQL, params):
+            index = indexes.get(row["index_name"])
+            if index is None:
+                index = indexes[row["index_name"]] = IndexInfo(
+                    name=row["index_name"],
+                    columns=[],
+                    unique=not int(row["non_unique"]),
+                    nullable=False,
+                    index_type=row["index_type"],
+                )
+            index.columns.append(row["column_name"])
+            if row["nullable"] == "YES":
+                index.nullable = True
+
+        version_rows = self._fetch_all(db, TABLE_VERSION_SQL, params)
+        create_time, update_time = (
+            (version_rows[0]["create_time"], version_rows[0]["update_time"]) if version_rows else (None, None)
+        )
+
+        logger.info(f"Загружены метаданные таблицы '{table_name}': {len(columns)} колонок, {len(indexes)} индексов")
+        return TableSchema(
+            name=table_name,
+            columns=columns,
+            indexes=indexes,
+            create_time=create_time,
+            update_time=update_time,
+        )
+
+
+class SessionSchemaCatalog(SchemaCatalog):
+    """Кэш метаданных схемы для сессий SQLAlchemy"""
+
+    def _fetch_all(self, db, sql, params=None):
+        result = db.connection().exec_driver_sql(sql, params or {})
+        return [dict(row._mapping) for row in result]
+
+    def _bind_key(self, db):
+        return str(db.get_bind().url)
+
+
+# Общий кэш метаданных для всех обработчиков приложения
+schema_catalog = SessionSchemaCatalog()
@@ -0,0 +1,110 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from .schema_cache import IndexInfo, TableSchema
+
+# Режимы поиска
+SEARCH_FULLTEXT = "fulltext"
+SEARCH_LIKE = "like"
+
+# Типы колонок, по которым выполняется текстовый поиск
+TEXT_TYPES = {"char", "varchar", "tinytext", "text", "mediumtext", "longtext", "enum", "set"}
+# Типы, которые можно включить в FULLTEXT-индекс
+FULLTEXT_TYPES = {"char", "varchar", "tinytext", "text", "mediumtext", "longtext"}
+# Числовые типы: для них поиск сводится к сравнению на равенство
+NUMERIC_TYPES = {"tinyint", "smallint", "mediumint", "int", "integer", "bigint", "decimal", "numeric", "float", "double"}
+
+# Минимальная длина слова, которое индексирует FULLTEXT InnoDB (innodb_ft_min_token_size)
+FULLTEXT_MIN_TOKEN_SIZE = 3
+
+# Операторы логического режима MATCH ... AGAINST, которые нужно убрать из запроса пользователя
+_BOOLEAN_OPERATORS = re.compile(r'[+\-<>()~*"@]+')
+_NUMBER = re.compile(r"^-?\d+(\.\d+)?$")
+
+
+def text_columns(table: TableSchema) -> List[str]:
+    return [col.name for col in table.columns if col.data_type.lower() in TEXT_TYPES]
+
+
+def fulltext_columns(table: TableSchema) -> List[str]:
+    return [col.name for col in table.columns if col.data_type.lower() in FULLTEXT_TYPES]
+
+
+def find_fulltext_index(table: TableSchema) -> Optional[IndexInfo]:
+    """
+    Возвращает FULLTEXT-индекс таблицы, покрывающий больше всего колонок.
+    """
+    indexes = [index for index in table.indexes.values() if index.index_type == "FULLTEXT"]
+    if not indexes:
+        return None
+    return max(indexes, key=lambda index: len(index.columns))
+
+
+def _boolean_query(search: str) -> Optional[str]:
+    """
+    Превращает строку поиска в запрос логического режима: каждое слово
+    обязательно и ищется по префиксу. Возвращает None, если ни одно слово
+    не проиндексировано FULLTEXT (слишком короткие слова).
+    """
+    words = [w for w in _BOOLEAN_OPERATORS.sub(" ", search).split() if len(w) >= FULLTEXT_MIN_TOKEN_SIZE]
+    if not words:
+        return None
+    return " ".join(f"+{word}*" for word in words)
+
+
+def build_search_condition(table: TableSchema, search: str) -> Tuple[str, Dict[str, Any], str]:
+    """
+    Строит условие WHERE для глобального поиска по таблице.
+
+    Если у таблицы есть FULLTEXT-индекс, используется MATCH ... AGAINST по
+    его колонкам. Иначе выполняется LIKE только по текстовым колонкам
+    (без приведения чисел и дат к строке), а числовой запрос сравнивается
+    с числовыми колонками на равенство.
+
+    Args:
+        table: Метаданные таблицы
+        search: Поисковый запрос
+
+    Returns:
+        Кортеж (SQL-условие, параметры, режим поиска)
+    """
+    index = find_fulltext_index(table)
+    boolean_query = _boolean_query(search) if index else None
+    if index and boolean_query:
+        columns = ", ".join(f"`{col}`" for col in index.columns)
+        return f"MATCH({columns}) AGAINST (:search_ft IN BOOLEAN MODE)", {"search_ft": boolean_query}, SEARCH_FULLTEXT
+
+    conditions = []
+    params: Dict[str, Any] = {}
+    for idx, col in enumerate(text_columns(table)):
+        param_name = f"search_{idx}"
+        conditions.append(f"`{col}` LIKE :{param_name}")
+        params[param_name] = f"%{search}%"
+
+    if _NUMBER.match(search.strip()):
+        numeric = [col.name for col in table.columns if col.data_type.lower() in NUMERIC_TYPES]
+        for col in numeric:
+            conditions.append(f"`{col}` = :search_number")
+        if numeric:
+            params["search_number"] = search.strip()
+
+    if not conditions:
+        # Искать не по чему: ни текстовых колонок, ни числового запроса
+        return "(1 = 0)", {}, SEARCH_LIKE
+    return "(" + " OR ".join(conditions) + ")", params, SEARCH_LIKE
+
+
+def recommend_fulltext_index(table: TableSchema) -> Optional[Tuple[str, List[str], str]]:
+    """
+    Рекомендуемый FULLTEXT-индекс по всем текстовым колонкам таблицы.
+
+    Returns:
+        Кортеж (имя индекса, колонки, DDL) или None, если текстовых колонок нет
+    """
+    columns = fulltext_columns(table)
+    if not columns:
+        return None
+    index_name = "ft_search"
+    column_list = ", ".join(f"`{col}`" for col in columns)
+    ddl = f"ALTER TABLE `{table.name}` ADD FULLTEXT INDEX `{index_name}` ({column_list})"
+    return index_name, columns, ddl
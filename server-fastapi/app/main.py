@@ -1,22 +1,72 @@
 import os
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from .routers import data_routes
+from starlette.concurrency import run_in_threadpool
+from .routers import data_routes, admin_routes, health_routes, export_routes, bulk_routes, metrics_routes, debug_routes, changes_routes, batch_routes
+from .db.database import SessionLocal, engine, dispose_engines
+from .db.replicas import ReplicaStickyMiddleware, replica_router
+from .db.schema_cache import schema_catalog
+from .utils.metrics import MetricsMiddleware
 
-# Настройка логирования
+# Настройка логирования. Строки с данными записей и текстом SQL пишутся
+# на уровне DEBUG и включаются через LOG_LEVEL=DEBUG
 logging.basicConfig(level=logging.INFO)
+logging.getLogger().setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
 # Загрузка переменных окружения
 load_dotenv()
 
+# Прогрев кэша схемы при старте
+SCHEMA_CACHE_WARMUP = os.getenv("SCHEMA_CACHE_WARMUP", "true").lower() in ("1", "true", "yes")
+
+_preloaded = False
+
+# Загрузка метаданных всех таблиц в кэш схемы
+def preload_schema_cache(dispose: bool = False) -> int:
+    """
+    Заполняет кэш метаданных схемы всеми таблицами базы данных.
+
+    При запуске с предзагрузкой (gunicorn --preload) вызывается в главном
+    процессе до fork, и воркеры наследуют готовый кэш; dispose=True закрывает
+    использованные соединения, чтобы воркеры не разделяли сокеты. Ошибка
+    подключения не мешает запуску: кэш заполнится при первых запросах.
+    """
+    global _preloaded
+    loaded = 0
+    try:
+        with SessionLocal() as db:
+            for table_name in schema_catalog.get_tables(db)[:schema_catalog.max_tables]:
+                if schema_catalog.get_table(db, table_name) is not None:
+                    loaded += 1
+        _preloaded = True
+        logger.info(f"Кэш схемы заполнен: {loaded} таблиц")
+    except Exception as e:
+        logger.warning(f"Не удалось заполнить кэш схемы: {e}")
+    finally:
+        if dispose:
+            engine.dispose()
+    return loaded
+
+# Запуск и остановка воркера
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if SCHEMA_CACHE_WARMUP and not _preloaded:
+        await run_in_threadpool(preload_schema_cache)
+    yield
+    # uvicorn вызывает остановку после завершения обрабатываемых запросов
+    await dispose_engines()
+    await replica_router.dispose()
+
 # Создание приложения FastAPI
 app = FastAPI(
     title="Конструктивный API для MySQL",
     description="API для управления базой данных MySQL",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Настройка CORS
@@ -30,8 +80,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Чтения клиента после его записи идут в основную базу, а не на реплики
+app.add_middleware(ReplicaStickyMiddleware)
+
+# Метрики запросов и заголовок Server-Timing (добавляется последним, чтобы учитывать всё время запроса)
+app.add_middleware(MetricsMiddleware)
+
 # Подключение маршрутов
 app.include_router(data_routes.router)
+app.include_router(export_routes.router)
+app.include_router(bulk_routes.router)
+app.include_router(changes_routes.router)
+app.include_router(batch_routes.router)
+app.include_router(admin_routes.router)
+app.include_router(health_routes.router)
+app.include_router(metrics_routes.router)
+app.include_router(debug_routes.router)
 
 # Корневой маршрут
 @app.get("/")
@@ -53,4 +117,6 @@ if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("API_PORT", 5000))
     logger.info(f"Запуск сервера на порту {port}")
-    uvicorn.run("app.main:app", host="0.0.0.0", port=port, reload=True) 
\ No newline at end of file
+    # Автоперезапуск при изменении файлов - только для разработки (API_RELOAD=true)
+    reload = os.getenv("API_RELOAD", "false").lower() in ("1", "true", "yes")
+    uvicorn.run("app.main:app", host="0.0.0.0", port=port, reload=reload) 
\ No newline at end of file
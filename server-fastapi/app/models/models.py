@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Literal, Optional, Union
 from datetime import date, datetime
 
 # Общие модели данных
@@ -7,6 +7,12 @@ class TableData(BaseModel):
     data: List[Dict[str, Any]]
     pagination: Dict[str, Any]
 
+# Компактное представление данных: имена колонок один раз, строки - массивами
+class CompactTableData(BaseModel):
+    columns: List[str]
+    rows: List[List[Any]]
+    pagination: Dict[str, Any]
+
 class TableColumn(BaseModel):
     column_name: str
     data_type: str
@@ -28,6 +34,47 @@ class DeletedRow(BaseModel):
     message: str
     deleted: Dict[str, Any]
 
+# Массовые операции: записи выбираются списком ids или фильтром
+class BulkUpdateRequest(BaseModel):
+    ids: Optional[List[Any]] = None
+    filter: Optional[Dict[str, Any]] = None
+    data: Dict[str, Any]
+
+class BulkDeleteRequest(BaseModel):
+    ids: Optional[List[Any]] = None
+    filter: Optional[Dict[str, Any]] = None
+
+class BulkMutationResult(BaseModel):
+    message: str
+    affected: int
+    data: Optional[List[Dict[str, Any]]] = None
+
+# Пакет операций над записями разных таблиц
+class BatchOperation(BaseModel):
+    op: Literal["insert", "update", "delete"]
+    table: str
+    id: Optional[Any] = None
+    data: Optional[Dict[str, Any]] = None
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+
+class BatchOperationResult(BaseModel):
+    index: int
+    op: str
+    table: str
+    status: str
+    id: Optional[Any] = None
+    affected: int = 0
+    data: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+class BatchResult(BaseModel):
+    message: str
+    committed: bool
+    errors: int
+    results: List[BatchOperationResult]
+
 # Функция для создания динамической Pydantic модели
 def create_dynamic_model(name: str, fields: Dict[str, Any]):
     """
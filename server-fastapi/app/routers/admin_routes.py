@@ -0,0 +1,128 @@
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from typing import Optional
+import logging
+from ..db.database import DBSession, get_session, run_db
+from ..db.schema_cache import schema_catalog
+from ..db.query_builder import statement_cache
+from ..db.search import find_fulltext_index, recommend_fulltext_index
+from ..db.replicas import replica_router
+from ..utils.response_cache import response_cache, SCOPE_TABLES
+from ..utils.singleflight import singleflight
+from ..utils.metrics import TimedRoute
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Создание роутера служебных операций
+router = APIRouter(prefix="/api/admin", tags=["admin"], route_class=TimedRoute)
+
+# Сброс кэша метаданных схемы
+@router.post("/schema/invalidate")
+async def invalidate_schema_cache(
+    table_name: Optional[str] = Query(None, description="Имя таблицы (если не задано - сбрасывается весь кэш)")
+):
+    """
+    Сброс кэша метаданных схемы после изменения структуры таблиц
+    """
+    removed = schema_catalog.invalidate(table_name)
+    # Закэшированные ответы построены по старой схеме
+    if table_name:
+        await response_cache.bump(table_name, SCOPE_TABLES)
+    else:
+        await response_cache.clear()
+        statement_cache.clear()
+    logger.info(f"Кэш схемы сброшен ({table_name or 'все таблицы'}), удалено записей: {removed}")
+    return {"message": "Кэш схемы сброшен", "table": table_name, "invalidated": removed}
+
+# Статистика кэша метаданных схемы
+@router.get("/schema/cache")
+async def get_schema_cache_stats():
+    """
+    Статистика кэша метаданных схемы
+    """
+    return schema_catalog.stats()
+
+# Статистика кэша подготовленных запросов
+@router.get("/query-cache")
+async def get_query_cache_stats():
+    """
+    Статистика кэша запросов по форме (попадания и промахи)
+    """
+    return statement_cache.stats()
+
+# Статистика кэша HTTP-ответов
+@router.get("/response-cache")
+async def get_response_cache_stats():
+    """
+    Статистика кэша ответов (попадания, промахи, ответы 304)
+    """
+    return response_cache.stats()
+
+# Статистика объединения одинаковых запросов
+@router.get("/singleflight")
+async def get_singleflight_stats():
+    """
+    Статистика объединения одновременных одинаковых запросов чтения
+    (выполненные вычисления, присоединившиеся запросы, ответы из микрокэша)
+    """
+    return singleflight.stats()
+
+# Состояние реплик для чтения
+@router.get("/replicas")
+async def get_replica_stats():
+    """
+    Маршрутизация чтений: реплики, их состояние и занятые соединения,
+    количество чтений с реплик, из основной базы и после записи клиента
+    """
+    return {**replica_router.stats(), "items": [replica.stats() for replica in replica_router.replicas]}
+
+# Создание рекомендуемого FULLTEXT-индекса
+def _create_fulltext_index(db: Session, table_name: str, dry_run: bool):
+    table = schema_catalog.get_table(db, table_name)
+    if table is None:
+        raise HTTPException(status_code=404, detail=f"Таблица '{table_name}' не найдена")
+    
+    recommendation = recommend_fulltext_index(table)
+    if recommendation is None:
+        raise HTTPException(status_code=400, detail=f"В таблице '{table_name}' нет текстовых колонок для FULLTEXT-индекса")
+    index_name, columns, ddl = recommendation
+    
+    existing = find_fulltext_index(table)
+    if existing and set(columns) <= set(existing.columns):
+        return {"message": "FULLTEXT-индекс уже существует", "index": existing.name, "columns": existing.columns}
+    if index_name in table.indexes:
+        raise HTTPException(status_code=409, detail=f"Индекс '{index_name}' уже существует в таблице '{table_name}'")
+    
+    if dry_run:
+        return {"message": "Рекомендуемый индекс", "index": index_name, "columns": columns, "sql": ddl}
+    
+    try:
+        logger.info(f"Создание FULLTEXT-индекса: {ddl}")
+        db.execute(text(ddl))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Ошибка при создании FULLTEXT-индекса для таблицы '{table_name}': {e}")
+        raise HTTPException(status_code=500, detail=f"Ошибка при создании индекса: {str(e)}")
+    finally:
+        schema_catalog.invalidate(table_name)
+    
+    return {"message": "FULLTEXT-индекс создан", "index": index_name, "columns": columns, "sql": ddl}
+
+@router.post("/tables/{table_name}/fulltext-index")
+async def create_fulltext_index(
+    table_name: str = Path(..., description="Имя таблицы"),
+    dry_run: bool = Query(False, description="Только показать рекомендуемый индекс, не создавая его"),
+    db: DBSession = Depends(get_session)
+):
+    """
+    Создание FULLTEXT-индекса по всем текстовым колонкам таблицы для поиска через MATCH ... AGAINST
+
+    На больших таблицах построение индекса занимает заметное время.
+    """
+    result = await run_db(db, _create_fulltext_index, table_name, dry_run)
+    if not dry_run:
+        await response_cache.bump(table_name)
+    return result
@@ -0,0 +1,226 @@
+import os
+import logging
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional, Tuple
+from ..db.database import DBSession, get_session, run_db
+from ..db import query_builder
+from ..db import representation
+from ..db.row_key import RowKey, RowKeyError, find_key, resolve_key
+from ..db.schema_cache import schema_catalog, TableSchema
+from ..db.counts import count_cache
+from ..utils.response_cache import response_cache
+from ..utils.changefeed import changefeed, OP_INSERT, OP_UPDATE, OP_DELETE
+from ..utils.metrics import TimedRoute
+from ..models.models import BatchOperation, BatchRequest, BatchResult
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Максимальное количество операций в одном пакете
+BATCH_MAX_OPERATIONS = int(os.getenv("BATCH_MAX_OPERATIONS", "1000"))
+
+# Создание роутера пакетов операций
+router = APIRouter(prefix="/api", tags=["batch"], route_class=TimedRoute)
+
+class BatchOperationError(ValueError):
+    """Ошибка отдельной операции пакета"""
+
+# Метаданные и ключ адресации каждой таблицы пакета (один раз на таблицу)
+def _resolve_tables(db: Session, operations: List[BatchOperation]) -> Dict[str, Tuple[TableSchema, Optional[RowKey]]]:
+    tables = {}
+    for table_name in dict.fromkeys(operation.table for operation in operations):
+        table = schema_catalog.get_table(db, table_name)
+        if table is not None:
+            tables[table_name] = (table, find_key(table))
+    return tables
+
+# Проверка операции без обращения к базе
+def _validate(operation: BatchOperation, tables: Dict[str, Tuple[TableSchema, Optional[RowKey]]]) -> None:
+    if operation.table not in tables:
+        raise BatchOperationError(f"Таблица '{operation.table}' не найдена")
+    table = tables[operation.table][0]
+    if operation.op != "insert":
+        if operation.id is None:
+            raise BatchOperationError("Не указан id записи")
+        # Изменение и удаление только по ключу, которому соответствует индекс
+        try:
+            key = resolve_key(table)
+            key_values = key.parse(operation.id)
+            if operation.op == "update" and operation.data:
+                key.after_update(key_values, operation.data)
+        except RowKeyError as e:
+            raise BatchOperationError(str(e))
+    if operation.op != "delete":
+        if not operation.data:
+            raise BatchOperationError("Отсутствуют данные операции")
+        unknown = [col for col in operation.data if table.column(col) is None]
+        if unknown:
+            raise BatchOperationError(f"Неизвестные колонки: {', '.join(unknown)}")
+
+def _read_row(db: Session, table_name: str, key: RowKey, key_values: Tuple[Any, ...]) -> Optional[Dict[str, Any]]:
+    row = db.execute(query_builder.select_row(table_name, key.names), key.params(key_values)).fetchone()
+    return dict(row._mapping) if row else None
+
+# Выполнение одной операции; возвращает результат и изменения для журнала
+def _apply(db: Session, operation: BatchOperation, table: TableSchema, key: Optional[RowKey], returning: bool):
+    table_name = operation.table
+
+    if operation.op == "insert":
+        data = operation.data
+        result = db.execute(query_builder.insert_row(table_name, data.keys()), query_builder.value_params(data.values()))
+        # Запись собирается из отправленных данных и значений по умолчанию
+        row = representation.inserted_row(db, table, key, data, result.lastrowid, read_back=returning)
+        key_values = None
+        if key is not None:
+            key_values = key.from_row(row) if row else key.inserted(data, result.lastrowid)
+        row_id = key.identity(key_values) if key_values else (result.lastrowid or None)
+        return {"id": row_id, "affected": result.rowcount, "data": row}, [(OP_INSERT, row_id, row)]
+
+    key_values = key.parse(operation.id)
+    if operation.op == "update":
+        data = operation.data
+        params = {**query_builder.value_params(data.values()), **key.params(key_values)}
+        result = db.execute(query_builder.update_row(table_name, data.keys(), key.names), params)
+        if result.rowcount == 0:
+            raise BatchOperationError(f"Запись с ID {operation.id} не найдена")
+        new_values = key.after_update(key_values, data)
+        new_id = key.identity(new_values)
+        row = representation.updated_row(db, table, key, data, new_values) if returning else None
+        if new_values != key_values:
+            changes = [(OP_DELETE, key.identity(key_values), None), (OP_INSERT, new_id, row)]
+        else:
+            changes = [(OP_UPDATE, new_id, row)]
+        return {"id": new_id, "affected": result.rowcount, "data": row}, changes
+
+    # Удаляемая запись читается до удаления
+    row = _read_row(db, table_name, key, key_values) if returning else None
+    result = db.execute(query_builder.delete_row(table_name, key.names), key.params(key_values))
+    if result.rowcount == 0:
+        raise BatchOperationError(f"Запись с ID {operation.id} не найдена")
+    row_id = key.identity(key_values)
+    return {"id": row_id, "affected": result.rowcount, "data": row}, [(OP_DELETE, row_id, None)]
+
+def _error_text(error: Exception) -> str:
+    # Для ошибок драйвера - только сообщение MySQL, без текста запроса
+    return str(getattr(error, "orig", None) or error)
+
+# Выполнение пакета операций в одной транзакции
+def _execute_batch(db: Session, operations: List[BatchOperation], on_error: str, returning: bool):
+    try:
+        tables = _resolve_tables(db, operations)
+        results: List[Dict[str, Any]] = []
+        changes: List[Tuple[str, str, int, List]] = []
+        errors = 0
+        for index, operation in enumerate(operations):
+            result = {"index": index, "op": operation.op, "table": operation.table, "id": operation.id, "status": "pending"}
+            results.append(result)
+            try:
+                _validate(operation, tables)
+            except BatchOperationError as e:
+                result.update({"status": "error", "error": str(e)})
+                errors += 1
+
+        # В режиме abort некорректный пакет не выполняется вовсе
+        if errors and on_error == "abort":
+            for result in results:
+                if result["status"] == "pending":
+                    result["status"] = "skipped"
+            db.rollback()
+            return {"committed": False, "errors": errors, "results": results}, []
+
+        for operation, result in zip(operations, results):
+            if result["status"] != "pending":
+                continue
+            if errors and on_error == "abort":
+                result["status"] = "skipped"
+                continue
+            # В режиме continue каждая операция выполняется внутри SAVEPOINT
+            savepoint = db.begin_nested() if on_error == "continue" else None
+            try:
+                outcome, operation_changes = _apply(db, operation, *tables[operation.table], returning)
+                if savepoint is not None:
+                    savepoint.commit()
+            except (BatchOperationError, SQLAlchemyError) as e:
+                if savepoint is not None:
+                    savepoint.rollback()
+                else:
+                    db.rollback()
+                result.update({"status": "error", "error": _error_text(e)})
+                logger.warning(f"Ошибка операции {result['index']} пакета ({operation.op} {operation.table}): {result['error']}")
+                errors += 1
+                continue
+            result.update(outcome)
+            result["status"] = "ok"
+            changes.append((operation.table, operation.op, outcome["affected"], operation_changes))
+
+        if errors and on_error == "abort":
+            # Транзакция уже откачена: выполненные операции не применены
+            for result in results:
+                if result["status"] == "ok":
+                    result.update({"status": "rolled_back", "data": None})
+            return {"committed": False, "errors": errors, "results": results}, []
+
+        db.commit()
+        return {"committed": True, "errors": errors, "results": results}, changes
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Ошибка выполнения пакета операций: {e}")
+        raise HTTPException(status_code=500, detail=f"Ошибка выполнения пакета операций: {str(e)}")
+
+# Обновление кэшей и журнала после фиксации пакета
+def _publish(changes: List[Tuple[str, str, int, List]]) -> List[str]:
+    by_table: Dict[str, List] = {}
+    for table_name, op, affected, operation_changes in changes:
+        if op == "insert":
+            count_cache.adjust(table_name, affected)
+        elif op == "delete":
+            count_cache.adjust(table_name, -affected)
+        else:
+            count_cache.invalidate(table_name, filtered_only=True)
+        by_table.setdefault(table_name, []).extend(operation_changes)
+    for table_name, table_changes in by_table.items():
+        changefeed.record(table_name, table_changes)
+    return list(by_table)
+
+@router.post("/batch", response_model=BatchResult)
+async def execute_batch(
+    payload: BatchRequest = Body(..., description="Упорядоченный список операций insert/update/delete"),
+    on_error: str = Query("abort", pattern="^(abort|continue)$", description="abort - откатить весь пакет, continue - пропустить ошибочные операции"),
+    returning: bool = Query(False, description="Возвращать записи после вставки и изменения и удалённые записи"),
+    db: DBSession = Depends(get_session)
+):
+    """
+    Пакет операций над записями в одной транзакции
+
+    Операции `{"op": "insert" | "update" | "delete", "table": ..., "id": ...,
+    "data": {...}}` выполняются по порядку на одном соединении, метаданные
+    и первичный ключ каждой таблицы определяются один раз. При
+    on_error=abort ошибка любой операции откатывает весь пакет; при
+    on_error=continue каждая операция выполняется внутри SAVEPOINT,
+    ошибочные откатываются, остальные фиксируются. В ответе - результат
+    каждой операции.
+    """
+    if not payload.operations:
+        raise HTTPException(status_code=400, detail="Пакет операций пуст")
+    if len(payload.operations) > BATCH_MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"Слишком много операций в пакете (максимум {BATCH_MAX_OPERATIONS})")
+
+    logger.info(f"Пакет из {len(payload.operations)} операций, on_error={on_error}")
+    outcome, changes = await run_db(db, _execute_batch, payload.operations, on_error, returning)
+    touched = _publish(changes)
+    if touched:
+        await response_cache.bump(*touched)
+
+    if not outcome["errors"]:
+        message = "Пакет операций выполнен"
+    elif outcome["committed"]:
+        message = "Пакет операций выполнен с ошибками"
+    else:
+        message = "Пакет операций отменён"
+    logger.info(f"{message}: операций {len(payload.operations)}, ошибок {outcome['errors']}")
+    return {"message": message, **outcome}
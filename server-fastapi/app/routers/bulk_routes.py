@@ -0,0 +1,494 @@
+import os
+import logging
+from fastapi import APIRouter, Body, Depends, HTTPException, Path, Query, Request
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional, Tuple
+from ..db.database import DBSession, get_session, run_db
+from ..db.schema_cache import schema_catalog, TableSchema
+from ..db.filters import FilterError, MAX_IN_VALUES, build_filter_conditions, check_indexed_filters, parse_filters, select_list
+from ..db.counts import count_cache
+from ..db.query_builder import statement_cache
+from ..db.row_key import RowKey, RowKeyError, find_key, resolve_key
+from ..utils.serialization import loads
+from ..utils.response_cache import response_cache
+from ..utils.changefeed import changefeed, OP_INSERT, OP_UPDATE, OP_DELETE, OP_INVALIDATE
+from ..utils.metrics import TimedRoute
+from ..models.models import BulkUpdateRequest, BulkDeleteRequest, BulkMutationResult
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Параметры пакетной вставки
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "500"))
+BULK_MAX_BATCH_SIZE = 5000
+
+# Параметры массового изменения и удаления
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+BULK_MAX_IDS = int(os.getenv("BULK_MAX_IDS", "10000"))
+
+# Создание роутера пакетных операций
+router = APIRouter(prefix="/api", tags=["bulk"], route_class=TimedRoute)
+
+# Типы содержимого, которые разбираются как NDJSON (по одной записи на строку)
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines")
+
+class BulkInputError(ValueError):
+    """Некорректная запись во входных данных"""
+
+# Чтение записей из тела запроса: JSON-массив или поток NDJSON
+async def _iter_records(request: Request):
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    if content_type in NDJSON_MEDIA_TYPES:
+        # NDJSON разбирается по мере поступления, без чтения всего тела в память
+        buffer = b""
+        line_number = 0
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                line_number += 1
+                if line.strip():
+                    yield _parse_record(line, line_number)
+        if buffer.strip():
+            yield _parse_record(buffer, line_number + 1)
+        return
+
+    try:
+        payload = loads(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Некорректный JSON: {e}")
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=400, detail="Ожидается JSON-массив записей или поток NDJSON")
+    for index, record in enumerate(payload, start=1):
+        if not isinstance(record, dict) or not record:
+            raise BulkInputError(f"Запись {index} должна быть непустым объектом")
+        yield record
+
+def _parse_record(line: bytes, line_number: int) -> Dict[str, Any]:
+    try:
+        record = loads(line)
+    except ValueError as e:
+        raise BulkInputError(f"Некорректный JSON в строке {line_number}: {e}")
+    if not isinstance(record, dict) or not record:
+        raise BulkInputError(f"Строка {line_number} должна содержать непустой объект")
+    return record
+
+# Шаг AUTO_INCREMENT и режим блокировки InnoDB для восстановления ключей вставки
+AUTOINC_SETTINGS_SQL = "SELECT @@auto_increment_increment AS step, @@innodb_autoinc_lock_mode AS lock_mode"
+# В режиме interleaved значения параллельных многострочных INSERT могут чередоваться
+AUTOINC_LOCK_MODE_INTERLEAVED = 2
+
+# Параметры AUTO_INCREMENT сервера по движку: читаются один раз, а не на каждую пачку
+_autoinc_settings: Dict[Any, Tuple[int, int]] = {}
+
+def _autoinc_settings_for(db: Session) -> Optional[Tuple[int, int]]:
+    bind = db.get_bind()
+    settings = _autoinc_settings.get(bind)
+    if settings is None:
+        try:
+            row = db.execute(statement_cache.text(AUTOINC_SETTINGS_SQL)).mappings().fetchone()
+        except SQLAlchemyError as e:
+            logger.debug("Не удалось прочитать параметры AUTO_INCREMENT: %s", e)
+            return None
+        if row is None:
+            return None
+        settings = _autoinc_settings[bind] = (max(1, int(row["step"])), int(row["lock_mode"]))
+    return settings
+
+# Значения AUTO_INCREMENT, выданные многострочному INSERT, или None, если их нельзя вывести из lastrowid
+def _auto_increment_keys(db: Session, first_id: int, count: int) -> Optional[List[int]]:
+    settings = _autoinc_settings_for(db)
+    if settings is None or settings[1] == AUTOINC_LOCK_MODE_INTERLEAVED:
+        return None
+    # В режимах 0 и 1 многострочный INSERT получает значения подряд с шагом auto_increment_increment
+    step = settings[0]
+    return [first_id + idx * step for idx in range(count)]
+
+# Чтение вставленных записей одним запросом по их ключам
+def _read_back(db: Session, table: TableSchema, columns: List[str], rows: List[Dict[str, Any]], first_id):
+    key = find_key(table)
+    if key is None:
+        return None
+
+    if all(name in columns for name in key.names):
+        try:
+            keys = [key.parse([row[name] for name in key.names]) for row in rows]
+        except RowKeyError:
+            return None
+    elif first_id and not key.composite and "auto_increment" in key.columns[0].extra.lower():
+        # lastrowid - первое значение AUTO_INCREMENT пачки
+        auto_keys = _auto_increment_keys(db, first_id, len(rows))
+        if auto_keys is None:
+            return None
+        keys = [(value,) for value in auto_keys]
+    else:
+        return None
+
+    clause, params = key.in_condition(keys, "pk")
+    data = [dict(row._mapping) for row in db.execute(statement_cache.text(f"SELECT * FROM `{table.name}` WHERE {clause}"), params)]
+    # Записи, которых не нашлось по ожидаемым ключам, означают, что ключи выведены неверно
+    if len(data) != len(rows):
+        logger.warning(f"Перечитано {len(data)} записей из {len(rows)} вставленных в '{table.name}': записи не возвращаются")
+        return None
+    return data
+
+# Вставка одной пачки записей многострочным INSERT
+def _insert_batch(db: Session, table: TableSchema, columns: List[str], rows: List[Dict[str, Any]], returning: bool):
+    placeholders = []
+    params = {}
+    for r, row in enumerate(rows):
+        names = [f"r{r}_{c}" for c in range(len(columns))]
+        placeholders.append("(" + ", ".join(":" + name for name in names) + ")")
+        params.update(zip(names, (row[col] for col in columns)))
+
+    query = statement_cache.text(f"INSERT INTO `{table.name}` ({select_list(columns)}) VALUES {', '.join(placeholders)}")
+    result = db.execute(query, params)
+
+    first_id = result.lastrowid or None
+    batch = {"rows": len(rows), "inserted": result.rowcount, "first_id": first_id}
+    if returning:
+        batch["data"] = _read_back(db, table, columns, rows, first_id)
+    return batch
+
+# Изменения зафиксированных пачек для журнала: записи, если они были перечитаны
+def _inserted_changes(table: TableSchema, batches: List[Dict[str, Any]]):
+    key = find_key(table)
+    changes = []
+    for batch in batches:
+        rows = batch.get("data")
+        if rows is None or key is None:
+            return [(OP_INVALIDATE, None, None)]
+        changes.extend((OP_INSERT, key.identity(key.from_row(row)), row) for row in rows)
+    return changes
+
+def _get_table(db: Session, table_name: str) -> TableSchema:
+    table = schema_catalog.get_table(db, table_name)
+    if table is None:
+        raise HTTPException(status_code=404, detail=f"Таблица '{table_name}' не найдена")
+    return table
+
+def _commit(db: Session):
+    db.commit()
+
+def _rollback(db: Session):
+    db.rollback()
+
+# Пакетная вставка записей
+@router.post("/tables/{table_name}/data/bulk")
+async def bulk_insert_rows(
+    request: Request,
+    table_name: str = Path(..., description="Имя таблицы"),
+    batch_size: int = Query(BULK_BATCH_SIZE, ge=1, le=BULK_MAX_BATCH_SIZE, description="Записей в одном INSERT"),
+    transaction_size: int = Query(1, ge=1, le=1000, description="Пачек в одной транзакции"),
+    returning: bool = Query(False, description="Возвращать вставленные записи"),
+    on_error: str = Query("abort", pattern="^(abort|continue)$", description="abort - остановиться, continue - продолжить со следующей транзакции"),
+    db: DBSession = Depends(get_session)
+):
+    """
+    Пакетная вставка записей
+
+    Тело - JSON-массив объектов или поток NDJSON (Content-Type:
+    application/x-ndjson). Записи группируются в многострочные
+    INSERT ... VALUES (...), (...) по batch_size строк; каждые
+    transaction_size пачек фиксируются одной транзакцией. Подряд идущие
+    записи с другим набором колонок начинают новую пачку.
+
+    В ответе - результат по каждой пачке. При returning=true вставленные
+    записи перечитываются по ключам.
+    """
+    table = await run_db(db, _get_table, table_name)
+    logger.info(f"Пакетная вставка в таблицу '{table_name}': batch_size={batch_size}, transaction_size={transaction_size}")
+
+    results: List[Dict[str, Any]] = []
+    pending: List[Dict[str, Any]] = []  # пачки текущей незафиксированной транзакции
+    state = {"inserted": 0, "failed": False}
+
+    async def commit_pending():
+        if not pending:
+            return
+        await run_db(db, _commit)
+        inserted = sum(batch["inserted"] for batch in pending)
+        state["inserted"] += inserted
+        count_cache.adjust(table_name, inserted)
+        changefeed.record(table_name, _inserted_changes(table, pending))
+        pending.clear()
+
+    async def execute_batch(columns: List[str], rows: List[Dict[str, Any]]):
+        batch = {"batch": len(results) + 1}
+        results.append(batch)
+        unknown = [col for col in columns if table.column(col) is None]
+        try:
+            if unknown:
+                raise BulkInputError(f"Неизвестные колонки: {', '.join(unknown)}")
+            batch.update(await run_db(db, _insert_batch, table, columns, rows, returning))
+            batch["status"] = "ok"
+            pending.append(batch)
+        except Exception as e:
+            await run_db(db, _rollback)
+            logger.error(f"Ошибка пакетной вставки в таблицу '{table_name}' (пачка {batch['batch']}): {e}")
+            batch.update({"rows": len(rows), "inserted": 0, "status": "error", "error": str(e)})
+            # Пачки той же транзакции откатились вместе с ошибочной
+            for rolled_back in pending:
+                rolled_back.update({"status": "rolled_back", "inserted": 0})
+                rolled_back.pop("data", None)
+            pending.clear()
+            state["failed"] = True
+            return
+        if len(pending) >= transaction_size:
+            await commit_pending()
+
+    columns: Optional[List[str]] = None
+    rows: List[Dict[str, Any]] = []
+    try:
+        async for record in _iter_records(request):
+            if rows and (len(rows) >= batch_size or record.keys() != set(columns)):
+                await execute_batch(columns, rows)
+                rows = []
+                if state["failed"] and on_error == "abort":
+                    break
+            if not rows:
+                columns = list(record.keys())
+            rows.append(record)
+        else:
+            if rows:
+                await execute_batch(columns, rows)
+        if not (state["failed"] and on_error == "abort"):
+            await commit_pending()
+        else:
+            await run_db(db, _rollback)
+    except BulkInputError as e:
+        # Некорректная запись во входных данных: незафиксированные пачки откатываются
+        await run_db(db, _rollback)
+        for rolled_back in pending:
+            rolled_back.update({"status": "rolled_back", "inserted": 0})
+            rolled_back.pop("data", None)
+        pending.clear()
+        if not results:
+            raise HTTPException(status_code=400, detail=str(e))
+        results.append({"batch": len(results) + 1, "status": "error", "error": str(e), "rows": 0, "inserted": 0})
+        state["failed"] = True
+    finally:
+        # Зафиксированные пачки остаются в таблице даже при прерванной загрузке
+        if state["inserted"]:
+            await response_cache.bump(table_name)
+
+    errors = sum(1 for batch in results if batch["status"] != "ok")
+    logger.info(f"Пакетная вставка в таблицу '{table_name}' завершена: добавлено {state['inserted']}, ошибок {errors}")
+    return {
+        "message": "Пакетная вставка завершена" if not errors else "Пакетная вставка завершена с ошибками",
+        "inserted": state["inserted"],
+        "batches": results,
+        "errors": errors
+    }
+
+# Выбор записей массовой операции: список ids или фильтр
+def _resolve_target(
+    table: TableSchema,
+    ids: Optional[List[Any]],
+    filter_spec: Optional[Dict[str, Any]]
+) -> Tuple[RowKey, Optional[List[Tuple[Any, ...]]], List[str], Dict[str, Any]]:
+    if (ids is None) == (filter_spec is None):
+        raise HTTPException(status_code=400, detail="Нужно указать либо ids, либо filter")
+    try:
+        key = resolve_key(table)
+    except RowKeyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if ids is not None:
+        if not ids:
+            raise HTTPException(status_code=400, detail="Список ids пуст")
+        if len(ids) > BULK_MAX_IDS:
+            raise HTTPException(status_code=400, detail=f"Слишком много ids (максимум {BULK_MAX_IDS})")
+        # Составной ключ задаётся списком значений, объектом или строкой "k1,k2"
+        try:
+            keys = [key.parse(row_id) for row_id in ids]
+        except RowKeyError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # Повторы убираем, сохраняя порядок
+        return key, list(dict.fromkeys(keys)), [], {}
+
+    if not filter_spec:
+        # Пустой фильтр затронул бы всю таблицу
+        raise HTTPException(status_code=400, detail="Фильтр не должен быть пустым")
+    try:
+        parsed = parse_filters(table, filter_spec.items())
+    except FilterError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(parsed) != len(filter_spec):
+        raise HTTPException(status_code=400, detail="Ключи фильтра задаются в виде колонка__оператор")
+    try:
+        # Изменение по фильтру без индекса блокировало бы и просматривало всю таблицу
+        check_indexed_filters(table, parsed)
+    except FilterError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    conditions, params = build_filter_conditions(parsed)
+    return key, None, conditions, params
+
+def _chunks(values: List[Any], size: int):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+# Ключи записей, подходящих под фильтр (блокируются до конца транзакции)
+def _select_ids(db: Session, table_name: str, key: RowKey, conditions: List[str], params: Dict[str, Any]) -> List[Tuple[Any, ...]]:
+    query = statement_cache.text(
+        f"SELECT {select_list(list(key.names))} FROM `{table_name}` WHERE {' AND '.join(conditions)} "
+        f"LIMIT {BULK_MAX_IDS + 1} FOR UPDATE"
+    )
+    ids = [tuple(row) for row in db.execute(query, params)]
+    if len(ids) > BULK_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Фильтр затрагивает больше {BULK_MAX_IDS} записей")
+    return ids
+
+# Чтение записей по ключам одним запросом на порцию
+def _select_rows(db: Session, table_name: str, key: RowKey, ids: List[Tuple[Any, ...]], chunk_size: int) -> List[Dict[str, Any]]:
+    rows = []
+    for chunk in _chunks(ids, chunk_size):
+        clause, params = key.in_condition(chunk)
+        query = statement_cache.text(f"SELECT * FROM `{table_name}` WHERE {clause}")
+        rows.extend(dict(row._mapping) for row in db.execute(query, params))
+    return rows
+
+# Массовое изменение записей
+def _bulk_update_rows(db: Session, table_name: str, payload: BulkUpdateRequest, returning: bool, chunk_size: int):
+    try:
+        table = _get_table(db, table_name)
+        if not payload.data:
+            raise HTTPException(status_code=400, detail="Отсутствуют данные для обновления")
+        unknown = [col for col in payload.data if table.column(col) is None]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Неизвестные колонки: {', '.join(unknown)}")
+
+        key, ids, conditions, filter_params = _resolve_target(table, payload.ids, payload.filter)
+        key_changed = any(name in payload.data for name in key.names)
+        logger.info(f"Массовое обновление в таблице '{table_name}': ids={len(ids) if ids is not None else None}, filter={bool(payload.filter)}")
+        logger.debug("Фильтр: %s", payload.filter)
+
+        set_names = [f"set_{idx}" for idx in range(len(payload.data))]
+        set_clause = ", ".join(f"`{col}` = :{name}" for col, name in zip(payload.data, set_names))
+        set_params = dict(zip(set_names, payload.data.values()))
+
+        # По фильтру без returning достаточно одного UPDATE; иначе нужны ключи затронутых записей
+        if ids is None and not returning:
+            result = db.execute(
+                statement_cache.text(f"UPDATE `{table_name}` SET {set_clause} WHERE {' AND '.join(conditions)}"),
+                {**set_params, **filter_params}
+            )
+            affected = result.rowcount
+        else:
+            if ids is None:
+                ids = _select_ids(db, table_name, key, conditions, filter_params)
+            affected = 0
+            for chunk in _chunks(ids, chunk_size):
+                clause, params = key.in_condition(chunk)
+                result = db.execute(statement_cache.text(f"UPDATE `{table_name}` SET {set_clause} WHERE {clause}"), {**set_params, **params})
+                affected += result.rowcount
+
+        data = None
+        if returning:
+            # Ключ мог измениться вместе с данными
+            if key_changed:
+                try:
+                    ids = list(dict.fromkeys(key.after_update(row_id, payload.data) for row_id in ids))
+                except RowKeyError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+            data = _select_rows(db, table_name, key, ids, chunk_size)
+        db.commit()
+
+        logger.info(f"Массово обновлено записей: {affected}")
+        count_cache.invalidate(table_name, filtered_only=True)
+        if ids is None or key_changed:
+            changefeed.record(table_name, [(OP_INVALIDATE, None, None)])
+        elif data is not None:
+            changefeed.record(table_name, [(OP_UPDATE, key.identity(key.from_row(row)), row) for row in data])
+        else:
+            changefeed.record(table_name, [(OP_UPDATE, key.identity(row_id), None) for row_id in ids])
+        return {"message": "Записи успешно обновлены", "affected": affected, "data": data}
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Ошибка массового обновления в таблице '{table_name}': {e}")
+        raise HTTPException(status_code=500, detail=f"Ошибка при обновлении записей: {str(e)}")
+
+@router.patch("/tables/{table_name}/data", response_model=BulkMutationResult)
+async def bulk_update_rows(
+    table_name: str = Path(..., description="Имя таблицы"),
+    payload: BulkUpdateRequest = Body(..., description="ids или filter и данные для обновления"),
+    returning: bool = Query(False, description="Вернуть изменённые записи"),
+    chunk_size: int = Query(BULK_CHUNK_SIZE, ge=1, le=MAX_IN_VALUES, description="Ключей в одном IN (...)"),
+    db: DBSession = Depends(get_session)
+):
+    """
+    Массовое изменение записей
+
+    Записи выбираются списком ключей `ids` (для составного ключа - списки
+    значений или объекты) или фильтром `{"колонка__оператор": значение}`
+    и изменяются запросами UPDATE ... WHERE pk IN (...) порциями по chunk_size ключей в одной
+    транзакции. При returning=true изменённые записи читаются одним
+    SELECT на порцию.
+    """
+    result = await run_db(db, _bulk_update_rows, table_name, payload, returning, chunk_size)
+    await response_cache.bump(table_name)
+    return result
+
+# Массовое удаление записей
+def _bulk_delete_rows(db: Session, table_name: str, payload: BulkDeleteRequest, returning: bool, chunk_size: int):
+    try:
+        table = _get_table(db, table_name)
+        key, ids, conditions, filter_params = _resolve_target(table, payload.ids, payload.filter)
+        logger.info(f"Массовое удаление из таблицы '{table_name}': ids={len(ids) if ids is not None else None}, filter={bool(payload.filter)}")
+        logger.debug("Фильтр: %s", payload.filter)
+
+        data = None
+        if ids is None and not returning:
+            result = db.execute(statement_cache.text(f"DELETE FROM `{table_name}` WHERE {' AND '.join(conditions)}"), filter_params)
+            affected = result.rowcount
+        else:
+            if ids is None:
+                ids = _select_ids(db, table_name, key, conditions, filter_params)
+            # Удаляемые записи читаются до удаления
+            if returning:
+                data = _select_rows(db, table_name, key, ids, chunk_size)
+            affected = 0
+            for chunk in _chunks(ids, chunk_size):
+                clause, params = key.in_condition(chunk)
+                result = db.execute(statement_cache.text(f"DELETE FROM `{table_name}` WHERE {clause}"), params)
+                affected += result.rowcount
+        db.commit()
+
+        logger.info(f"Массово удалено записей: {affected}")
+        count_cache.adjust(table_name, -affected)
+        if ids is None:
+            changefeed.record(table_name, [(OP_INVALIDATE, None, None)])
+        else:
+            changefeed.record(table_name, [(OP_DELETE, key.identity(row_id), None) for row_id in ids])
+        return {"message": "Записи успешно удалены", "affected": affected, "data": data}
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Ошибка массового удаления из таблицы '{table_name}': {e}")
+        raise HTTPException(status_code=500, detail=f"Ошибка при удалении записей: {str(e)}")
+
+@router.delete("/tables/{table_name}/data", response_model=BulkMutationResult)
+async def bulk_delete_rows(
+    table_name: str = Path(..., description="Имя таблицы"),
+    payload: BulkDeleteRequest = Body(..., description="ids или filter удаляемых записей"),
+    returning: bool = Query(False, description="Вернуть удалённые записи"),
+    chunk_size: int = Query(BULK_CHUNK_SIZE, ge=1, le=MAX_IN_VALUES, description="Ключей в одном IN (...)"),
+    db: DBSession = Depends(get_session)
+):
+    """
+    Массовое удаление записей
+
+    Записи выбираются списком ключей `ids` или фильтром и
+    удаляются запросами DELETE ... WHERE pk IN (...) порциями по
+    chunk_size ключей в одной транзакции.
+    """
+    result = await run_db(db, _bulk_delete_rows, table_name, payload, returning, chunk_size)
+    await response_cache.bump(table_name)
+    return result
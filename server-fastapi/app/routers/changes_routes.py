@@ -0,0 +1,145 @@
+import os
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from typing import Optional, Tuple
+from ..db.database import DBSession, get_session, run_db
+from ..db.schema_cache import schema_catalog
+from ..utils.changefeed import changefeed, ChangesExpired
+from ..utils.serialization import dumps
+from ..utils.metrics import TimedRoute
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Интервал комментариев keep-alive в потоке событий, секунды
+CHANGEFEED_HEARTBEAT = float(os.getenv("CHANGEFEED_HEARTBEAT", "15"))
+# Событий в одном ответе /changes
+CHANGES_MAX_LIMIT = 1000
+
+# Создание роутера журнала изменений
+router = APIRouter(prefix="/api", tags=["changes"], route_class=TimedRoute)
+
+# Проверка существования таблицы
+def _check_table(db: Session, table_name: str) -> None:
+    if schema_catalog.get_table(db, table_name) is None:
+        raise HTTPException(status_code=404, detail=f"Таблица '{table_name}' не найдена")
+
+# Соединение не должно удерживаться открытым потоком событий
+async def _release(db: DBSession) -> None:
+    if isinstance(db, AsyncSession):
+        await db.close()
+    else:
+        await run_in_threadpool(db.close)
+
+def _check_epoch(epoch: Optional[str]) -> None:
+    if epoch is not None and epoch != changefeed.epoch:
+        raise ChangesExpired("Журнал изменений был перезапущен")
+
+# Разбор Last-Event-ID: "эпоха:версия"
+def _parse_event_id(value: str) -> Tuple[Optional[str], Optional[int]]:
+    epoch, _, version = value.partition(":")
+    try:
+        return epoch, int(version)
+    except ValueError:
+        return None, None
+
+# Изменения таблицы после версии
+@router.get("/tables/{table_name}/changes")
+async def get_table_changes(
+    table_name: str = Path(..., description="Имя таблицы"),
+    since: Optional[int] = Query(None, ge=0, description="Версия, после которой нужны изменения (не задана - только текущая версия)"),
+    epoch: Optional[str] = Query(None, description="Эпоха журнала из предыдущего ответа"),
+    limit: int = Query(500, ge=1, le=CHANGES_MAX_LIMIT, description="Максимальное количество событий"),
+    db: DBSession = Depends(get_session)
+):
+    """
+    Изменения таблицы после версии since
+
+    Каждое событие содержит версию, операцию (insert, update, delete или
+    invalidate - изменение без списка записей, данные нужно перечитать),
+    ключ записи и запись. Клиент сохраняет epoch и version из ответа и
+    передаёт их в следующем запросе. Если изменения после since уже
+    вытеснены из журнала или эпоха другая, возвращается 410: данные
+    нужно перечитать целиком.
+    """
+    await run_db(db, _check_table, table_name)
+    try:
+        _check_epoch(epoch)
+        if since is None:
+            events, version, has_more = [], changefeed.version(table_name), False
+        else:
+            events, version, has_more = changefeed.changes(table_name, since, limit)
+    except ChangesExpired as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    return {
+        "table": table_name,
+        "epoch": changefeed.epoch,
+        "version": events[-1]["version"] if has_more else version,
+        "changes": events,
+        "has_more": has_more,
+    }
+
+# Поток изменений таблицы (Server-Sent Events)
+@router.get("/tables/{table_name}/changes/stream")
+async def stream_table_changes(
+    request: Request,
+    table_name: str = Path(..., description="Имя таблицы"),
+    since: Optional[int] = Query(None, ge=0, description="Версия, после которой нужны изменения (не задана - с текущей)"),
+    epoch: Optional[str] = Query(None, description="Эпоха журнала"),
+    db: DBSession = Depends(get_session)
+):
+    """
+    Поток изменений таблицы в формате Server-Sent Events
+
+    События: ready (эпоха и текущая версия), change (одно изменение,
+    id события - "эпоха:версия") и reset (изменения потеряны, данные нужно
+    перечитать, поток закрывается). При переподключении браузер передаёт
+    Last-Event-ID, и поток продолжается с места обрыва.
+    """
+    await run_db(db, _check_table, table_name)
+    await _release(db)
+
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id:
+        epoch, since = _parse_event_id(last_event_id)
+
+    def message(event: str, data, event_id: Optional[str] = None) -> bytes:
+        head = f"id: {event_id}\n" if event_id else ""
+        return f"{head}event: {event}\n".encode("utf-8") + b"data: " + dumps(data) + b"\n\n"
+
+    async def events():
+        position = since
+        try:
+            _check_epoch(epoch)
+            if position is None:
+                position = changefeed.version(table_name)
+            else:
+                changefeed.changes(table_name, position, 1)
+        except ChangesExpired as e:
+            yield message("reset", {"detail": str(e), "epoch": changefeed.epoch})
+            return
+
+        yield message("ready", {"epoch": changefeed.epoch, "version": position})
+        while not await request.is_disconnected():
+            if not await changefeed.wait(table_name, position, CHANGEFEED_HEARTBEAT):
+                yield b": keep-alive\n\n"
+                continue
+            try:
+                changes, _, _ = changefeed.changes(table_name, position, CHANGES_MAX_LIMIT)
+            except ChangesExpired as e:
+                yield message("reset", {"detail": str(e), "epoch": changefeed.epoch})
+                return
+            for change in changes:
+                position = change["version"]
+                yield message("change", change, f"{changefeed.epoch}:{position}")
+
+    logger.info(f"Подписка на изменения таблицы '{table_name}'")
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
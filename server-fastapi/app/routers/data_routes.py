@@ -1,98 +1,149 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Path, Body
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, Body, Header, Request, Response
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Union
 import logging
-from sqlalchemy import text
-from ..db.database import get_db
-from ..models.models import TableName, TableColumn, TableData, Pagination, TableRowOperation, DeletedRow
+from ..db.database import DBSession, get_session, run_db
+from ..db.replicas import read_target, replica_router, run_read
+from ..db import keyset
+from ..db import counts
+from ..db import query_builder
+from ..db import representation
+from ..db.row_key import RowKey, RowKeyError, find_key, path_segment, resolve_key
+from ..db.query_builder import statement_cache
+from ..db.counts import count_cache
+from ..db.search import build_search_condition
+from ..db.filters import (
+    FilterError, build_filter_conditions, build_sort_clause, criteria_key,
+    parse_fields, parse_filters, parse_sort, select_list
+)
+from ..db.schema_cache import schema_catalog, TableSchema
+from ..utils.response_cache import response_cache, SCOPE_TABLES
+from ..utils.changefeed import changefeed, OP_INSERT, OP_UPDATE, OP_DELETE
+from ..utils.serialization import FORMAT_JSON, wants_compact
+from ..utils.metrics import TimedRoute
+from ..models.models import TableName, TableColumn, TableData, CompactTableData, Pagination, TableRowOperation, DeletedRow
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Создание роутера
-router = APIRouter(prefix="/api", tags=["database"])
+router = APIRouter(prefix="/api", tags=["database"], route_class=TimedRoute)
+
+# Получение метаданных таблицы из кэша схемы
+def _get_table_schema(db: Session, table_name: str) -> TableSchema:
+    try:
+        table = schema_catalog.get_table(db, table_name)
+    except LookupError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if table is None:
+        raise HTTPException(status_code=404, detail=f"Таблица '{table_name}' не найдена")
+    return table
+
+# Ключ адресации записей: первичный ключ или уникальный индекс без NULL
+def _get_row_key(table: TableSchema) -> RowKey:
+    try:
+        return resolve_key(table)
+    except RowKeyError as e:
+        logger.warning(str(e))
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Значения ключа записи из сегмента пути (до URL-декодирования)
+def _parse_row_key(key: RowKey, row_id: str) -> Tuple[Any, ...]:
+    try:
+        return key.from_path(row_id)
+    except RowKeyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Чтение через кэш ответов: источник (реплика или основная база) выбирается
+# до ключа кэша, чтобы после записи клиент не получил ответ с отстающей реплики
+async def _cached_read(request: Request, scopes: List[str], fn, *args):
+    replica = replica_router.route(request)
+    ttl = None
+    if replica is not None:
+        if response_cache.written_within(scopes, replica_router.sticky_seconds):
+            # Сразу после записи реплика может отставать: кэш под новой версией заполняется из основной базы
+            replica = None
+        else:
+            # Запись в другом воркере здесь не видна: ответ реплики живёт не дольше допустимого отставания
+            ttl = replica_router.sticky_seconds
+    return await response_cache.respond(
+        request, scopes, lambda: run_read(replica, fn, *args), target=read_target(replica), ttl=ttl
+    )
+
+# Подсчет общего количества записей выбранной стратегией
+def _count_rows(
+    db: Session,
+    table_name: str,
+    where_sql: str,
+    params: Dict[str, Any],
+    strategy: str,
+    criteria: Optional[str] = None
+):
+    if strategy == counts.COUNT_NONE:
+        return None, counts.COUNT_NONE
+    
+    if strategy == counts.COUNT_ESTIMATE:
+        if where_sql:
+            total = counts.estimate_query_rows(db, f"SELECT * FROM `{table_name}` {where_sql}", params)
+        else:
+            total = counts.estimate_table_rows(db, table_name)
+        return total, counts.COUNT_ESTIMATE
+    
+    if strategy == counts.COUNT_CACHED:
+        cached_total = count_cache.get(table_name, criteria)
+        if cached_total is not None:
+            return cached_total, counts.COUNT_CACHED
+    
+    count_query = statement_cache.text(f"SELECT COUNT(*) as total FROM `{table_name}` {where_sql}")
+    logger.debug("SQL запрос подсчета: %s", count_query)
+    count_result = db.execute(count_query, params).fetchone()
+    total = count_result.total if count_result else 0
+    
+    if strategy == counts.COUNT_CACHED:
+        count_cache.set(table_name, total, criteria)
+    return total, counts.COUNT_EXACT
 
 # Получение списка таблиц
-@router.get("/tables", response_model=List[TableName])
-async def get_tables(db: Session = Depends(get_db)):
-    """
-    Получение списка всех таблиц в базе данных
-    """
+def _get_tables(db: Session):
     try:
         logger.info("Запрос на получение списка таблиц")
         
-        query = text("""
-            SELECT table_name as TABLE_NAME
-            FROM information_schema.tables 
-            WHERE table_schema = :db_name
-            ORDER BY table_name;
-        """)
-        
-        # Получаем имя базы данных из текущего соединения
-        db_name_query = text("SELECT DATABASE() as db_name")
-        db_result = db.execute(db_name_query).fetchone()
-        db_name = db_result.db_name if db_result else None
-        
-        logger.info(f"Используемая база данных: {db_name}")
-        
-        if not db_name:
+        try:
+            table_names = schema_catalog.get_tables(db)
+        except LookupError:
             raise HTTPException(status_code=500, detail="Не удалось определить имя базы данных")
         
-        result = db.execute(query, {"db_name": db_name}).fetchall()
-        tables = [{"TABLE_NAME": row.TABLE_NAME} for row in result]
+        tables = [{"TABLE_NAME": name} for name in table_names]
         
         logger.info(f"Найдено {len(tables)} таблиц")
         return tables
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Ошибка при получении списка таблиц: {e}")
         raise HTTPException(status_code=500, detail=f"Ошибка сервера: {str(e)}")
 
-# Получение информации о структуре таблицы (колонки)
-@router.get("/tables/{table_name}/columns", response_model=List[TableColumn])
-async def get_table_columns(
-    table_name: str = Path(..., description="Имя таблицы"),
-    db: Session = Depends(get_db)
-):
+@router.get("/tables", response_model=List[TableName])
+async def get_tables(request: Request):
     """
-    Получение структуры таблицы (колонки)
+    Получение списка всех таблиц в базе данных
     """
+    return await _cached_read(request, [SCOPE_TABLES], _get_tables)
+
+# Получение информации о структуре таблицы (колонки)
+def _get_table_columns(db: Session, table_name: str):
     try:
         logger.info(f"Запрос структуры таблицы: {table_name}")
         
-        # Получаем имя текущей базы данных
-        db_name_query = text("SELECT DATABASE() as db_name")
-        db_result = db.execute(db_name_query).fetchone()
-        db_name = db_result.db_name if db_result else None
-        
-        if not db_name:
-            raise HTTPException(status_code=500, detail="Не удалось определить имя базы данных")
-        
-        query = text("""
-            SELECT 
-                column_name, 
-                data_type, 
-                is_nullable 
-            FROM 
-                information_schema.columns 
-            WHERE 
-                table_schema = :db_name AND 
-                table_name = :table_name
-            ORDER BY 
-                ordinal_position
-        """)
-        
-        result = db.execute(query, {"db_name": db_name, "table_name": table_name}).fetchall()
-        
-        if not result:
-            raise HTTPException(status_code=404, detail=f"Таблица '{table_name}' не найдена")
+        table = _get_table_schema(db, table_name)
         
         columns = [
             {
-                "column_name": row.column_name,
-                "data_type": row.data_type,
-                "is_nullable": row.is_nullable
-            } for row in result
+                "column_name": col.name,
+                "data_type": col.data_type,
+                "is_nullable": col.is_nullable
+            } for col in table.columns
         ]
         
         logger.info(f"Найдено {len(columns)} колонок в таблице '{table_name}'")
@@ -103,92 +154,168 @@ async def get_table_columns(
         logger.error(f"Ошибка при получении структуры таблицы '{table_name}': {e}")
         raise HTTPException(status_code=500, detail=f"Ошибка сервера: {str(e)}")
 
-# Получение данных из таблицы с поддержкой поиска
-@router.get("/tables/{table_name}/data", response_model=TableData)
-async def get_table_data(
-    table_name: str = Path(..., description="Имя таблицы"),
-    page: int = Query(1, ge=1, description="Номер страницы"),
-    limit: int = Query(50, ge=1, le=500, description="Количество записей на странице"),
-    search: Optional[str] = Query(None, description="Поисковый запрос"),
-    db: Session = Depends(get_db)
+@router.get("/tables/{table_name}/columns", response_model=List[TableColumn])
+async def get_table_columns(
+    request: Request,
+    table_name: str = Path(..., description="Имя таблицы")
 ):
     """
-    Получение данных из таблицы с поддержкой поиска и пагинации
+    Получение структуры таблицы (колонки)
     """
+    return await _cached_read(request, [table_name], _get_table_columns, table_name)
+
+# Получение данных из таблицы с поддержкой поиска
+def _get_table_data(
+    db: Session,
+    table_name: str,
+    page: int,
+    limit: int,
+    search: Optional[str],
+    mode: str,
+    cursor: Optional[str],
+    count: str,
+    fields: Optional[str] = None,
+    sort: Optional[str] = None,
+    query_items: Optional[List[Tuple[str, str]]] = None,
+    compact: bool = False
+):
     try:
         logger.info(f"Запрос данных из таблицы: {table_name}")
-        logger.info(f"Параметры: page={page}, limit={limit}, search={search}")
+        logger.debug(
+            "Параметры: page=%s, limit=%s, search=%s, mode=%s, fields=%s, sort=%s",
+            page, limit, search, mode, fields, sort
+        )
+
+        if cursor and mode != "keyset":
+            raise HTTPException(status_code=400, detail="Параметр cursor допустим только в режиме keyset")
+        if sort and mode == "keyset":
+            raise HTTPException(status_code=400, detail="Параметр sort не поддерживается в режиме keyset")
         
         offset = (page - 1) * limit
         
-        # Сначала получим одну запись из таблицы, чтобы определить структуру
-        sample_query = text(f"SELECT * FROM `{table_name}` LIMIT 1")
+        # Структура таблицы берётся из кэша схемы
+        table = _get_table_schema(db, table_name)
         
+        # Проекция, фильтры и сортировка проверяются по схеме таблицы
         try:
-            sample_result = db.execute(sample_query).fetchone()
-        except Exception as e:
-            logger.error(f"Ошибка при запросе к таблице '{table_name}': {e}")
-            raise HTTPException(status_code=404, detail=f"Таблица '{table_name}' не найдена или ошибка доступа")
-        
-        if not sample_result:
-            # Таблица существует, но пуста - вернем пустой результат
-            logger.info(f"Таблица '{table_name}' пуста")
-            return {"data": [], "pagination": {"total": 0, "page": page, "limit": limit, "pages": 0}}
-        
-        # Получаем имена столбцов
-        columns = sample_result._fields
-        
-        # Формируем запрос с поиском
-        query_parts = [f"SELECT * FROM `{table_name}`"]
-        count_query_parts = [f"SELECT COUNT(*) as total FROM `{table_name}`"]
-        query_params = {}
-        
-        # Если есть поисковый запрос, добавляем условия поиска по всем столбцам
+            columns = parse_fields(table, fields)
+            filters = parse_filters(table, query_items or [])
+            order = parse_sort(table, sort)
+        except FilterError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # В режиме keyset колонки ключа нужны для курсоров, даже если не запрошены
+        selected = list(columns)
+        if mode == "keyset":
+            selected += [col for col in table.key_columns if col not in selected]
+        
+        # Формируем запрос с фильтрами и поиском
+        query_parts = [f"SELECT {select_list(selected)} FROM `{table_name}`"]
+        conditions, query_params = build_filter_conditions(filters)
+        
+        # Если есть поисковый запрос, ищем по FULLTEXT-индексу или по текстовым колонкам
+        search_mode = None
         if search:
-            search_conditions = []
-            for idx, col in enumerate(columns):
-                param_name = f"search_{idx}"
-                search_conditions.append(f"`{col}` LIKE :{param_name}")
-                query_params[param_name] = f"%{search}%"
+            search_clause, search_params, search_mode = build_search_condition(table, search)
+            conditions.append(search_clause)
+            query_params.update(search_params)
+            logger.debug("Режим поиска: %s", search_mode)
+        
+        # Условия поиска и фильтров не должны попадать в запрос подсчета вместе с курсором
+        count_where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        count_params = dict(query_params)
+        
+        if mode == "keyset":
+            key_columns = table.key_columns
+            if not key_columns:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Таблица '{table_name}' не имеет первичного ключа или уникального индекса для режима keyset"
+                )
             
-            if search_conditions:
-                search_clause = " OR ".join(search_conditions)
-                query_parts.append(f"WHERE {search_clause}")
-                count_query_parts.append(f"WHERE {search_clause}")
-        
-        # Добавляем пагинацию
-        query_parts.append("LIMIT :limit OFFSET :offset")
-        query_params.update({"limit": limit, "offset": offset})
+            direction = keyset.DIRECTION_NEXT
+            if cursor:
+                try:
+                    cursor_values, direction = keyset.decode_cursor(cursor, len(key_columns))
+                except keyset.CursorError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+                seek_clause, param_names = keyset.build_seek_clause(key_columns, direction)
+                conditions.append(seek_clause)
+                query_params.update(zip(param_names, cursor_values))
+            
+            if conditions:
+                query_parts.append("WHERE " + " AND ".join(conditions))
+            # Берём на одну запись больше, чтобы понять, есть ли следующая страница
+            query_parts.append(keyset.build_order_clause(key_columns, direction))
+            query_parts.append("LIMIT :limit")
+            query_params["limit"] = limit + 1
+        else:
+            if conditions:
+                query_parts.append("WHERE " + " AND ".join(conditions))
+            if order:
+                query_parts.append(build_sort_clause(order, table.key_columns))
+            # Добавляем пагинацию
+            query_parts.append("LIMIT :limit OFFSET :offset")
+            query_params.update({"limit": limit, "offset": offset})
         
-        # Собираем финальные запросы
-        data_query = text(" ".join(query_parts))
-        count_query = text(" ".join(count_query_parts))
+        # Собираем финальный запрос
+        data_query = statement_cache.text(" ".join(query_parts))
         
-        logger.info(f"SQL запрос данных: {data_query}")
-        logger.info(f"SQL запрос подсчета: {count_query}")
+        logger.debug("SQL запрос данных: %s", data_query)
         
         # Выполняем запросы
         result = db.execute(data_query, query_params).fetchall()
-        count_result = db.execute(count_query, {k: v for k, v in query_params.items() if k not in ['limit', 'offset']}).fetchone()
-        
-        total_count = count_result.total if count_result else 0
+        total_count, count_strategy = _count_rows(
+            db, table_name, count_where, count_params, count, criteria_key(search, filters)
+        )
+        pages = (total_count + limit - 1) // limit if total_count is not None else None
+        
+        # Строки остаются кортежами драйвера в порядке колонок selected
+        rows = [tuple(row) for row in result]
+        
+        if mode == "keyset":
+            key_positions = [selected.index(col) for col in key_columns]
+            rows, next_cursor, prev_cursor = keyset.paginate_rows(
+                rows, key_positions, limit, direction, has_cursor=bool(cursor)
+            )
+            pagination = {
+                "mode": "keyset",
+                "total": total_count,
+                "limit": limit,
+                "pages": pages,
+                "count_strategy": count_strategy,
+                "next_cursor": next_cursor,
+                "prev_cursor": prev_cursor
+            }
+        else:
+            pagination = {
+                "total": total_count,
+                "page": page,
+                "limit": limit,
+                "pages": pages,
+                "count_strategy": count_strategy
+            }
         
-        # Преобразуем результаты в словари
-        rows = []
-        for row in result:
-            row_dict = {col: getattr(row, col) for col in columns}
-            rows.append(row_dict)
+        if search_mode:
+            pagination["search_mode"] = search_mode
+        if order:
+            pagination["sort"] = sort
         
         logger.info(f"Получено {len(rows)} записей из {total_count}")
         
-        return {
-            "data": rows,
-            "pagination": {
-                "total": total_count,
-                "page": page,
-                "limit": limit,
-                "pages": (total_count + limit - 1) // limit if limit > 0 else 0
+        # Колонки ключа, добавленные только ради курсоров, стоят в конце и в ответ не попадают
+        if compact:
+            if len(selected) != len(columns):
+                rows = [row[:len(columns)] for row in rows]
+            return {
+                "columns": columns,
+                "rows": rows,
+                "pagination": pagination
             }
+        
+        return {
+            "data": [dict(zip(columns, row)) for row in rows],
+            "pagination": pagination
         }
     except HTTPException:
         raise
@@ -196,132 +323,147 @@ async def get_table_data(
         logger.error(f"Ошибка при получении данных из таблицы '{table_name}': {e}")
         raise HTTPException(status_code=500, detail=f"Ошибка сервера: {str(e)}")
 
-# Добавление новой записи в таблицу
-@router.post("/tables/{table_name}/data", response_model=Dict[str, Any])
-async def add_table_row(
+@router.get("/tables/{table_name}/data", response_model=Union[TableData, CompactTableData])
+async def get_table_data(
+    request: Request,
     table_name: str = Path(..., description="Имя таблицы"),
-    data: Dict[str, Any] = Body(..., description="Данные для добавления"),
-    db: Session = Depends(get_db)
+    page: int = Query(1, ge=1, description="Номер страницы"),
+    limit: int = Query(50, ge=1, le=500, description="Количество записей на странице"),
+    search: Optional[str] = Query(None, description="Поисковый запрос"),
+    mode: str = Query("offset", pattern="^(offset|keyset)$", description="Режим пагинации: offset или keyset"),
+    cursor: Optional[str] = Query(None, description="Курсор next_cursor/prev_cursor для режима keyset"),
+    count: str = Query(
+        counts.COUNT_EXACT,
+        pattern="^(exact|estimate|cached|none)$",
+        description="Стратегия подсчета total: exact, estimate, cached или none"
+    ),
+    fields: Optional[str] = Query(None, description="Колонки через запятую (по умолчанию - все)"),
+    sort: Optional[str] = Query(None, description="Сортировка по индексированным колонкам: a,-b"),
+    format: str = Query(FORMAT_JSON, pattern="^(json|compact)$", description="Формат строк: json или compact")
 ):
     """
-    Добавление новой записи в таблицу
+    Получение данных из таблицы с поддержкой поиска и пагинации
+
+    В режиме keyset страница выбирается по ключу таблицы (первичному или
+    уникальному индексу) вместо OFFSET, поэтому глубокие страницы стоят
+    столько же, сколько первая. Переход между страницами - по курсорам
+    из блока pagination.
+
+    Параметр count выбирает способ получения total: точный COUNT(*),
+    оценку по статистике таблицы или EXPLAIN, кэш с обновлением при
+    записи, либо отказ от подсчета. Использованная стратегия
+    возвращается в pagination.count_strategy.
+
+    Проекция fields ограничивает набор колонок, фильтры вида
+    `колонка__оператор=значение` (eq, ne, gt, gte, lt, lte, in, isnull)
+    добавляются к условию отбора, а sort задаёт порядок по колонкам,
+    образующим начало индекса (минус - по убыванию; не совместим с keyset).
+
+    Компактный формат (format=compact или Accept с COMPACT_MEDIA_TYPE)
+    возвращает имена колонок один раз, а строки - массивами значений.
     """
+    compact = wants_compact(format, request.headers.get("accept"))
+    return await _cached_read(
+        request, [table_name], _get_table_data, table_name, page, limit, search, mode, cursor, count,
+        fields, sort, list(request.query_params.multi_items()), compact
+    )
+
+# Добавление новой записи в таблицу
+def _add_table_row(db: Session, table_name: str, data: Dict[str, Any], want_row: bool = True):
     try:
         logger.info(f"Добавление записи в таблицу '{table_name}'")
-        logger.info(f"Данные для добавления: {data}")
+        logger.debug("Данные для добавления: %s", data)
         
         if not data:
             raise HTTPException(status_code=400, detail="Отсутствуют данные для добавления")
         
-        columns = list(data.keys())
-        placeholders = [f":{col}" for col in columns]
+        table = _get_table_schema(db, table_name)
         
-        # Формируем запрос
-        query = text(f"""
-            INSERT INTO `{table_name}` 
-            ({', '.join([f'`{col}`' for col in columns])})
-            VALUES ({', '.join(placeholders)})
-        """)
+        # Запрос берётся из кэша по форме (таблица, набор колонок)
+        query = query_builder.insert_row(table_name, data.keys())
         
-        logger.info(f"SQL запрос: {query}")
+        logger.debug("SQL запрос: %s", query)
         
         # Выполняем запрос
-        result = db.execute(query, data)
+        result = db.execute(query, query_builder.value_params(data.values()))
         db.commit()
         
         insert_id = result.lastrowid
         logger.info(f"Запись добавлена с ID: {insert_id}")
-        
-        # Получаем имя первичного ключа
-        pk_query = text("""
-            SELECT column_name
-            FROM information_schema.key_column_usage
-            WHERE constraint_name = 'PRIMARY'
-            AND table_schema = DATABASE()
-            AND table_name = :table_name
-        """)
-        
-        pk_result = db.execute(pk_query, {"table_name": table_name}).fetchone()
-        
-        pk_column = pk_result.column_name if pk_result else 'id'
-        logger.info(f"Первичный ключ таблицы: {pk_column}")
-        
-        # Получаем добавленную запись
-        if insert_id:
-            select_query = text(f"SELECT * FROM `{table_name}` WHERE `{pk_column}` = :id")
-            row = db.execute(select_query, {"id": insert_id}).fetchone()
-            
-            if row:
-                # Преобразуем запись в словарь
-                inserted_data = {col: getattr(row, col) for col in row._fields}
-                logger.info(f"Добавленная запись: {inserted_data}")
-                return inserted_data
-            else:
-                return {"message": "Запись добавлена успешно", "insertId": insert_id}
-        else:
-            return {"message": "Запись добавлена успешно"}
+        count_cache.adjust(table_name, 1)
+        
+        # Для вставки ключ не обязателен: без него запись не перечитывается
+        key = find_key(table)
+        logger.debug("Ключ таблицы: %s", key.names if key else None)
+        
+        # Запись собирается из отправленных данных и значений по умолчанию;
+        # из базы читаются только колонки, вычисленные сервером
+        inserted_data = representation.inserted_row(db, table, key, data, insert_id, read_back=want_row)
+        key_values = None
+        if key is not None:
+            key_values = key.from_row(inserted_data) if inserted_data else key.inserted(data, insert_id)
+        row_id = key.identity(key_values) if key_values else (insert_id or None)
+        changefeed.record(table_name, [(OP_INSERT, row_id, inserted_data)])
+        
+        if want_row and inserted_data:
+            logger.debug("Добавленная запись: %s", inserted_data)
+            return inserted_data
+        if row_id is not None:
+            return {"message": "Запись добавлена успешно", "insertId": row_id}
+        return {"message": "Запись добавлена успешно"}
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         logger.error(f"Ошибка при добавлении записи в таблицу '{table_name}': {e}")
         raise HTTPException(status_code=500, detail=f"Ошибка при добавлении записи: {str(e)}")
 
-# Обновление записи в таблице
-@router.put("/tables/{table_name}/data/{row_id}", response_model=Dict[str, Any])
-async def update_table_row(
+@router.post("/tables/{table_name}/data", response_model=Dict[str, Any])
+async def add_table_row(
+    response: Response,
     table_name: str = Path(..., description="Имя таблицы"),
-    row_id: str = Path(..., description="ID записи для обновления"),
-    data: Dict[str, Any] = Body(..., description="Данные для обновления"),
-    db: Session = Depends(get_db)
+    data: Dict[str, Any] = Body(..., description="Данные для добавления"),
+    prefer: Optional[str] = Header(None, description="return=minimal - не возвращать запись"),
+    db: DBSession = Depends(get_session)
 ):
     """
-    Обновление записи в таблице
+    Добавление новой записи в таблицу
+
+    С заголовком `Prefer: return=minimal` возвращается только ключ записи.
     """
+    want_row, applied = representation.representation_split(representation.parse_prefer(prefer))
+    result = await run_db(db, _add_table_row, table_name, data, want_row)
+    await response_cache.bump(table_name)
+    response.headers["Preference-Applied"] = applied
+    return result
+
+# Обновление записи в таблице
+def _update_table_row(db: Session, table_name: str, row_id: str, data: Dict[str, Any], want_row: bool = True):
     try:
         logger.info(f"Обновление записи с ID {row_id} в таблице '{table_name}'")
-        logger.info(f"Данные для обновления: {data}")
-        
-        # Получаем имя первичного ключа
-        pk_query = text("""
-            SELECT column_name
-            FROM information_schema.key_column_usage
-            WHERE constraint_name = 'PRIMARY'
-            AND table_schema = DATABASE()
-            AND table_name = :table_name
-        """)
-        
-        pk_result = db.execute(pk_query, {"table_name": table_name}).fetchone()
-        
-        if pk_result:
-            pk_column = pk_result.column_name
-            logger.info(f"Первичный ключ таблицы: {pk_column}")
-        else:
-            # Если первичный ключ не найден, пробуем использовать стандартные имена
-            logger.warning(f"Первичный ключ для таблицы '{table_name}' не найден, используем id по умолчанию")
-            # Получаем структуру таблицы
-            try:
-                sample_query = text(f"SELECT * FROM `{table_name}` LIMIT 1")
-                sample_row = db.execute(sample_query).fetchone()
-                if sample_row:
-                    columns = sample_row._fields
-                    # Ищем поле с именем id (без учета регистра)
-                    pk_column = next((col for col in columns if col.lower() == 'id'), columns[0])
-                else:
-                    pk_column = 'id'
-            except Exception:
-                pk_column = 'id'
-        
-        # Формируем запрос на обновление
-        set_clauses = [f"`{col}` = :{col}" for col in data.keys()]
-        query = text(f"""
-            UPDATE `{table_name}` 
-            SET {', '.join(set_clauses)}
-            WHERE `{pk_column}` = :row_id
-        """)
+        logger.debug("Данные для обновления: %s", data)
+        
+        if not data:
+            raise HTTPException(status_code=400, detail="Отсутствуют данные для обновления")
+        
+        # Ключ записи: все колонки первичного ключа или уникального индекса
+        table = _get_table_schema(db, table_name)
+        key = _get_row_key(table)
+        try:
+            key_values = key.from_path(row_id)
+            # Колонки ключа могут изменяться вместе с данными
+            new_values = key.after_update(key_values, data)
+        except RowKeyError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        logger.debug("Ключ таблицы: %s", key.names)
+        
+        # Запрос на обновление берётся из кэша по форме (таблица, набор колонок, ключ)
+        query = query_builder.update_row(table_name, data.keys(), key.names)
         
         # Параметры запроса
-        params = {**data, "row_id": row_id}
+        params = {**query_builder.value_params(data.values()), **key.params(key_values)}
         
-        logger.info(f"SQL запрос: {query}")
+        logger.debug("SQL запрос: %s", query)
         
         # Выполняем запрос
         result = db.execute(query, params)
@@ -333,14 +475,23 @@ async def update_table_row(
         if affected_rows == 0:
             raise HTTPException(status_code=404, detail=f"Запись с ID {row_id} не найдена")
         
-        # Получаем обновленную запись
-        select_query = text(f"SELECT * FROM `{table_name}` WHERE `{pk_column}` = :id")
-        updated_row = db.execute(select_query, {"id": row_id}).fetchone()
+        # Изменение могло затронуть результаты поиска
+        count_cache.invalidate(table_name, filtered_only=True)
         
-        if updated_row:
-            # Преобразуем запись в словарь
-            updated_data = {col: getattr(updated_row, col) for col in updated_row._fields}
-            logger.info(f"Обновленная запись: {updated_data}")
+        # Из базы читаются только колонки, которых нет в отправленных данных
+        new_id = key.identity(new_values)
+        updated_data = representation.updated_row(db, table, key, data, new_values, read_back=want_row)
+        
+        # Изменение ключа в журнале - удаление старой записи и появление новой
+        if new_values != key_values:
+            changefeed.record(table_name, [(OP_DELETE, key.identity(key_values), None), (OP_INSERT, new_id, updated_data)])
+        else:
+            changefeed.record(table_name, [(OP_UPDATE, new_id, updated_data)])
+        
+        if not want_row:
+            return {"message": "Запись успешно обновлена", "id": new_id}
+        if updated_data:
+            logger.debug("Обновленная запись: %s", updated_data)
             return updated_data
         else:
             raise HTTPException(status_code=404, detail=f"Запись с ID {row_id} не найдена после обновления")
@@ -351,64 +502,57 @@ async def update_table_row(
         logger.error(f"Ошибка при обновлении записи в таблице '{table_name}': {e}")
         raise HTTPException(status_code=500, detail=f"Ошибка при обновлении записи: {str(e)}")
 
-# Удаление записи из таблицы
-@router.delete("/tables/{table_name}/data/{row_id}", response_model=DeletedRow)
-async def delete_table_row(
+@router.put("/tables/{table_name}/data/{row_id}", response_model=Dict[str, Any])
+async def update_table_row(
+    request: Request,
+    response: Response,
     table_name: str = Path(..., description="Имя таблицы"),
-    row_id: str = Path(..., description="ID записи для удаления"),
-    db: Session = Depends(get_db)
+    row_id: str = Path(..., description="Ключ записи (для составного ключа - значения через запятую, запятая в значении - %2C)"),
+    data: Dict[str, Any] = Body(..., description="Данные для обновления"),
+    prefer: Optional[str] = Header(None, description="return=minimal - не возвращать запись"),
+    db: DBSession = Depends(get_session)
 ):
     """
-    Удаление записи из таблицы
+    Обновление записи в таблице
+
+    С заголовком `Prefer: return=minimal` запись после изменения не читается.
     """
+    want_row, applied = representation.representation_split(representation.parse_prefer(prefer))
+    result = await run_db(db, _update_table_row, table_name, path_segment(request.scope, row_id), data, want_row)
+    await response_cache.bump(table_name)
+    response.headers["Preference-Applied"] = applied
+    return result
+
+# Удаление записи из таблицы
+def _delete_table_row(db: Session, table_name: str, row_id: str, want_row: bool = True):
     try:
         logger.info(f"Удаление записи с ID {row_id} из таблицы '{table_name}'")
         
-        # Получаем имя первичного ключа
-        pk_query = text("""
-            SELECT column_name
-            FROM information_schema.key_column_usage
-            WHERE constraint_name = 'PRIMARY'
-            AND table_schema = DATABASE()
-            AND table_name = :table_name
-        """)
-        
-        pk_result = db.execute(pk_query, {"table_name": table_name}).fetchone()
+        # Ключ записи: все колонки первичного ключа или уникального индекса
+        table = _get_table_schema(db, table_name)
+        key = _get_row_key(table)
+        key_values = _parse_row_key(key, row_id)
+        logger.debug("Ключ таблицы: %s", key.names)
         
-        if pk_result:
-            pk_column = pk_result.column_name
-            logger.info(f"Первичный ключ таблицы: {pk_column}")
+        # Запись читается перед удалением, только если её нужно вернуть
+        if want_row:
+            select_query = query_builder.select_row(table_name, key.names)
+            row_to_delete = db.execute(select_query, key.params(key_values)).fetchone()
+            
+            if not row_to_delete:
+                raise HTTPException(status_code=404, detail=f"Запись с ID {row_id} не найдена")
+            
+            # Преобразуем запись в словарь
+            deleted_data = dict(row_to_delete._mapping)
+            logger.debug("Найдена запись для удаления: %s", deleted_data)
         else:
-            # Если первичный ключ не найден, пробуем использовать стандартные имена
-            logger.warning(f"Первичный ключ для таблицы '{table_name}' не найден, используем id по умолчанию")
-            try:
-                sample_query = text(f"SELECT * FROM `{table_name}` LIMIT 1")
-                sample_row = db.execute(sample_query).fetchone()
-                if sample_row:
-                    columns = sample_row._fields
-                    # Ищем поле с именем id (без учета регистра)
-                    pk_column = next((col for col in columns if col.lower() == 'id'), columns[0])
-                else:
-                    pk_column = 'id'
-            except Exception:
-                pk_column = 'id'
-        
-        # Получаем запись перед удалением
-        select_query = text(f"SELECT * FROM `{table_name}` WHERE `{pk_column}` = :id")
-        row_to_delete = db.execute(select_query, {"id": row_id}).fetchone()
-        
-        if not row_to_delete:
-            raise HTTPException(status_code=404, detail=f"Запись с ID {row_id} не найдена")
-        
-        # Преобразуем запись в словарь
-        deleted_data = {col: getattr(row_to_delete, col) for col in row_to_delete._fields}
-        logger.info(f"Найдена запись для удаления: {deleted_data}")
+            deleted_data = key.as_dict(key_values)
         
         # Формируем запрос на удаление
-        delete_query = text(f"DELETE FROM `{table_name}` WHERE `{pk_column}` = :id")
+        delete_query = query_builder.delete_row(table_name, key.names)
         
         # Выполняем запрос
-        result = db.execute(delete_query, {"id": row_id})
+        result = db.execute(delete_query, key.params(key_values))
         db.commit()
         
         affected_rows = result.rowcount
@@ -417,6 +561,9 @@ async def delete_table_row(
         if affected_rows == 0:
             raise HTTPException(status_code=404, detail=f"Запись с ID {row_id} не найдена или не может быть удалена")
         
+        count_cache.adjust(table_name, -affected_rows)
+        changefeed.record(table_name, [(OP_DELETE, key.identity(key_values), None)])
+        
         return {
             "message": "Запись успешно удалена", 
             "deleted": deleted_data
@@ -426,4 +573,25 @@ async def delete_table_row(
     except Exception as e:
         db.rollback()
         logger.error(f"Ошибка при удалении записи из таблицы '{table_name}': {e}")
-        raise HTTPException(status_code=500, detail=f"Ошибка при удалении записи: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Ошибка при удалении записи: {str(e)}") 
+
+@router.delete("/tables/{table_name}/data/{row_id}", response_model=DeletedRow)
+async def delete_table_row(
+    request: Request,
+    response: Response,
+    table_name: str = Path(..., description="Имя таблицы"),
+    row_id: str = Path(..., description="Ключ записи (для составного ключа - значения через запятую, запятая в значении - %2C)"),
+    prefer: Optional[str] = Header(None, description="return=minimal - не читать запись перед удалением"),
+    db: DBSession = Depends(get_session)
+):
+    """
+    Удаление записи из таблицы
+
+    С заголовком `Prefer: return=minimal` запись перед удалением не читается,
+    в `deleted` возвращается только ключ.
+    """
+    want_row, applied = representation.representation_split(representation.parse_prefer(prefer))
+    result = await run_db(db, _delete_table_row, table_name, path_segment(request.scope, row_id), want_row)
+    await response_cache.bump(table_name)
+    response.headers["Preference-Applied"] = applied
+    return result
\ No newline at end of file
@@ -0,0 +1,34 @@
+import logging
+from fastapi import APIRouter, Query
+from ..db.profiler import profiler
+from ..utils.metrics import TimedRoute
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Создание роутера отладочных данных
+router = APIRouter(prefix="/api/_debug", tags=["debug"], route_class=TimedRoute)
+
+# Медленные запросы
+@router.get("/slow-queries")
+async def get_slow_queries(
+    limit: int = Query(50, ge=1, le=1000, description="Количество последних записей буфера")
+):
+    """
+    Медленные запросы, собранные профилировщиком (SLOW_QUERY_ENABLED=true)
+
+    Последние запросы дольше порога SLOW_QUERY_THRESHOLD_MS с планом
+    EXPLAIN FORMAT=JSON, статистика по нормализованной форме запроса и
+    рекомендации индексов по полным просмотрам таблиц.
+    """
+    return profiler.report(limit)
+
+# Очистка буфера медленных запросов
+@router.delete("/slow-queries")
+async def clear_slow_queries():
+    """
+    Очистка буфера и статистики медленных запросов
+    """
+    profiler.clear()
+    logger.info("Буфер медленных запросов очищен")
+    return {"message": "Буфер медленных запросов очищен"}
@@ -0,0 +1,143 @@
+import os
+import io
+import csv
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional, Tuple
+from ..db import database
+from ..db.database import DBSession, get_session, run_db
+from ..db.schema_cache import schema_catalog
+from ..db.search import build_search_condition
+from ..db.filters import FilterError, build_filter_conditions, parse_fields, parse_filters, select_list
+from ..utils.serialization import dumps, to_text
+from ..utils.metrics import TimedRoute
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Количество строк, читаемых с сервера и отправляемых клиенту за раз
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+
+# Типы содержимого для форматов выгрузки
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# Создание роутера выгрузки данных
+router = APIRouter(prefix="/api", tags=["export"], route_class=TimedRoute)
+
+# Кодирование пачки строк в выбранный формат
+def _encode_rows(rows, columns: List[str], fmt: str) -> bytes:
+    if fmt == "ndjson":
+        return b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([to_text(value) for value in row] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+def _csv_header(columns: List[str]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(columns)
+    return buffer.getvalue().encode("utf-8")
+
+# Построение запроса выгрузки (выполняется до начала потоковой передачи,
+# чтобы ошибки в параметрах вернулись обычным ответом 400/404)
+def _prepare_export(
+    db: Session,
+    table_name: str,
+    fields: Optional[str],
+    search: Optional[str],
+    query_items: List[Tuple[str, str]]
+) -> Tuple[str, Dict[str, Any], List[str]]:
+    table = schema_catalog.get_table(db, table_name)
+    if table is None:
+        raise HTTPException(status_code=404, detail=f"Таблица '{table_name}' не найдена")
+
+    try:
+        columns = parse_fields(table, fields)
+        conditions, params = build_filter_conditions(parse_filters(table, query_items))
+    except FilterError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if search:
+        search_clause, search_params, _ = build_search_condition(table, search)
+        conditions.append(search_clause)
+        params.update(search_params)
+
+    sql = f"SELECT {select_list(columns)} FROM `{table_name}`"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    return sql, params, columns
+
+# Потоковое чтение через серверный (небуферизованный) курсор - синхронный движок
+def _stream_sync(sql: str, params: Dict[str, Any], columns: List[str], fmt: str, chunk_size: int):
+    with database.engine.connect() as connection:
+        completed = False
+        try:
+            result = connection.execution_options(stream_results=True, max_row_buffer=chunk_size).execute(
+                text(sql), params
+            )
+            if fmt == "csv":
+                yield _csv_header(columns)
+            for rows in result.partitions(chunk_size):
+                yield _encode_rows(rows, columns, fmt)
+            completed = True
+        finally:
+            # Клиент отключился: небуферизованный результат не дочитываем, а закрываем соединение
+            if not completed:
+                connection.invalidate()
+
+# Потоковое чтение через серверный курсор - асинхронный движок
+async def _stream_async(sql: str, params: Dict[str, Any], columns: List[str], fmt: str, chunk_size: int):
+    async with database.async_engine.connect() as connection:
+        completed = False
+        try:
+            result = await connection.stream(text(sql), params)
+            if fmt == "csv":
+                yield _csv_header(columns)
+            async for rows in result.partitions(chunk_size):
+                yield _encode_rows(rows, columns, fmt)
+            completed = True
+        finally:
+            if not completed:
+                await connection.invalidate()
+
+# Выгрузка всей таблицы
+@router.get("/tables/{table_name}/export")
+async def export_table(
+    request: Request,
+    table_name: str = Path(..., description="Имя таблицы"),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Формат: ndjson или csv"),
+    fields: Optional[str] = Query(None, description="Колонки через запятую (по умолчанию - все)"),
+    search: Optional[str] = Query(None, description="Поисковый запрос"),
+    chunk_size: int = Query(EXPORT_CHUNK_SIZE, ge=1, le=50000, description="Строк в одной порции передачи"),
+    db: DBSession = Depends(get_session)
+):
+    """
+    Потоковая выгрузка таблицы в NDJSON или CSV
+
+    Строки читаются серверным курсором и отправляются порциями по мере
+    готовности клиента, поэтому память не зависит от размера таблицы.
+    Поддерживаются проекция fields, поиск search и фильтры вида
+    `колонка__оператор=значение` (eq, ne, gt, gte, lt, lte, in, isnull).
+    """
+    sql, params, columns = await run_db(
+        db, _prepare_export, table_name, fields, search, list(request.query_params.multi_items())
+    )
+    logger.info(f"Выгрузка таблицы '{table_name}' в формате {format}")
+
+    if database.async_engine is not None:
+        stream = _stream_async(sql, params, columns, format, chunk_size)
+    else:
+        stream = _stream_sync(sql, params, columns, format, chunk_size)
+
+    extension = "ndjson" if format == "ndjson" else "csv"
+    return StreamingResponse(
+        stream,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{table_name}.{extension}"'}
+    )
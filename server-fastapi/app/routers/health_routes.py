@@ -0,0 +1,66 @@
+import os
+import time
+import asyncio
+import logging
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from ..db.database import ping_database, pool_status
+from ..db.replicas import replica_router
+from ..utils.metrics import TimedRoute
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Параметры проверки готовности
+HEALTH_READY_TIMEOUT = float(os.getenv("HEALTH_READY_TIMEOUT", "2"))
+HEALTH_READY_CACHE_TTL = float(os.getenv("HEALTH_READY_CACHE_TTL", "2"))
+
+# Создание роутера проверок состояния
+router = APIRouter(prefix="/health", tags=["health"], route_class=TimedRoute)
+
+# Последний результат проверки базы: (готова ли, ошибка, время проверки)
+_last_check = (False, "проверка ещё не выполнялась", 0.0)
+_check_lock = asyncio.Lock()
+
+# Проверка базы данных с ограничением по времени; параллельные пробы
+# используют одну проверку, результат кэшируется на короткое время
+async def _check_database():
+    global _last_check
+    async with _check_lock:
+        if time.monotonic() - _last_check[2] < HEALTH_READY_CACHE_TTL:
+            return _last_check
+        try:
+            await asyncio.wait_for(ping_database(), timeout=HEALTH_READY_TIMEOUT)
+            _last_check = (True, None, time.monotonic())
+        except asyncio.TimeoutError:
+            _last_check = (False, f"база данных не ответила за {HEALTH_READY_TIMEOUT} с", time.monotonic())
+        except Exception as e:
+            _last_check = (False, str(e), time.monotonic())
+        if not _last_check[0]:
+            logger.warning(f"База данных недоступна: {_last_check[1]}")
+        return _last_check
+
+# Проверка, что процесс жив
+@router.get("/live")
+async def live():
+    """
+    Проверка работоспособности процесса (без обращения к базе данных)
+    """
+    return {"status": "ok"}
+
+# Проверка готовности принимать запросы
+@router.get("/ready")
+async def ready():
+    """
+    Проверка готовности: база данных отвечает на SELECT 1
+
+    Недоступные реплики не делают сервис неготовым: чтения идут в
+    основную базу.
+    """
+    is_ready, error, _ = await _check_database()
+    if not is_ready:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "detail": error})
+    result = {"status": "ready", "pool": pool_status()}
+    if replica_router.enabled:
+        result["replicas"] = [replica.stats() for replica in replica_router.replicas]
+    return result
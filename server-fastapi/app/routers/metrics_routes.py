@@ -0,0 +1,44 @@
+import logging
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from ..db.database import pool_metrics
+from ..db.schema_cache import schema_catalog
+from ..db.query_builder import statement_cache
+from ..db.replicas import replica_router
+from ..utils.response_cache import response_cache
+from ..utils.singleflight import singleflight
+from ..utils.changefeed import changefeed
+from ..utils.metrics import TimedRoute, render_gauges, render_metrics
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Тип содержимого текстового формата Prometheus
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Создание роутера метрик
+router = APIRouter(tags=["metrics"], route_class=TimedRoute)
+
+# Метрики в формате Prometheus
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Метрики приложения в текстовом формате Prometheus
+
+    Гистограммы времени HTTP-запросов по маршрутам, времени SQL-запросов
+    и ожидания соединения из пула, а также состояние пула, кэшей и доля
+    объединённых одинаковых запросов.
+    """
+    extra = []
+    try:
+        extra += render_gauges("db_pool_connections", "Состояние пула соединений", pool_metrics(), "state")
+    except Exception as e:
+        logger.warning(f"Не удалось получить состояние пула: {e}")
+    if replica_router.enabled:
+        extra += render_gauges("db_replicas", "Маршрутизация чтений по репликам", replica_router.stats(), "stat")
+    extra += render_gauges("response_cache", "Кэш HTTP-ответов", response_cache.stats(), "stat")
+    extra += render_gauges("singleflight", "Объединение одинаковых одновременных запросов", singleflight.stats(), "stat")
+    extra += render_gauges("changefeed", "Журнал изменений таблиц", changefeed.stats(), "stat")
+    extra += render_gauges("query_cache", "Кэш запросов по форме", statement_cache.stats(), "stat")
+    extra += render_gauges("schema_cache", "Кэш метаданных схемы", schema_catalog.stats(), "stat")
+    return PlainTextResponse(render_metrics(extra), media_type=PROMETHEUS_MEDIA_TYPE)
@@ -0,0 +1 @@
+# Пакет вспомогательных модулей
\ No newline at end of file
@@ -0,0 +1,176 @@
+import os
+import time
+import uuid
+import asyncio
+import threading
+import logging
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Параметры журнала изменений
+CHANGEFEED_ENABLED = os.getenv("CHANGEFEED_ENABLED", "true").lower() in ("1", "true", "yes")
+CHANGEFEED_MAX_EVENTS = int(os.getenv("CHANGEFEED_MAX_EVENTS", "1000"))
+CHANGEFEED_MAX_TABLES = int(os.getenv("CHANGEFEED_MAX_TABLES", "256"))
+# Больше изменений в одной операции записывается одним событием invalidate
+CHANGEFEED_MAX_BATCH_EVENTS = int(os.getenv("CHANGEFEED_MAX_BATCH_EVENTS", "200"))
+
+# Операции журнала
+OP_INSERT = "insert"
+OP_UPDATE = "update"
+OP_DELETE = "delete"
+# Изменение без списка записей (массовая операция по фильтру): клиент перечитывает данные
+OP_INVALIDATE = "invalidate"
+
+# Изменение: (операция, ключ, запись)
+Change = Tuple[str, Any, Optional[Dict[str, Any]]]
+
+
+class ChangesExpired(LookupError):
+    """Запрошенная версия вытеснена из журнала или относится к другому журналу"""
+
+
+class ChangeFeed:
+    """
+    Журнал изменений таблиц в памяти процесса.
+
+    Для каждой таблицы хранится ограниченная очередь событий с
+    возрастающими версиями. Клиент запоминает эпоху журнала и последнюю
+    версию и запрашивает только изменения после неё; если версия уже
+    вытеснена или эпоха другая (перезапуск или другой воркер), клиент
+    получает ChangesExpired и перечитывает данные целиком.
+
+    record() вызывается после фиксации транзакции из любого потока,
+    ожидающие потоковые подписчики будят через цикл событий.
+    """
+
+    def __init__(
+        self,
+        max_events: int = CHANGEFEED_MAX_EVENTS,
+        max_tables: int = CHANGEFEED_MAX_TABLES,
+        max_batch_events: int = CHANGEFEED_MAX_BATCH_EVENTS,
+        enabled: bool = CHANGEFEED_ENABLED
+    ):
+        self.max_events = max_events
+        self.max_tables = max_tables
+        self.max_batch_events = max_batch_events
+        self.enabled = enabled
+        self.epoch = uuid.uuid4().hex[:12]
+        self._lock = threading.Lock()
+        self._logs: Dict[str, deque] = {}
+        self._versions: Dict[str, int] = {}
+        self._events: Dict[str, asyncio.Event] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def record(self, table_name: str, changes: Iterable[Change]) -> int:
+        """
+        Добавляет изменения одной операции и возвращает новую версию таблицы.
+        """
+        if not self.enabled:
+            return 0
+        changes = list(changes)
+        if not changes:
+            return self.version(table_name)
+        if len(changes) > self.max_batch_events:
+            changes = [(OP_INVALIDATE, None, None)]
+
+        now = time.time()
+        with self._lock:
+            log = self._logs.get(table_name)
+            if log is None:
+                if len(self._logs) >= self.max_tables:
+                    # Вытесняем журнал таблицы с самым старым последним изменением
+                    oldest = min(self._logs, key=lambda name: self._logs[name][-1]["time"] if self._logs[name] else 0)
+                    del self._logs[oldest]
+                log = self._logs[table_name] = deque(maxlen=self.max_events)
+            version = self._versions.get(table_name, 0)
+            for op, pk, row in changes:
+                version += 1
+                log.append({"version": version, "op": op, "pk": pk, "row": row, "time": now})
+            self._versions[table_name] = version
+
+        self._wake(table_name)
+        return version
+
+    def version(self, table_name: str) -> int:
+        with self._lock:
+            return self._versions.get(table_name, 0)
+
+    def changes(self, table_name: str, since: int, limit: int) -> Tuple[List[Dict[str, Any]], int, bool]:
+        """
+        События с версией больше since (не более limit).
+
+        Returns:
+            (события, текущая версия, есть ли ещё события)
+
+        Raises:
+            ChangesExpired: since новее текущей версии или события после
+                него уже вытеснены из журнала
+        """
+        with self._lock:
+            current = self._versions.get(table_name, 0)
+            log = list(self._logs.get(table_name) or ())
+        if since > current:
+            raise ChangesExpired(f"Версия {since} новее текущей версии журнала ({current})")
+        if since < current:
+            oldest = log[0]["version"] if log else current + 1
+            if since < oldest - 1:
+                raise ChangesExpired(f"Изменения после версии {since} уже удалены из журнала")
+        events = [event for event in log if event["version"] > since]
+        return events[:limit], current, len(events) > limit
+
+    def _event(self, table_name: str) -> asyncio.Event:
+        self._loop = asyncio.get_running_loop()
+        event = self._events.get(table_name)
+        if event is None:
+            event = self._events[table_name] = asyncio.Event()
+        return event
+
+    def _notify(self, table_name: str) -> None:
+        event = self._events.pop(table_name, None)
+        if event is not None:
+            event.set()
+
+    def _wake(self, table_name: str) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._notify(table_name)
+        else:
+            loop.call_soon_threadsafe(self._notify, table_name)
+
+    async def wait(self, table_name: str, since: int, timeout: float) -> bool:
+        """
+        Ждёт изменения таблицы после версии since не дольше timeout секунд.
+        Возвращает True, если изменения есть.
+        """
+        event = self._event(table_name)
+        # Событие получено до проверки версии, поэтому запись между ними не теряется
+        if self.version(table_name) > since:
+            return True
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.version(table_name) > since
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "epoch": self.epoch,
+                "tables": len(self._logs),
+                "events": sum(len(log) for log in self._logs.values()),
+                "max_events": self.max_events,
+            }
+
+
+# Общий журнал изменений
+changefeed = ChangeFeed()
@@ -0,0 +1,322 @@
+import os
+import time
+import bisect
+import functools
+import inspect
+import threading
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Параметры сбора метрик
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Границы корзин гистограмм, секунды
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+class Histogram:
+    """
+    Гистограмма в формате Prometheus (накопительные корзины, сумма, количество).
+    """
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Корзины, затем +Inf, сумма и количество
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.label_names + ('le',), labels + (le,))} {cumulative:g}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {series[-1]:g}")
+        return lines
+
+
+class Counter:
+    """
+    Счётчик в формате Prometheus.
+    """
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value:g}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def render_gauges(name: str, documentation: str, values: Dict[str, Any], label_name: str) -> List[str]:
+    """
+    Мгновенные значения (состояние пула, размеры кэшей) в формате gauge.
+    """
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+    for label, value in values.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            lines.append(f"{name}{_labels((label_name,), (label,))} {value:g}")
+    return lines
+
+
+# Метрики приложения
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса", ("method", "route", "status")
+)
+db_statement_duration = Histogram(
+    "db_statement_duration_seconds", "Время выполнения SQL-запроса", ("operation",)
+)
+db_statement_rows = Counter(
+    "db_statement_rows_total", "Количество строк, затронутых или полученных SQL-запросами", ("operation",)
+)
+db_pool_wait = Histogram(
+    "db_pool_wait_seconds", "Время ожидания соединения из пула"
+)
+
+
+class RequestTiming:
+    """
+    Время, потраченное запросом на базу данных и сериализацию.
+
+    Объект изменяется на месте, поэтому обработчики в пуле потоков (копия
+    контекста) и через run_sync пишут в тот же объект, что видит middleware.
+    """
+
+    __slots__ = ("started", "db", "pool", "serialize", "queries", "handler_done", "route")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db = 0.0
+        self.pool = 0.0
+        self.serialize = 0.0
+        self.queries = 0
+        self.handler_done: Optional[float] = None
+        self.route: Optional[str] = None
+
+
+_current_timing: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+
+def current_timing() -> Optional[RequestTiming]:
+    return _current_timing.get()
+
+
+def record_serialize(seconds: float) -> None:
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.serialize += seconds
+
+
+# Время выполнения SQL-запросов через события движка
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "query_started", None)
+    if started is None or not METRICS_ENABLED:
+        return
+    elapsed = time.perf_counter() - started
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    db_statement_duration.observe(elapsed, operation)
+    rowcount = getattr(cursor, "rowcount", -1)
+    if rowcount and rowcount > 0:
+        db_statement_rows.inc(rowcount, operation)
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.db += elapsed
+        timing.queries += 1
+
+
+def _observe_pool_wait(seconds: float) -> None:
+    if METRICS_ENABLED:
+        db_pool_wait.observe(seconds)
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.pool += seconds
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool, измеряющий время получения соединения (ожидание свободного
+    соединения или открытие нового).
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _observe_pool_wait(time.perf_counter() - started)
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    То же для асинхронного движка.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _observe_pool_wait(time.perf_counter() - started)
+
+
+def _timed_endpoint(endpoint: Callable, route_path: str) -> Callable:
+    """
+    Отмечает момент, когда обработчик вернул результат: всё, что после
+    него и до начала ответа, - проверка response_model и сериализация.
+    """
+    def mark():
+        timing = _current_timing.get()
+        if timing is not None:
+            timing.handler_done = time.perf_counter()
+
+    def set_route():
+        timing = _current_timing.get()
+        if timing is not None:
+            timing.route = route_path
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            set_route()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                mark()
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            set_route()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                mark()
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """
+    Маршрут, сообщающий метрикам свой шаблон пути и момент завершения
+    обработчика (для разделения времени на db/serialize в Server-Timing).
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint, path), **kwargs)
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: гистограмма времени запросов по шаблону маршрута и
+    заголовок Server-Timing (db, pool, serialize, total).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = _current_timing.set(timing)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if SERVER_TIMING_ENABLED:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", _server_timing(timing).encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_timing.reset(token)
+            # Запросы к несуществующим путям объединяются, чтобы не раздувать число рядов
+            route = timing.route or "unmatched"
+            http_request_duration.observe(
+                time.perf_counter() - timing.started, scope["method"], route, str(status["code"])
+            )
+
+
+def _server_timing(timing: RequestTiming) -> str:
+    now = time.perf_counter()
+    serialize = timing.serialize
+    if timing.handler_done is not None:
+        serialize += now - timing.handler_done
+    parts = [
+        f"db;dur={timing.db * 1000:.2f}",
+        f"pool;dur={timing.pool * 1000:.2f}",
+        f"serialize;dur={serialize * 1000:.2f}",
+        f"total;dur={(now - timing.started) * 1000:.2f}",
+    ]
+    return ", ".join(parts)
+
+
+def render_metrics(extra: Optional[List[str]] = None) -> str:
+    """
+    Все метрики в текстовом формате Prometheus.
+    """
+    lines: List[str] = []
+    for metric in (http_request_duration, db_statement_duration, db_statement_rows, db_pool_wait):
+        lines.extend(metric.render())
+    if extra:
+        lines.extend(extra)
+    return "\n".join(lines) + "\n"
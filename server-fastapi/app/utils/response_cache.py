@@ -0,0 +1,335 @@
+import os
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.routing import serialize_response
+
+from .serialization import FAST_JSON, dumps, json_response
+from .metrics import record_serialize
+from .singleflight import singleflight
+
+# redis - необязательная зависимость: без неё кэш хранится в памяти процесса
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Параметры кэша ответов
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "")
+RESPONSE_CACHE_CONTROL = os.getenv("RESPONSE_CACHE_CONTROL", "private, no-cache")
+
+# Область кэша, не привязанная к таблице (список таблиц)
+SCOPE_TABLES = "__tables__"
+
+# Запись кэша: (ETag, тело ответа)
+CacheEntry = Tuple[str, bytes]
+
+
+async def _validated(request: Request, content: Any) -> Any:
+    """
+    Данные ответа после проверки response_model маршрута - так же, как их
+    кодирует FastAPI. Тело в кэше сериализуется один раз, поэтому без
+    этого закэшированные ответы обходили бы response_model даже при
+    выключенном FAST_JSON. При FAST_JSON проверка пропускается, как и
+    для ответов без кэша.
+    """
+    route = request.scope.get("route")
+    field = getattr(route, "response_field", None)
+    if FAST_JSON or field is None:
+        return content
+    return await serialize_response(
+        field=field,
+        response_content=content,
+        include=route.response_model_include,
+        exclude=route.response_model_exclude,
+        by_alias=route.response_model_by_alias,
+        exclude_unset=route.response_model_exclude_unset,
+        exclude_defaults=route.response_model_exclude_defaults,
+        exclude_none=route.response_model_exclude_none,
+    )
+
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+class MemoryBackend:
+    """
+    Хранилище кэша ответов в памяти процесса: LRU с ограничением по
+    количеству записей и TTL.
+
+    Счётчики версий таблиц локальны для процесса, поэтому при нескольких
+    воркерах изменение, сделанное через один из них, остальные увидят
+    только по истечении TTL. Для общих версий используется RedisBackend.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[CacheEntry, float]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        entry, expires_at = item
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def set(self, key: str, entry: CacheEntry, ttl: float) -> None:
+        self._entries[key] = (entry, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def versions(self, names: List[str]) -> List[int]:
+        return [self._versions.get(name, 0) for name in names]
+
+    async def bump(self, name: str) -> int:
+        self._versions[name] = self._versions.get(name, 0) + 1
+        return self._versions[name]
+
+    def written_within(self, scopes: Iterable[str], seconds: float) -> bool:
+        """
+        Была ли запись в одну из таблиц через этот процесс за последние seconds секунд.
+        """
+        since = time.monotonic() - seconds
+        return any(self._written.get(scope, float("-inf")) > since for scope in scopes)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        await self.bump("__epoch__")
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend:
+    """
+    Хранилище кэша ответов в Redis (или совместимом сервере): записи и
+    счётчики версий общие для всех воркеров и экземпляров приложения.
+    """
+
+    def __init__(self, url: str, prefix: str = "rc:"):
+        if aioredis is None:
+            raise RuntimeError("Для RESPONSE_CACHE_URL требуется пакет redis")
+        self.prefix = prefix
+        self._client = aioredis.from_url(url)
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        data = await self._client.get(self.prefix + "e:" + key)
+        if data is None:
+            return None
+        etag, _, body = data.partition(b"\n")
+        return etag.decode("ascii"), body
+
+    async def set(self, key: str, entry: CacheEntry, ttl: float) -> None:
+        etag, body = entry
+        await self._client.set(self.prefix + "e:" + key, etag.encode("ascii") + b"\n" + body, px=int(ttl * 1000))
+
+    async def versions(self, names: List[str]) -> List[int]:
+        values = await self._client.mget([self.prefix + "v:" + name for name in names])
+        return [int(value) if value is not None else 0 for value in values]
+
+    async def bump(self, name: str) -> int:
+        return await self._client.incr(self.prefix + "v:" + name)
+
+    def written_within(self, scopes: Iterable[str], seconds: float) -> bool:
+        """
+        Была ли запись в одну из таблиц через этот процесс за последние seconds секунд.
+        """
+        since = time.monotonic() - seconds
+        return any(self._written.get(scope, float("-inf")) > since for scope in scopes)
+
+    async def clear(self) -> None:
+        # Записи становятся недоступны после смены общей версии и истекают по TTL
+        await self.bump("__epoch__")
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class ResponseCache:
+    """
+    Кэш сериализованных ответов GET-запросов с условными запросами.
+
+    Ключ записи - путь и параметры запроса вместе с текущими версиями
+    затронутых таблиц, поэтому после записи в таблицу (bump) старые
+    ответы просто перестают находиться. ETag слабый: версия таблицы и
+    хэш тела. Если ETag из If-None-Match совпадает с закэшированным,
+    возвращается 304 без обращения к базе. Одновременные промахи по
+    одному ключу объединяются (singleflight), в том числе при выключенном
+    кэше.
+    """
+
+    def __init__(self, backend=None, ttl: float = RESPONSE_CACHE_TTL, enabled: bool = RESPONSE_CACHE_ENABLED):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self.enabled = enabled
+        self._stats = {"hits": 0, "misses": 0, "not_modified": 0}
+        # Время последней записи в таблицы через этот процесс
+        self._written: "OrderedDict[str, float]" = OrderedDict()
+
+    async def _key(self, request: Request, scopes: List[str], target: str = "") -> Tuple[str, str]:
+        names = ["__epoch__"] + scopes
+        versions = await self.backend.versions(names)
+        version = ".".join(str(v) for v in versions)
+        params = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        # Формат ответа может выбираться заголовком Accept
+        accept = request.headers.get("accept", "")
+        raw = f"{request.url.path}?{params}|{accept}|{','.join(scopes)}|{target}|{version}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest(), version
+
+    @staticmethod
+    def _matches(request: Request, etag: str) -> bool:
+        header = request.headers.get("if-none-match")
+        if not header:
+            return False
+        if header.strip() == "*":
+            return True
+        # Сравнение слабых ETag: префикс W/ не учитывается
+        tags = {_opaque_tag(tag) for tag in header.split(",")}
+        return _opaque_tag(etag) in tags
+
+    def _response(self, request: Request, entry: CacheEntry) -> Response:
+        etag, body = entry
+        headers = {"ETag": etag, "Cache-Control": RESPONSE_CACHE_CONTROL, "Vary": "Accept"}
+        if self._matches(request, etag):
+            self._stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    async def respond(
+        self,
+        request: Request,
+        scopes: Iterable[str],
+        compute: Callable[[], Awaitable[Any]],
+        target: str = "",
+        ttl: Optional[float] = None
+    ) -> Any:
+        """
+        Возвращает ответ из кэша или вычисляет его через compute().
+
+        Args:
+            request: Текущий запрос (путь, параметры, If-None-Match)
+            scopes: Таблицы, от версий которых зависит ответ
+            compute: Корутина, возвращающая данные ответа
+            target: Источник данных (реплика или основная база): ответы
+                разных источников не смешиваются ни в кэше, ни в single-flight
+            ttl: Время жизни записи вместо RESPONSE_CACHE_TTL (0 - не сохранять)
+        """
+        scopes = list(scopes)
+        if not self.enabled:
+            if not singleflight.enabled:
+                return json_response(await compute())
+            try:
+                key, _ = await self._key(request, scopes, target)
+            except Exception as e:
+                logger.warning(f"Кэш ответов недоступен: {e}")
+                return json_response(await compute())
+            # Одинаковые одновременные запросы выполняют одно чтение из базы
+            bypass = "no-cache" in request.headers.get("cache-control", "")
+            return json_response(await singleflight.do(key, compute, use_window=not bypass))
+
+        try:
+            key, version = await self._key(request, scopes, target)
+            # Cache-Control: no-cache в запросе - не отдавать сохранённый ответ
+            bypass = "no-cache" in request.headers.get("cache-control", "")
+            entry = None if bypass else await self.backend.get(key)
+        except Exception as e:
+            # Недоступное хранилище кэша не должно ломать чтение данных
+            logger.warning(f"Кэш ответов недоступен: {e}")
+            return json_response(await compute())
+        if entry is not None:
+            self._stats["hits"] += 1
+            return self._response(request, entry)
+
+        self._stats["misses"] += 1
+
+        async def build() -> CacheEntry:
+            content = await _validated(request, await compute())
+            started = time.perf_counter()
+            body = dumps(content)
+            record_serialize(time.perf_counter() - started)
+            etag = f'W/"{version}-{hashlib.sha1(body).hexdigest()[:16]}"'
+            entry = (etag, body)
+            entry_ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+            if entry_ttl <= 0:
+                return entry
+            try:
+                await self.backend.set(key, entry, entry_ttl)
+            except Exception as e:
+                logger.warning(f"Не удалось сохранить ответ в кэш: {e}")
+            return entry
+
+        # Одновременные промахи по одному ключу ждут одно вычисление и запись в кэш
+        entry = await singleflight.do(key, build, use_window=not bypass)
+        return self._response(request, entry)
+
+    async def bump(self, *scopes: str) -> None:
+        """
+        Сброс закэшированных ответов таблиц после записи.
+        """
+        # Версии нужны и без кэша: по ним запросы после записи не объединяются с чтениями до неё
+        now = time.monotonic()
+        for scope in scopes:
+            self._written[scope] = now
+            self._written.move_to_end(scope)
+        while len(self._written) > RESPONSE_CACHE_MAX_ENTRIES:
+            self._written.popitem(last=False)
+        if not self.enabled and not singleflight.enabled:
+            return
+        try:
+            for scope in scopes:
+                await self.backend.bump(scope)
+        except Exception as e:
+            logger.warning(f"Не удалось сбросить кэш ответов ({', '.join(scopes)}): {e}")
+
+    def written_within(self, scopes: Iterable[str], seconds: float) -> bool:
+        """
+        Была ли запись в одну из таблиц через этот процесс за последние seconds секунд.
+        """
+        since = time.monotonic() - seconds
+        return any(self._written.get(scope, float("-inf")) > since for scope in scopes)
+
+    async def clear(self) -> None:
+        """
+        Сброс всех закэшированных ответов (например, после изменения схемы).
+        """
+        await self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "ttl": self.ttl,
+            "entries": self.backend.size(),
+            **self._stats
+        }
+
+
+def _create_backend():
+    if RESPONSE_CACHE_URL:
+        try:
+            return RedisBackend(RESPONSE_CACHE_URL)
+        except RuntimeError as e:
+            logger.warning(f"{e}, кэш ответов будет храниться в памяти")
+    return MemoryBackend()
+
+
+# Общий кэш ответов для всех обработчиков
+response_cache = ResponseCache(_create_backend())
@@ -0,0 +1,105 @@
+import os
+import base64
+import datetime
+import json
+from decimal import Decimal
+from typing import Any, Optional
+
+from fastapi.responses import JSONResponse
+from pydantic_core import PydanticSerializationError, to_jsonable_python
+
+# orjson - необязательная зависимость: без неё используется стандартный json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+HAS_ORJSON = orjson is not None
+
+# Быстрый путь ответов: данные кодируются напрямую, без повторной проверки
+# response_model и jsonable_encoder
+FAST_JSON = os.getenv("FAST_JSON", "false").lower() in ("1", "true", "yes")
+
+# Компактный формат строк таблицы: {"columns": [...], "rows": [[...], ...]}
+FORMAT_JSON = "json"
+FORMAT_COMPACT = "compact"
+COMPACT_MEDIA_TYPE = "application/vnd.konstructive.compact+json"
+
+
+def json_default(value: Any) -> Any:
+    """
+    Преобразование значений драйвера MySQL, которых нет в JSON.
+
+    Правила совпадают с сериализацией ответов FastAPI через response_model
+    (pydantic, режим JSON: Decimal и timedelta - строками), чтобы ответы
+    не зависели от способа сериализации. Байты, не являющиеся UTF-8,
+    кодируются в base64.
+    """
+    if isinstance(value, (bytes, bytearray)):
+        try:
+            return bytes(value).decode("utf-8")
+        except UnicodeDecodeError:
+            return base64.b64encode(bytes(value)).decode("ascii")
+    try:
+        return to_jsonable_python(value)
+    except PydanticSerializationError:
+        raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+def dumps(value: Any) -> bytes:
+    """Сериализация в JSON (UTF-8)"""
+    if orjson is not None:
+        return orjson.dumps(value, default=json_default, option=orjson.OPT_UTC_Z)
+    return json.dumps(value, default=json_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def wants_compact(format: str, accept: Optional[str]) -> bool:
+    """
+    Выбран ли компактный формат: параметром format=compact или
+    заголовком Accept с COMPACT_MEDIA_TYPE.
+    """
+    if format == FORMAT_COMPACT:
+        return True
+    return bool(accept) and COMPACT_MEDIA_TYPE in accept
+
+
+def loads(data: Any) -> Any:
+    """Разбор JSON из bytes или str"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def to_text(value: Any) -> str:
+    """Представление значения в текстовых форматах (CSV)"""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(json_default(value))
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON-ответ, кодируемый через dumps (orjson, если установлен).
+
+    datetime кодируется orjson нативно, Decimal и bytes - через json_default,
+    поэтому результат совпадает с обычным путём FastAPI.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_response(content: Any) -> Any:
+    """
+    Обёртка ответа обработчика: при FAST_JSON возвращает готовый
+    FastJSONResponse, и FastAPI пропускает проверку response_model.
+    """
+    if FAST_JSON:
+        return FastJSONResponse(content)
+    return content
@@ -0,0 +1,115 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Параметры объединения одинаковых запросов
+SINGLEFLIGHT_ENABLED = os.getenv("SINGLEFLIGHT_ENABLED", "true").lower() in ("1", "true", "yes")
+# Окно микрокэша: результат отдаётся повторно ещё столько миллисекунд после завершения (0 - выключен)
+SINGLEFLIGHT_WINDOW_MS = float(os.getenv("SINGLEFLIGHT_WINDOW_MS", "0"))
+SINGLEFLIGHT_MAX_ENTRIES = int(os.getenv("SINGLEFLIGHT_MAX_ENTRIES", "1024"))
+
+
+class SingleFlight:
+    """
+    Объединение одновременных одинаковых вычислений (single-flight).
+
+    Первый запрос с ключом запускает вычисление, остальные запросы с тем же
+    ключом, пришедшие до его завершения, ждут тот же результат (или ту же
+    ошибку). Вычисление выполняется отдельной задачей: отмена запроса,
+    запустившего его (клиент закрыл соединение), не отменяет ожидание
+    остальных. При ненулевом окне успешный результат ещё window секунд
+    отдаётся из микрокэша.
+
+    Состояние принадлежит циклу событий процесса; ключ должен включать
+    версии данных, чтобы запрос после записи не присоединялся к чтению,
+    начатому до неё.
+    """
+
+    def __init__(
+        self,
+        window: float = SINGLEFLIGHT_WINDOW_MS / 1000,
+        max_entries: int = SINGLEFLIGHT_MAX_ENTRIES,
+        enabled: bool = SINGLEFLIGHT_ENABLED
+    ):
+        self.window = window
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._recent: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._stats = {"leaders": 0, "followers": 0, "window_hits": 0}
+
+    def _recent_result(self, key: Hashable) -> Tuple[bool, Any]:
+        item = self._recent.get(key)
+        if item is None:
+            return False, None
+        result, expires_at = item
+        if time.monotonic() >= expires_at:
+            del self._recent[key]
+            return False, None
+        return True, result
+
+    def _remember(self, key: Hashable, result: Any) -> None:
+        self._recent[key] = (result, time.monotonic() + self.window)
+        self._recent.move_to_end(key)
+        while len(self._recent) > self.max_entries:
+            self._recent.popitem(last=False)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], use_window: bool = True) -> Any:
+        """
+        Возвращает результат fn() для ключа, выполняя не более одного
+        вычисления на ключ одновременно.
+
+        Args:
+            key: Ключ запроса (маршрут, параметры, версии данных)
+            fn: Корутина вычисления
+            use_window: Разрешить ответ из микрокэша (False - только
+                присоединение к выполняющемуся вычислению)
+        """
+        if not self.enabled:
+            return await fn()
+
+        if self.window > 0 and use_window:
+            found, result = self._recent_result(key)
+            if found:
+                self._stats["window_hits"] += 1
+                return result
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self._stats["followers"] += 1
+            return await asyncio.shield(task)
+
+        self._stats["leaders"] += 1
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled():
+            return
+        if task.exception() is None and self.window > 0:
+            self._remember(key, task.result())
+
+    def stats(self) -> Dict[str, Any]:
+        total = sum(self._stats.values())
+        shared = self._stats["followers"] + self._stats["window_hits"]
+        return {
+            "enabled": self.enabled,
+            "window_ms": round(self.window * 1000, 3),
+            "in_flight": len(self._inflight),
+            **self._stats,
+            "coalesced_ratio": round(shared / total, 4) if total else None,
+        }
+
+
+# Общий объединитель запросов чтения
+singleflight = SingleFlight()
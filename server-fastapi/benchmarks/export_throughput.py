@@ -0,0 +1,54 @@
+"""
+Пропускная способность потоковой выгрузки /api/tables/{table}/export.
+
+Скрипт читает выгрузку целиком и печатает количество строк, объём,
+время и скорость (строк/с) в JSON. Сервер должен быть запущен заранее.
+
+Пример:
+    python benchmarks/export_throughput.py --table bench_items --format ndjson
+"""
+import argparse
+import json
+import time
+
+import httpx
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Скорость потоковой выгрузки таблицы")
+    parser.add_argument("--table", required=True)
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--format", default="ndjson", choices=["ndjson", "csv"])
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--fields", help="Проекция колонок через запятую")
+    args = parser.parse_args()
+
+    params = {"format": args.format, "chunk_size": args.chunk_size}
+    if args.fields:
+        params["fields"] = args.fields
+
+    lines = 0
+    size = 0
+    started = time.perf_counter()
+    first_byte = None
+    with httpx.stream("GET", f"{args.base_url}/api/tables/{args.table}/export", params=params, timeout=None) as response:
+        response.raise_for_status()
+        for chunk in response.iter_bytes():
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+            size += len(chunk)
+            lines += chunk.count(b"\n")
+    elapsed = time.perf_counter() - started
+
+    rows = lines - 1 if args.format == "csv" else lines
+    print(json.dumps({
+        "rows": rows,
+        "bytes": size,
+        "seconds": round(elapsed, 3),
+        "time_to_first_byte_ms": round((first_byte or 0) * 1000, 2),
+        "rows_per_second": round(rows / elapsed) if elapsed else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
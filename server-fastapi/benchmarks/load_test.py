@@ -0,0 +1,326 @@
+"""
+Нагрузочный тест API: пропускная способность и задержки p50/p95/p99 при
+конкурентных смешанных запросах.
+
+Скрипт при необходимости заполняет синтетическую таблицу (seed_data.py),
+поднимает uvicorn для каждой выбранной цели - app.main:app в режимах
+DB_ASYNC=false/true и simple_app:app - выполняет смешанную нагрузку
+(список таблиц, колонки, страницы, глубокая пагинация, поиск, вставка,
+обновление, удаление) заданной конкурентности и печатает отчёт в JSON.
+С --baseline отчёт сравнивается с сохранённым, и при регрессии скрипт
+завершается с кодом 1.
+
+Пример:
+    python benchmarks/load_test.py --seed-rows 200000 --width 10 --concurrency 64 --duration 30 \
+        --output bench.json
+    python benchmarks/load_test.py --seed-rows 200000 --width 10 --baseline bench.json
+
+Параметры подключения к MySQL берутся из .env, как и у самого приложения.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from seed_data import make_record, seed_table  # noqa: E402
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Кэш ответов и объединение запросов выключены: у simple_app их нет, и
+# сравнение горячего пути должно мерить запросы к базе, а не попадания в кэш
+NO_CACHE_ENV = {"RESPONSE_CACHE_ENABLED": "false", "SINGLEFLIGHT_ENABLED": "false"}
+
+# Цели сравнения: приложение и переменные окружения сервера
+TARGETS = {
+    "app-sync": ("app.main:app", {"DB_ASYNC": "false", **NO_CACHE_ENV}),
+    "app-async": ("app.main:app", {"DB_ASYNC": "true", **NO_CACHE_ENV}),
+    "app-sync-cached": ("app.main:app", {"DB_ASYNC": "false"}),
+    "app-async-cached": ("app.main:app", {"DB_ASYNC": "true"}),
+    "simple": ("simple_app:app", {}),
+}
+# Старые имена режимов
+TARGET_ALIASES = {"sync": "app-sync", "async": "app-async"}
+
+# Размер страницы для операций чтения
+PAGE_LIMIT = 50
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0,
+        "p50_ms": _ms(percentile(latencies, 50)),
+        "p95_ms": _ms(percentile(latencies, 95)),
+        "p99_ms": _ms(percentile(latencies, 99)),
+        "max_ms": _ms(max(latencies) if latencies else None),
+    }
+
+
+def _ms(value: Optional[float]) -> Optional[float]:
+    return round(value * 1000, 2) if value is not None else None
+
+
+class Workload:
+    """Набор операций со взвешенным случайным выбором"""
+
+    def __init__(
+        self,
+        table: str,
+        search: str,
+        max_page: int,
+        insert_payload: Optional[Dict[str, Any]],
+        pk: str,
+        total_rows: Optional[int] = None,
+        width: int = 0
+    ):
+        self.table = table
+        self.search = search
+        self.max_page = max_page
+        self.insert_payload = insert_payload
+        self.pk = pk
+        self.width = width
+        self.rng = random.Random(7)
+        # Ключи записей, созданных во время нагрузки: их обновляет и удаляет тест
+        self.created: List[Any] = []
+        self.last_page = max(1, (total_rows or 0) // PAGE_LIMIT)
+        self.operations = [
+            ("tables", 1, self.list_tables),
+            ("columns", 1, self.columns),
+            ("data", 4, self.data_page),
+            ("search", 2, self.search_page),
+        ]
+        if total_rows:
+            self.operations.append(("deep_page", 2, self.deep_page))
+        if insert_payload or width or total_rows:
+            self.operations += [
+                ("insert", 1, self.insert),
+                ("update", 1, self.update),
+                ("delete", 1, self.delete),
+            ]
+
+    def choose(self):
+        names, weights, calls = zip(*self.operations)
+        index = random.choices(range(len(names)), weights=weights)[0]
+        return names[index], calls[index]
+
+    def payload(self) -> Dict[str, Any]:
+        if self.insert_payload:
+            return dict(self.insert_payload)
+        record = make_record(self.rng.randint(10 ** 6, 10 ** 7), self.width, self.rng)
+        record["name"] = "bench " + record["name"]
+        return record
+
+    async def list_tables(self, client: httpx.AsyncClient):
+        return [await client.get("/api/tables")]
+
+    async def columns(self, client: httpx.AsyncClient):
+        return [await client.get(f"/api/tables/{self.table}/columns")]
+
+    async def data_page(self, client: httpx.AsyncClient):
+        page = random.randint(1, self.max_page)
+        return [await client.get(f"/api/tables/{self.table}/data", params={"page": page, "limit": PAGE_LIMIT})]
+
+    async def deep_page(self, client: httpx.AsyncClient):
+        # Последние 10% страниц: стоимость OFFSET растёт с номером страницы
+        page = random.randint(max(1, self.last_page * 9 // 10), self.last_page)
+        return [await client.get(f"/api/tables/{self.table}/data", params={"page": page, "limit": PAGE_LIMIT})]
+
+    async def search_page(self, client: httpx.AsyncClient):
+        return [await client.get(f"/api/tables/{self.table}/data", params={"search": self.search, "limit": PAGE_LIMIT})]
+
+    async def insert(self, client: httpx.AsyncClient):
+        created = await client.post(f"/api/tables/{self.table}/data", json=self.payload())
+        row_id = created.json().get(self.pk) if created.status_code == 200 else None
+        if row_id is not None:
+            self.created.append(row_id)
+        return [created]
+
+    async def update(self, client: httpx.AsyncClient):
+        if not self.created:
+            return await self.insert(client)
+        row_id = random.choice(self.created)
+        data = self.payload()
+        data.pop("created_at", None)
+        return [await client.put(f"/api/tables/{self.table}/data/{row_id}", json=data)]
+
+    async def delete(self, client: httpx.AsyncClient):
+        if not self.created:
+            return await self.insert(client)
+        row_id = self.created.pop(random.randrange(len(self.created)))
+        return [await client.delete(f"/api/tables/{self.table}/data/{row_id}")]
+
+    async def cleanup(self, client: httpx.AsyncClient) -> None:
+        # Записи, созданные тестом и не удалённые им, не должны искажать следующий прогон
+        while self.created:
+            await client.delete(f"/api/tables/{self.table}/data/{self.created.pop()}")
+
+
+async def run_load(base_url: str, workload: Workload, concurrency: int, duration: float) -> Dict[str, Any]:
+    latencies: Dict[str, List[float]] = {name: [] for name, _, _ in workload.operations}
+    errors: Dict[str, int] = {name: 0 for name, _, _ in workload.operations}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                name, call = workload.choose()
+                started = time.perf_counter()
+                try:
+                    responses = await call(client)
+                    failed = any(r.status_code >= 400 for r in responses)
+                except httpx.HTTPError:
+                    failed = True
+                latencies[name].append(time.perf_counter() - started)
+                if failed:
+                    errors[name] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        await workload.cleanup(client)
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        "total": summarize(all_latencies, sum(errors.values()), elapsed),
+        "endpoints": {name: summarize(latencies[name], errors[name], elapsed) for name in latencies},
+    }
+
+
+def start_server(app: str, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT_DIR,
+        env={**os.environ, **env},
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Сервер {app} завершился с кодом {process.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"Сервер {app} не запустился за 30 секунд")
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[Dict[str, Any]]:
+    """
+    Регрессии относительно сохранённого отчёта: p95 выше или rps ниже
+    больше чем на max_regression (доля) для той же цели и операции.
+    """
+    regressions = []
+    for target, result in report["targets"].items():
+        previous = baseline.get("targets", {}).get(target)
+        if not previous:
+            continue
+        for name, current in {"total": result["total"], **result["endpoints"]}.items():
+            before = previous["endpoints"].get(name) if name != "total" else previous["total"]
+            if not before or not current["requests"] or not before["requests"]:
+                continue
+            if before["p95_ms"] and current["p95_ms"] > before["p95_ms"] * (1 + max_regression):
+                regressions.append({"target": target, "endpoint": name, "metric": "p95_ms",
+                                    "baseline": before["p95_ms"], "current": current["p95_ms"]})
+            if before["rps"] and current["rps"] < before["rps"] * (1 - max_regression):
+                regressions.append({"target": target, "endpoint": name, "metric": "rps",
+                                    "baseline": before["rps"], "current": current["rps"]})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение реализаций сервера и режимов работы с базой под нагрузкой")
+    parser.add_argument("--table", default="bench_items", help="Таблица для запросов данных")
+    parser.add_argument("--targets", "--modes", dest="targets", default="app-sync,app-async,simple",
+                        help="Цели через запятую: app-sync, app-async, simple")
+    parser.add_argument("--seed-rows", type=int, help="Заполнить таблицу синтетическими данными (количество записей)")
+    parser.add_argument("--width", type=int, default=8, help="Количество дополнительных колонок синтетической таблицы")
+    parser.add_argument("--reseed", action="store_true", help="Пересоздать синтетическую таблицу")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20, help="Длительность нагрузки для каждой цели, секунды")
+    parser.add_argument("--warmup", type=float, default=3, help="Прогрев перед измерением, секунды")
+    parser.add_argument("--search", default="alpha", help="Поисковый запрос для операции search")
+    parser.add_argument("--max-page", type=int, default=20, help="Максимальный номер страницы для операции data")
+    parser.add_argument("--insert-payload", help="JSON записи для вставки (по умолчанию - синтетическая запись)")
+    parser.add_argument("--pk", default="id", help="Колонка первичного ключа вставленных записей")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--output", help="Сохранить отчёт в файл")
+    parser.add_argument("--baseline", help="Отчёт предыдущего прогона для поиска регрессий")
+    parser.add_argument("--max-regression", type=float, default=0.15, help="Допустимое ухудшение p95/rps (доля)")
+    args = parser.parse_args()
+
+    dataset = None
+    if args.seed_rows:
+        dataset = seed_table(args.table, args.seed_rows, args.width, reseed=args.reseed)
+
+    payload = json.loads(args.insert_payload) if args.insert_payload else None
+    width = args.width if dataset else 0
+    total_rows = dataset["rows"] if dataset else None
+
+    report = {
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "dataset": dataset,
+        "targets": {},
+    }
+    for target in [t.strip() for t in args.targets.split(",") if t.strip()]:
+        target = TARGET_ALIASES.get(target, target)
+        if target not in TARGETS:
+            raise SystemExit(f"Неизвестная цель: {target}")
+        app, env = TARGETS[target]
+        workload = Workload(args.table, args.search, args.max_page, payload, args.pk, total_rows, width)
+        process = start_server(app, args.port, env)
+        try:
+            base_url = f"http://127.0.0.1:{args.port}"
+            if args.warmup:
+                asyncio.run(run_load(base_url, workload, args.concurrency, args.warmup))
+            report["targets"][target] = asyncio.run(run_load(base_url, workload, args.concurrency, args.duration))
+        finally:
+            stop_server(process)
+
+    regressions = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.max_regression)
+        report["regressions"] = regressions
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    print(output)
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Заполнение базы синтетическими таблицами для нагрузочного теста.
+
+Создаёт таблицу с автоинкрементным ключом, индексированными колонками
+category/created_at, текстовой колонкой name для поиска и width
+дополнительных колонок VARCHAR, затем вставляет rows записей пакетами.
+Подходит MySQL или MariaDB (например, docker run -e MARIADB_ALLOW_EMPTY_ROOT_PASSWORD=1
+-p 3306:3306 mariadb); параметры подключения берутся из .env, как у приложения.
+
+Пример:
+    python benchmarks/seed_data.py --table bench_items --rows 200000 --width 10
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import time
+from typing import Any, Dict, List
+
+import pymysql
+from dotenv import load_dotenv
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Слова для текстовых колонок (поиск по name)
+WORDS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliet"]
+
+
+def connect():
+    load_dotenv(os.path.join(ROOT_DIR, ".env"))
+    return pymysql.connect(
+        host=os.getenv("DB_HOST", "localhost"),
+        port=int(os.getenv("DB_PORT", "3306")),
+        user=os.getenv("DB_USER", "root"),
+        password=os.getenv("DB_PASSWORD", ""),
+        database=os.getenv("DB_NAME", "database_name"),
+        charset="utf8mb4",
+        autocommit=True,
+    )
+
+
+def extra_columns(width: int) -> List[str]:
+    return [f"c_{idx}" for idx in range(width)]
+
+
+def make_record(index: int, width: int, rng: random.Random) -> Dict[str, Any]:
+    """
+    Синтетическая запись; используется и для вставок во время нагрузки.
+    """
+    created = datetime.datetime(2024, 1, 1) + datetime.timedelta(seconds=index * 37)
+    record = {
+        "name": f"{rng.choice(WORDS)} {rng.choice(WORDS)} {index}",
+        "category": rng.randint(1, 50),
+        "amount": f"{rng.uniform(0, 10000):.2f}",
+        "created_at": created.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    for column in extra_columns(width):
+        record[column] = f"{column}-{rng.getrandbits(48):012x}"
+    return record
+
+
+def table_rows(cursor, table: str) -> int:
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table,)
+    )
+    if not cursor.fetchone()[0]:
+        return -1
+    cursor.execute(f"SELECT COUNT(*) FROM `{table}`")
+    return cursor.fetchone()[0]
+
+
+def seed_table(table: str, rows: int, width: int, batch_size: int = 1000, reseed: bool = False, seed: int = 42) -> Dict[str, Any]:
+    """
+    Создаёт и заполняет таблицу, если в ней нет ровно rows записей
+    (или задан reseed). Возвращает описание набора данных.
+    """
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    connection = connect()
+    try:
+        with connection.cursor() as cursor:
+            existing = table_rows(cursor, table)
+            if existing == rows and not reseed:
+                return {"table": table, "rows": rows, "width": width, "seeded": False, "seconds": 0}
+
+            definitions = [
+                "`id` INT NOT NULL AUTO_INCREMENT",
+                "`name` VARCHAR(128) NOT NULL",
+                "`category` INT NOT NULL",
+                "`amount` DECIMAL(10, 2) NOT NULL",
+                "`created_at` DATETIME NOT NULL",
+            ]
+            definitions += [f"`{column}` VARCHAR(32) NOT NULL" for column in extra_columns(width)]
+            definitions += [
+                "PRIMARY KEY (`id`)",
+                "KEY `ix_category` (`category`, `id`)",
+                "KEY `ix_created_at` (`created_at`)",
+            ]
+            cursor.execute(f"DROP TABLE IF EXISTS `{table}`")
+            cursor.execute(
+                f"CREATE TABLE `{table}` ({', '.join(definitions)}) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+            )
+
+            names = ["name", "category", "amount", "created_at"] + extra_columns(width)
+            query = (
+                f"INSERT INTO `{table}` ({', '.join(f'`{name}`' for name in names)}) "
+                f"VALUES ({', '.join(['%s'] * len(names))})"
+            )
+            for offset in range(0, rows, batch_size):
+                batch = [
+                    [record[name] for name in names]
+                    for record in (make_record(index, width, rng) for index in range(offset, min(rows, offset + batch_size)))
+                ]
+                cursor.executemany(query, batch)
+            cursor.execute(f"ANALYZE TABLE `{table}`")
+            cursor.fetchall()
+    finally:
+        connection.close()
+
+    return {
+        "table": table,
+        "rows": rows,
+        "width": width,
+        "seeded": True,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Заполнение синтетической таблицы для нагрузочного теста")
+    parser.add_argument("--table", default="bench_items")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--width", type=int, default=8, help="Количество дополнительных колонок VARCHAR")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--reseed", action="store_true", help="Пересоздать таблицу, даже если она уже заполнена")
+    args = parser.parse_args()
+
+    print(json.dumps(seed_table(args.table, args.rows, args.width, args.batch_size, args.reseed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
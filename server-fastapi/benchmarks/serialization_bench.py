@@ -0,0 +1,84 @@
+"""
+Микробенчмарк сериализации ответа /api/tables/{table}/data.
+
+Сравнивает обычный путь FastAPI (проверка response_model TableData,
+jsonable_encoder, стандартный json) с быстрым путём FAST_JSON (dumps
+из app.utils.serialization - orjson, если установлен) на синтетической
+странице с datetime, Decimal и bytes. База данных не нужна.
+
+Пример (из каталога server-fastapi):
+    python benchmarks/serialization_bench.py --rows 500 --columns 20
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import timeit
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.models.models import TableData  # noqa: E402
+from app.utils.serialization import HAS_ORJSON, dumps  # noqa: E402
+
+
+def make_page(rows: int, columns: int) -> dict:
+    now = datetime.datetime(2024, 3, 1, 12, 30, 15, 123456)
+    kinds = [
+        lambda i: i,
+        lambda i: f"Строка номер {i}",
+        lambda i: now + datetime.timedelta(minutes=i),
+        lambda i: Decimal(i) / Decimal(100),
+        lambda i: (now + datetime.timedelta(days=i)).date(),
+        lambda i: f"payload-{i}".encode("utf-8"),
+        lambda i: None if i % 3 else i * 1.5,
+    ]
+    names = [f"col_{c}" for c in range(columns)]
+    data = [
+        {name: kinds[c % len(kinds)](r) for c, name in enumerate(names)}
+        for r in range(rows)
+    ]
+    return {"data": data, "pagination": {"total": rows * 100, "page": 1, "limit": rows, "pages": 100}}
+
+
+def default_path(page: dict) -> bytes:
+    # То же, что делает FastAPI для обработчика с response_model
+    validated = TableData.model_validate(page)
+    encoded = jsonable_encoder(validated)
+    return json.dumps(encoded, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(page: dict) -> bytes:
+    return dumps(page)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение путей сериализации ответа")
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--columns", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    page = make_page(args.rows, args.columns)
+    if json.loads(default_path(page)) != json.loads(fast_path(page)):
+        raise SystemExit("Результаты путей сериализации различаются")
+
+    results = {}
+    for name, fn in (("default", default_path), ("fast", fast_path)):
+        timings = timeit.repeat(lambda: fn(page), repeat=args.repeat, number=args.number)
+        best = min(timings) / args.number
+        results[name] = {"ms_per_page": round(best * 1000, 3), "bytes": len(fn(page))}
+
+    results["speedup"] = round(results["default"]["ms_per_page"] / results["fast"]["ms_per_page"], 2)
+    results["orjson"] = HAS_ORJSON
+    results["rows"] = args.rows
+    results["columns"] = args.columns
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,177 @@
 import os
+import sys
+import argparse
+import importlib.util
+import logging
 import uvicorn
 from dotenv import load_dotenv
 
 # Загружаем переменные окружения
 load_dotenv()
 
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("run")
+
+# Параметры запуска
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("API_PORT", 5000))
+# Время на завершение обрабатываемых запросов при остановке, секунды
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+# Соединения MySQL, оставляемые для администрирования и других клиентов
+DB_RESERVED_CONNECTIONS = int(os.getenv("DB_RESERVED_CONNECTIONS", "10"))
+
+
+def has_module(name: str) -> bool:
+    return importlib.util.find_spec(name) is not None
+
+
+def detect_max_connections() -> int:
+    """
+    Лимит соединений для всех воркеров: DB_MAX_CONNECTIONS или
+    @@max_connections сервера за вычетом DB_RESERVED_CONNECTIONS.
+    """
+    configured = int(os.getenv("DB_MAX_CONNECTIONS", "0"))
+    if configured > 0:
+        return configured
+    try:
+        import pymysql
+        connection = pymysql.connect(
+            host=os.getenv("DB_HOST", "localhost"),
+            port=int(os.getenv("DB_PORT", "3306")),
+            user=os.getenv("DB_USER", "root"),
+            password=os.getenv("DB_PASSWORD", ""),
+            database=os.getenv("DB_NAME", "database_name"),
+            connect_timeout=int(os.getenv("DB_CONNECT_TIMEOUT", "5")),
+        )
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT @@max_connections")
+                return max(1, cursor.fetchone()[0] - DB_RESERVED_CONNECTIONS)
+        finally:
+            connection.close()
+    except Exception as e:
+        logger.warning(f"Не удалось определить max_connections MySQL, размер пула не ограничен: {e}")
+        return 0
+
+
+def check_worker_state(workers: int, allow_local_cache: bool) -> bool:
+    """
+    Проверка состояния, которое хранится в памяти каждого воркера.
+
+    Версии таблиц кэша ответов в памяти у каждого воркера свои: запись на
+    одном воркере не сбрасывает кэш другого, и клиент после своей записи
+    до RESPONSE_CACHE_TTL получает устаревший ответ (200 или 304). Поэтому
+    при нескольких воркерах нужен общий кэш (RESPONSE_CACHE_URL) или
+    выключенный кэш. Возвращает False, если запускать нельзя.
+    """
+    if workers <= 1:
+        return True
+    cache_enabled = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    if cache_enabled and not os.getenv("RESPONSE_CACHE_URL"):
+        message = (
+            f"Воркеров {workers}, а кэш ответов хранится в памяти каждого воркера: после записи другие "
+            f"воркеры до RESPONSE_CACHE_TTL отдают устаревшие ответы. Задайте RESPONSE_CACHE_URL (Redis), "
+            f"RESPONSE_CACHE_ENABLED=false или --workers 1"
+        )
+        if not allow_local_cache:
+            logger.error(message)
+            return False
+        logger.warning(message + " (запуск разрешён --allow-local-cache)")
+    # Остальное состояние тоже у каждого воркера своё, но не приводит к устаревшим ответам кэша
+    logger.warning(
+        "Сброс кэша схемы (/api/admin/schema/invalidate) и кэш количества записей действуют только в воркере, "
+        "обработавшем запрос. Журнал изменений у каждого воркера свой: клиент /changes и SSE, попавший "
+        "после переподключения на другой воркер, получит 410 (другая эпоха) и пропустит события чужих воркеров"
+    )
+    return True
+
+
+def run_development():
+    # Один процесс с автоперезапуском при изменении файлов
+    logger.info(f"Запуск сервера разработки на порту {API_PORT}")
+    uvicorn.run("app.main:app", host=API_HOST, port=API_PORT, reload=True)
+
+
+def run_gunicorn(workers: int):
+    """
+    gunicorn с воркерами uvicorn: приложение и кэш схемы загружаются
+    в главном процессе до fork (preload), воркеры наследуют их.
+    """
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{API_HOST}:{API_PORT}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("worker_class", "uvicorn.workers.UvicornWorker")
+            self.cfg.set("preload_app", True)
+            self.cfg.set("graceful_timeout", GRACEFUL_TIMEOUT)
+            self.cfg.set("post_fork", post_fork)
+
+        def load(self):
+            from app import main
+            main.preload_schema_cache(dispose=True)
+            return main.app
+
+    def post_fork(server, worker):
+        # Соединения, открытые главным процессом, не должны использоваться воркером
+        from app.db.database import engine
+        engine.dispose(close=False)
+
+    Application().run()
+
+
+def run_uvicorn(workers: int):
+    # Воркеры uvicorn запускаются через spawn: кэш схемы заполняется в каждом при старте
+    loop = "uvloop" if has_module("uvloop") else "asyncio"
+    http = "httptools" if has_module("httptools") else "h11"
+    uvicorn.run(
+        "app.main:app",
+        host=API_HOST,
+        port=API_PORT,
+        workers=workers,
+        loop=loop,
+        http=http,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        proxy_headers=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Запуск API-сервера")
+    parser.add_argument("--reload", action="store_true", default=os.getenv("API_RELOAD", "false").lower() in ("1", "true", "yes"),
+                        help="Режим разработки: один процесс с автоперезапуском")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")),
+                        help="Количество воркеров (по умолчанию 1; больше - при общем кэше ответов, "
+                             "журнал изменений и кэши схемы и количества записей остаются у каждого воркера свои)")
+    parser.add_argument("--allow-local-cache", action="store_true",
+                        default=os.getenv("ALLOW_LOCAL_CACHE", "false").lower() in ("1", "true", "yes"),
+                        help="Разрешить несколько воркеров с кэшем ответов в памяти процесса")
+    parser.add_argument("--no-gunicorn", action="store_true", help="Не использовать gunicorn, даже если он установлен")
+    args = parser.parse_args()
+
+    if args.reload:
+        run_development()
+        return
+
+    if not check_worker_state(args.workers, args.allow_local_cache):
+        sys.exit(1)
+
+    # Параметры видны воркерам при импорте app.db.database: по ним делится лимит соединений
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+    max_connections = detect_max_connections()
+    if max_connections:
+        os.environ["DB_MAX_CONNECTIONS"] = str(max_connections)
+
+    logger.info(
+        f"Запуск сервера на порту {API_PORT}: воркеров {args.workers}, "
+        f"лимит соединений {max_connections or 'не задан'}"
+    )
+    if has_module("gunicorn") and sys.platform != "win32" and not args.no_gunicorn:
+        run_gunicorn(args.workers)
+    else:
+        run_uvicorn(args.workers)
+
+
 if __name__ == "__main__":
-    # Получаем порт из переменной окружения или используем значение по умолчанию
-    port = int(os.getenv("API_PORT", 5000))
-    
-    # Запускаем сервер
-    print(f"Запуск сервера на порту {port}")
-    uvicorn.run("app.main:app", host="0.0.0.0", port=port, reload=True) 
\ No newline at end of file
+    main()
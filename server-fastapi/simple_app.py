@@ -1,11 +1,20 @@
 import os
-from fastapi import FastAPI, Depends, HTTPException, Query, Path
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from fastapi import FastAPI, Depends, HTTPException, Query, Path, Request
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 from typing import Dict, List, Any, Optional
 import pymysql
 import pymysql.cursors
 from dotenv import load_dotenv
+from app.db import keyset
+from app.db.row_key import RowKeyError, find_key, path_segment, resolve_key
+from app.db.schema_cache import SchemaCatalog
+from app.db.query_builder import DB_SERVER_PREPARE, ServerPreparedStatements
+from app.utils.serialization import FORMAT_JSON, wants_compact
 
 # Загрузка переменных окружения
 load_dotenv()
@@ -34,21 +43,267 @@ DB_USER = os.getenv("DB_USER", "root")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "")
 DB_NAME = os.getenv("DB_NAME", "database_name")
 
-# Функция для создания соединения с базой данных
-def get_db_connection():
-    try:
-        connection = pymysql.connect(
+# Параметры пула соединений
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "3600"))
+DB_POOL_PING_INTERVAL = float(os.getenv("DB_POOL_PING_INTERVAL", "5"))
+
+class PoolTimeout(Exception):
+    """Свободное соединение не появилось за отведённое время"""
+
+# Ограниченный потокобезопасный пул соединений pymysql
+class ConnectionPool:
+    """
+    Пул держит от min_size до max_size соединений. При выдаче соединение,
+    простоявшее дольше ping_interval, проверяется ping(); соединения старше
+    max_lifetime закрываются и пересоздаются. Если все соединения заняты,
+    запрос ждёт освобождения не дольше timeout.
+    """
+
+    def __init__(self, min_size, max_size, timeout, max_lifetime, ping_interval):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.ping_interval = ping_interval
+        self._condition = threading.Condition()
+        # Свободные соединения: (соединение, время создания, время возврата)
+        self._idle = deque()
+        self._in_use = 0
+        self._size = 0
+        self._stats = {
+            "checkouts": 0,
+            "created": 0,
+            "closed": 0,
+            "failed_health_checks": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+        }
+
+    def _connect(self):
+        return pymysql.connect(
             host=DB_HOST,
             port=DB_PORT,
             user=DB_USER,
             password=DB_PASSWORD,
             database=DB_NAME,
-            cursorclass=pymysql.cursors.DictCursor
+            cursorclass=pymysql.cursors.DictCursor,
+            # Без autocommit соединение из пула держало бы снимок данных первой транзакции
+            autocommit=True
         )
-        return connection
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._condition:
+            self._size -= 1
+            self._stats["closed"] += 1
+            self._condition.notify()
+
+    def _is_usable(self, connection, created_at, released_at):
+        now = time.monotonic()
+        if now - created_at > self.max_lifetime:
+            return False
+        if now - released_at >= self.ping_interval:
+            try:
+                connection.ping(reconnect=False)
+            except Exception:
+                with self._condition:
+                    self._stats["failed_health_checks"] += 1
+                return False
+        return True
+
+    def warm_up(self):
+        """Создаёт соединения до min_size"""
+        while True:
+            with self._condition:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                connection = self._connect()
+            except Exception:
+                with self._condition:
+                    self._size -= 1
+                raise
+            with self._condition:
+                self._stats["created"] += 1
+                self._idle.append((connection, time.monotonic(), time.monotonic()))
+                self._condition.notify()
+
+    def acquire(self):
+        started = time.monotonic()
+        waited = False
+        while True:
+            with self._condition:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = self.timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(f"Нет свободных соединений в пуле за {self.timeout} с")
+                    waited = True
+                    self._condition.wait(remaining)
+
+                if self._idle:
+                    # LIFO: недавно использованные соединения не нуждаются в ping
+                    connection, created_at, released_at = self._idle.pop()
+                    create_new = False
+                else:
+                    self._size += 1
+                    create_new = True
+
+            if create_new:
+                try:
+                    connection = self._connect()
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+                created_at = time.monotonic()
+                with self._condition:
+                    self._stats["created"] += 1
+            elif not self._is_usable(connection, created_at, released_at):
+                self._close(connection)
+                continue
+
+            wait_time = time.monotonic() - started
+            with self._condition:
+                self._in_use += 1
+                self._stats["checkouts"] += 1
+                if waited:
+                    self._stats["waits"] += 1
+                    self._stats["wait_time_total"] += wait_time
+                    self._stats["wait_time_max"] = max(self._stats["wait_time_max"], wait_time)
+            return connection, created_at
+
+    def release(self, connection, created_at, discard=False):
+        with self._condition:
+            self._in_use -= 1
+        if discard or not connection.open or time.monotonic() - created_at > self.max_lifetime:
+            self._close(connection)
+            return
+        with self._condition:
+            self._idle.append((connection, created_at, time.monotonic()))
+            self._condition.notify()
+
+    def close_all(self):
+        with self._condition:
+            idle = list(self._idle)
+            self._idle.clear()
+        for connection, _, _ in idle:
+            self._close(connection)
+
+    def stats(self):
+        with self._condition:
+            waits = self._stats["waits"]
+            return {
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                **self._stats,
+                "wait_time_avg": self._stats["wait_time_total"] / waits if waits else 0.0,
+            }
+
+pool = ConnectionPool(
+    min_size=DB_POOL_MIN_SIZE,
+    max_size=DB_POOL_MAX_SIZE,
+    timeout=DB_POOL_TIMEOUT,
+    max_lifetime=DB_POOL_MAX_LIFETIME,
+    ping_interval=DB_POOL_PING_INTERVAL
+)
+
+# Получение соединения из пула. Обработчики, работающие с базой, объявлены
+# через def: FastAPI выполняет их в пуле потоков, и блокирующие вызовы
+# pymysql не останавливают цикл событий
+@contextmanager
+def db_connection():
+    try:
+        connection, created_at = pool.acquire()
+    except PoolTimeout as e:
+        print(f"Пул соединений исчерпан: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         print(f"Ошибка подключения к базе данных: {e}")
         raise HTTPException(status_code=500, detail=f"Ошибка подключения к базе данных: {str(e)}")
+    
+    discard = False
+    try:
+        yield connection
+    except HTTPException:
+        raise
+    except Exception:
+        # После ошибки откатываем незавершённую транзакцию; если не вышло - соединение негодно
+        try:
+            connection.rollback()
+        except Exception:
+            discard = True
+        raise
+    finally:
+        pool.release(connection, created_at, discard)
+
+# Кэш метаданных схемы поверх курсоров pymysql
+class PyMySQLSchemaCatalog(SchemaCatalog):
+    def _fetch_all(self, cursor, sql, params=None):
+        cursor.execute(sql, params)
+        return list(cursor.fetchall())
+
+    def _bind_key(self, cursor):
+        return f"{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+    def get_database_name(self, cursor):
+        return DB_NAME
+
+schema_catalog = PyMySQLSchemaCatalog()
+
+# Попадания и промахи серверных подготовленных запросов по всем соединениям
+prepared_counters = {"hits": 0, "misses": 0}
+
+# Выполнение запроса: при DB_SERVER_PREPARE=true - через PREPARE/EXECUTE,
+# подготовленные запросы хранятся на соединении до его закрытия
+def execute(cursor, sql, params=None):
+    if not DB_SERVER_PREPARE:
+        cursor.execute(sql, params)
+        return
+    connection = cursor.connection
+    statements = getattr(connection, "prepared_statements", None)
+    if statements is None:
+        statements = ServerPreparedStatements(counters=prepared_counters)
+        connection.prepared_statements = statements
+    statements.execute(cursor, sql, params)
+
+# Ключ адресации записей и его значения из пути (составной ключ - через запятую,
+# части декодируются по отдельности)
+def get_row_key(table, request: Request, row_id: str):
+    try:
+        key = resolve_key(table)
+        return key, key.from_path(path_segment(request.scope, row_id))
+    except RowKeyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def key_condition(key) -> str:
+    return " AND ".join(f"`{col}` = %s" for col in key.names)
+
+# Заполнение пула при старте (ошибка подключения не мешает запуску)
+@app.on_event("startup")
+def warm_up_pool():
+    try:
+        pool.warm_up()
+    except Exception as e:
+        print(f"Не удалось заполнить пул соединений: {e}")
+
+# Закрытие соединений при остановке
+@app.on_event("shutdown")
+def close_pool():
+    pool.close_all()
 
 # Корневой маршрут
 @app.get("/")
@@ -61,46 +316,27 @@ async def root():
 
 # Получение списка таблиц
 @app.get("/api/tables")
-async def get_tables():
+def get_tables():
     try:
-        connection = get_db_connection()
-        with connection.cursor() as cursor:
-            query = """
-                SELECT table_name as TABLE_NAME
-                FROM information_schema.tables 
-                WHERE table_schema = %s
-                ORDER BY table_name;
-            """
-            cursor.execute(query, (DB_NAME,))
-            tables = cursor.fetchall()
-            connection.close()
+        with db_connection() as connection, connection.cursor() as cursor:
+            tables = [{"TABLE_NAME": name} for name in schema_catalog.get_tables(cursor)]
             return tables
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Ошибка при получении списка таблиц: {e}")
         raise HTTPException(status_code=500, detail=f"Ошибка сервера: {str(e)}")
 
 # Получение информации о структуре таблицы (колонки)
 @app.get("/api/tables/{table_name}/columns")
-async def get_table_columns(table_name: str):
+def get_table_columns(table_name: str):
     try:
-        connection = get_db_connection()
-        with connection.cursor() as cursor:
-            query = """
-                SELECT 
-                    column_name, 
-                    data_type, 
-                    is_nullable 
-                FROM 
-                    information_schema.columns 
-                WHERE 
-                    table_schema = %s AND 
-                    table_name = %s
-                ORDER BY 
-                    ordinal_position
-            """
-            cursor.execute(query, (DB_NAME, table_name))
-            columns = cursor.fetchall()
-            connection.close()
+        with db_connection() as connection, connection.cursor() as cursor:
+            table = schema_catalog.get_table(cursor, table_name)
+            columns = [
+                {"column_name": col.name, "data_type": col.data_type, "is_nullable": col.is_nullable}
+                for col in table.columns
+            ] if table else []
             
             if not columns:
                 raise HTTPException(status_code=404, detail=f"Таблица '{table_name}' не найдена")
@@ -112,32 +348,38 @@ async def get_table_columns(table_name: str):
         print(f"Ошибка при получении структуры таблицы '{table_name}': {e}")
         raise HTTPException(status_code=500, detail=f"Ошибка сервера: {str(e)}")
 
+# Представление строк: компактное (колонки + массивы) или список словарей
+def _rows_payload(columns: List[str], rows: List[tuple], compact: bool) -> Dict[str, Any]:
+    if compact:
+        return {"columns": columns, "rows": rows}
+    return {"data": [dict(zip(columns, row)) for row in rows]}
+
 # Получение данных из таблицы с поддержкой поиска
 @app.get("/api/tables/{table_name}/data")
-async def get_table_data(
+def get_table_data(
+    request: Request,
     table_name: str,
     page: int = Query(1, ge=1),
     limit: int = Query(50, ge=1, le=500),
-    search: Optional[str] = Query(None)
+    search: Optional[str] = Query(None),
+    mode: str = Query("offset", pattern="^(offset|keyset)$"),
+    cursor_token: Optional[str] = Query(None, alias="cursor"),
+    format: str = Query(FORMAT_JSON, pattern="^(json|compact)$")
 ):
     try:
-        connection = get_db_connection()
-        with connection.cursor() as cursor:
-            # Сначала получим одну запись из таблицы, чтобы определить структуру
-            sample_query = f"SELECT * FROM `{table_name}` LIMIT 1"
-            
-            try:
-                cursor.execute(sample_query)
-                sample_row = cursor.fetchone()
-            except Exception as e:
-                raise HTTPException(status_code=404, detail=f"Таблица '{table_name}' не найдена или ошибка доступа")
-            
-            if not sample_row:
-                # Таблица существует, но пуста - вернем пустой результат
-                return {"data": [], "pagination": {"total": 0, "page": page, "limit": limit, "pages": 0}}
+        compact = wants_compact(format, request.headers.get("accept"))
+        
+        if cursor_token and mode != "keyset":
+            raise HTTPException(status_code=400, detail="Параметр cursor допустим только в режиме keyset")
+        
+        with db_connection() as connection, connection.cursor() as cursor:
+            # Структура таблицы берётся из кэша схемы
+            table = schema_catalog.get_table(cursor, table_name)
+            if table is None:
+                raise HTTPException(status_code=404, detail=f"Таблица '{table_name}' не найдена")
             
             # Получаем имена столбцов
-            columns = list(sample_row.keys())
+            columns = table.column_names
             
             offset = (page - 1) * limit
             
@@ -145,6 +387,7 @@ async def get_table_data(
             query_parts = [f"SELECT * FROM `{table_name}`"]
             count_query_parts = [f"SELECT COUNT(*) as total FROM `{table_name}`"]
             query_params = []
+            conditions = []
             
             # Если есть поисковый запрос, добавляем условия поиска по всем столбцам
             if search:
@@ -155,31 +398,81 @@ async def get_table_data(
                 
                 if search_conditions:
                     search_clause = " OR ".join(search_conditions)
-                    query_parts.append(f"WHERE {search_clause}")
+                    conditions.append(f"({search_clause})")
                     count_query_parts.append(f"WHERE {search_clause}")
             
-            # Добавляем пагинацию
-            query_parts.append("LIMIT %s OFFSET %s")
-            query_params.extend([limit, offset])
+            count_params = list(query_params)
+            
+            if mode == "keyset":
+                # Первичный ключ или уникальный индекс для перехода по ключу
+                key_columns = table.key_columns
+                if not key_columns:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Таблица '{table_name}' не имеет первичного ключа или уникального индекса для режима keyset"
+                    )
+                
+                direction = keyset.DIRECTION_NEXT
+                if cursor_token:
+                    try:
+                        cursor_values, direction = keyset.decode_cursor(cursor_token, len(key_columns))
+                    except keyset.CursorError as e:
+                        raise HTTPException(status_code=400, detail=str(e))
+                    seek_clause, _ = keyset.build_seek_clause(key_columns, direction)
+                    # Именованные параметры заменяются позиционными в порядке появления
+                    for idx in reversed(range(len(key_columns))):
+                        seek_clause = seek_clause.replace(f":cursor_{idx}", "%s")
+                    conditions.append(seek_clause)
+                    for idx in range(len(key_columns)):
+                        query_params.extend(cursor_values[:idx + 1])
+                
+                if conditions:
+                    query_parts.append("WHERE " + " AND ".join(conditions))
+                query_parts.append(keyset.build_order_clause(key_columns, direction))
+                query_parts.append("LIMIT %s")
+                query_params.append(limit + 1)
+            else:
+                if conditions:
+                    query_parts.append("WHERE " + " AND ".join(conditions))
+                # Добавляем пагинацию
+                query_parts.append("LIMIT %s OFFSET %s")
+                query_params.extend([limit, offset])
             
             # Собираем финальные запросы
             data_query = " ".join(query_parts)
             count_query = " ".join(count_query_parts)
             
-            # Выполняем запросы
-            cursor.execute(data_query, query_params)
-            rows = cursor.fetchall()
+            # Данные читаются обычным курсором: строки приходят кортежами,
+            # без построения словаря на каждую строку в драйвере
+            with connection.cursor(pymysql.cursors.Cursor) as row_cursor:
+                execute(row_cursor, data_query, query_params)
+                rows = list(row_cursor.fetchall())
+                row_columns = [description[0] for description in row_cursor.description]
             
             # Запрос для подсчета общего количества записей
-            count_params = query_params[:-2] if query_params else []
-            cursor.execute(count_query, count_params)
+            execute(cursor, count_query, count_params)
             count_result = cursor.fetchone()
             total_count = count_result['total'] if count_result else 0
             
-            connection.close()
+            if mode == "keyset":
+                key_positions = [row_columns.index(col) for col in key_columns]
+                rows, next_cursor, prev_cursor = keyset.paginate_rows(
+                    rows, key_positions, limit, direction, has_cursor=bool(cursor_token)
+                )
+                return {
+                    **_rows_payload(row_columns, rows, compact),
+                    "pagination": {
+                        "mode": "keyset",
+                        "total": total_count,
+                        "limit": limit,
+                        "pages": (total_count + limit - 1) // limit if limit > 0 else 0,
+                        "next_cursor": next_cursor,
+                        "prev_cursor": prev_cursor
+                    }
+                }
             
             return {
-                "data": rows,
+                **_rows_payload(row_columns, rows, compact),
                 "pagination": {
                     "total": total_count,
                     "page": page,
@@ -195,13 +488,16 @@ async def get_table_data(
 
 # Добавление новой записи в таблицу
 @app.post("/api/tables/{table_name}/data")
-async def add_table_row(table_name: str, data: Dict[str, Any]):
+def add_table_row(table_name: str, data: Dict[str, Any]):
     try:
-        connection = get_db_connection()
-        with connection.cursor() as cursor:
+        with db_connection() as connection, connection.cursor() as cursor:
             if not data:
                 raise HTTPException(status_code=400, detail="Отсутствуют данные для добавления")
             
+            table = schema_catalog.get_table(cursor, table_name)
+            if table is None:
+                raise HTTPException(status_code=404, detail=f"Таблица '{table_name}' не найдена")
+            
             columns = list(data.keys())
             placeholders = ["%s" for _ in columns]
             values = list(data.values())
@@ -213,93 +509,73 @@ async def add_table_row(table_name: str, data: Dict[str, Any]):
                 VALUES ({', '.join(placeholders)})
             """
             
-            # Выполняем запрос
-            cursor.execute(query, values)
-            connection.commit()
+            # Выполняем запрос (соединения пула работают в режиме autocommit)
+            execute(cursor, query, values)
             
             insert_id = cursor.lastrowid
             
-            # Получаем имя первичного ключа
-            pk_query = """
-                SELECT column_name
-                FROM information_schema.key_column_usage
-                WHERE constraint_name = 'PRIMARY'
-                AND table_schema = %s
-                AND table_name = %s
-            """
-            
-            cursor.execute(pk_query, (DB_NAME, table_name))
-            pk_result = cursor.fetchone()
-            
-            pk_column = pk_result['column_name'] if pk_result else 'id'
+            key = find_key(table)
+            key_values = key.inserted(data, insert_id) if key is not None else None
             
             # Получаем добавленную запись
-            if insert_id:
-                select_query = f"SELECT * FROM `{table_name}` WHERE `{pk_column}` = %s"
-                cursor.execute(select_query, (insert_id,))
+            if key_values:
+                select_query = f"SELECT * FROM `{table_name}` WHERE {key_condition(key)}"
+                execute(cursor, select_query, key_values)
                 row = cursor.fetchone()
                 
                 if row:
-                    connection.close()
                     return row
                 else:
-                    connection.close()
                     return {"message": "Запись добавлена успешно", "insertId": insert_id}
             else:
-                connection.close()
                 return {"message": "Запись добавлена успешно"}
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Ошибка при добавлении записи в таблицу '{table_name}': {e}")
         raise HTTPException(status_code=500, detail=f"Ошибка при добавлении записи: {str(e)}")
 
 # Обновление записи в таблице
 @app.put("/api/tables/{table_name}/data/{row_id}")
-async def update_table_row(table_name: str, row_id: str, data: Dict[str, Any]):
+def update_table_row(request: Request, table_name: str, row_id: str, data: Dict[str, Any]):
     try:
-        connection = get_db_connection()
-        with connection.cursor() as cursor:
-            # Получаем имя первичного ключа
-            pk_query = """
-                SELECT column_name
-                FROM information_schema.key_column_usage
-                WHERE constraint_name = 'PRIMARY'
-                AND table_schema = %s
-                AND table_name = %s
-            """
-            
-            cursor.execute(pk_query, (DB_NAME, table_name))
-            pk_result = cursor.fetchone()
+        with db_connection() as connection, connection.cursor() as cursor:
+            # Получаем имя первичного ключа из кэша схемы
+            table = schema_catalog.get_table(cursor, table_name)
+            if table is None:
+                raise HTTPException(status_code=404, detail=f"Таблица '{table_name}' не найдена")
             
-            pk_column = pk_result['column_name'] if pk_result else 'id'
+            key, key_values = get_row_key(table, request, row_id)
+            try:
+                # Ключ мог измениться вместе с данными
+                new_values = key.after_update(key_values, data)
+            except RowKeyError as e:
+                raise HTTPException(status_code=400, detail=str(e))
             
             # Формируем запрос на обновление
             set_clauses = [f"`{col}` = %s" for col in data.keys()]
             values = list(data.values())
-            values.append(row_id)
+            values.extend(key_values)
             
             query = f"""
                 UPDATE `{table_name}` 
                 SET {', '.join(set_clauses)} 
-                WHERE `{pk_column}` = %s
+                WHERE {key_condition(key)}
             """
             
-            # Выполняем запрос
-            cursor.execute(query, values)
-            connection.commit()
+            # Выполняем запрос (соединения пула работают в режиме autocommit)
+            execute(cursor, query, values)
             
             affected_rows = cursor.rowcount
             
             if affected_rows == 0:
-                connection.close()
                 raise HTTPException(status_code=404, detail=f"Запись с ID {row_id} не найдена")
             
             # Получаем обновленную запись
-            select_query = f"SELECT * FROM `{table_name}` WHERE `{pk_column}` = %s"
-            cursor.execute(select_query, (row_id,))
+            select_query = f"SELECT * FROM `{table_name}` WHERE {key_condition(key)}"
+            execute(cursor, select_query, new_values)
             updated_row = cursor.fetchone()
             
-            connection.close()
-            
             if updated_row:
                 return updated_row
             else:
@@ -312,43 +588,31 @@ async def update_table_row(table_name: str, row_id: str, data: Dict[str, Any]):
 
 # Удаление записи из таблицы
 @app.delete("/api/tables/{table_name}/data/{row_id}")
-async def delete_table_row(table_name: str, row_id: str):
+def delete_table_row(request: Request, table_name: str, row_id: str):
     try:
-        connection = get_db_connection()
-        with connection.cursor() as cursor:
-            # Получаем имя первичного ключа
-            pk_query = """
-                SELECT column_name
-                FROM information_schema.key_column_usage
-                WHERE constraint_name = 'PRIMARY'
-                AND table_schema = %s
-                AND table_name = %s
-            """
-            
-            cursor.execute(pk_query, (DB_NAME, table_name))
-            pk_result = cursor.fetchone()
+        with db_connection() as connection, connection.cursor() as cursor:
+            # Получаем имя первичного ключа из кэша схемы
+            table = schema_catalog.get_table(cursor, table_name)
+            if table is None:
+                raise HTTPException(status_code=404, detail=f"Таблица '{table_name}' не найдена")
             
-            pk_column = pk_result['column_name'] if pk_result else 'id'
+            key, key_values = get_row_key(table, request, row_id)
             
             # Получаем запись перед удалением
-            select_query = f"SELECT * FROM `{table_name}` WHERE `{pk_column}` = %s"
-            cursor.execute(select_query, (row_id,))
+            select_query = f"SELECT * FROM `{table_name}` WHERE {key_condition(key)}"
+            execute(cursor, select_query, key_values)
             row_to_delete = cursor.fetchone()
             
             if not row_to_delete:
-                connection.close()
                 raise HTTPException(status_code=404, detail=f"Запись с ID {row_id} не найдена")
             
             # Формируем запрос на удаление
-            delete_query = f"DELETE FROM `{table_name}` WHERE `{pk_column}` = %s"
+            delete_query = f"DELETE FROM `{table_name}` WHERE {key_condition(key)}"
             
             # Выполняем запрос
-            cursor.execute(delete_query, (row_id,))
-            connection.commit()
+            execute(cursor, delete_query, key_values)
             
             affected_rows = cursor.rowcount
-            connection.close()
-            
             if affected_rows == 0:
                 raise HTTPException(status_code=404, detail=f"Запись с ID {row_id} не найдена или не может быть удалена")
             
@@ -362,6 +626,22 @@ async def delete_table_row(table_name: str, row_id: str):
         print(f"Ошибка при удалении записи из таблицы '{table_name}': {e}")
         raise HTTPException(status_code=500, detail=f"Ошибка при удалении записи: {str(e)}")
 
+# Сброс кэша метаданных схемы
+@app.post("/api/admin/schema/invalidate")
+async def invalidate_schema_cache(table_name: Optional[str] = Query(None)):
+    removed = schema_catalog.invalidate(table_name)
+    return {"message": "Кэш схемы сброшен", "table": table_name, "invalidated": removed}
+
+# Статистика пула соединений
+@app.get("/metrics/pool")
+async def get_pool_metrics():
+    return pool.stats()
+
+# Статистика серверных подготовленных запросов
+@app.get("/api/admin/query-cache")
+async def get_query_cache_stats():
+    return {"server_prepare": DB_SERVER_PREPARE, **prepared_counters}
+
 if __name__ == "__main__":
     port = int(os.getenv("API_PORT", 5000))
     print(f"Запуск сервера на порту {port}")